@@ -0,0 +1,65 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic_ns
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from .indexes import IndexUnderTest
+
+
+async def search_batches(
+    index: IndexUnderTest,
+    xq: np.ndarray,
+    batches: List[Tuple[int, int, int]],
+    topk: int,
+    concurrency: int,
+    emit: Callable,
+):
+    """
+    Search batches with up to concurrency outstanding requests.
+    :param index: Index to search.
+    :param xq: Queries.
+    :param batches: List of (batch number, begin, end).
+    :param topk: Number of nearest neighbors to search.
+    :param concurrency: Number of outstanding requests.
+    :param emit: Called with (batch, begin, end, started, duration, distances, labels)
+        for each finished request.
+    """
+    # shared by all slots, safe as the event loop runs in one thread
+    pending = iter(batches)
+
+    async def slot():
+        for batch, begin, end in pending:
+            started = monotonic_ns()
+            distances, labels = await index.search_async(xq[begin:end], topk)
+            emit(batch, begin, end, started, monotonic_ns() - started, distances, labels)
+
+    try:
+        await asyncio.gather(*(slot() for _ in range(concurrency)))
+    finally:
+        await index.close_async()
+
+
+def run_search_batches(
+    index: IndexUnderTest,
+    xq: np.ndarray,
+    batches: List[Tuple[int, int, int]],
+    topk: int,
+    concurrency: int,
+    emit: Callable,
+):
+    """
+    Run search_batches in a new event loop.
+
+    Sync backends fall back to IndexUnderTest.search_async offloading to the
+    default executor, which is sized to concurrency so the number of
+    outstanding requests is not capped by the default thread pool size.
+    """
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+        await search_batches(index, xq, batches, topk, concurrency, emit)
+
+    asyncio.run(main())
@@ -1,49 +1,130 @@
-from typing import List, Tuple, Union
+from typing import Dict, Iterable, List, Tuple, Union
 import numpy as np
 import faiss
 from annb.indexes import IndexUnderTest, IndexUnderTestFactory, MetricType
 
 
+# scalar quantizer types by the qtype index arg, *_direct store uint8/int8
+# data as is, fp16 halves float data
+SQ_TYPES = {
+    "8bit": faiss.ScalarQuantizer.QT_8bit,
+    "4bit": faiss.ScalarQuantizer.QT_4bit,
+    "6bit": faiss.ScalarQuantizer.QT_6bit,
+    "8bit_uniform": faiss.ScalarQuantizer.QT_8bit_uniform,
+    "8bit_direct": faiss.ScalarQuantizer.QT_8bit_direct,
+    "8bit_direct_signed": faiss.ScalarQuantizer.QT_8bit_direct_signed,
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+}
+
+
 class FaissIndexUnderTest(IndexUnderTest):
+    cacheable = True
+    runtime_args = ("mmap",)
+
     def __init__(
         self, index_name: str, dimension: int, metric_type: MetricType, **kwargs
     ):
         super().__init__(index_name, dimension, metric_type, **kwargs)
+        # wrap with IndexIDMap2 to support remove for indexes without their own ids, e.g. flat
+        self.id_map = str(self.kwargs.get("id_map", "no")).lower() in [
+            "yes",
+            "true",
+            "1",
+            "on",
+        ]
+        # hamming uses binary indexes on packed bits
+        self.is_binary = self.metric_type == MetricType.HAMMING
+        if self.is_binary:
+            self.dtypes = (np.uint8,)
+        # split data across shards, and/or copy the index to replicas
+        self.shards = int(self.kwargs.get("shards", 1))
+        self.replicas = int(self.kwargs.get("replicas", 1))
+        self.distributed = self.shards > 1 or self.replicas > 1
+        if self.distributed:
+            if self.is_binary or self.using_gpu():
+                raise ValueError("shards and replicas only support cpu float index")
+            # IndexShards/IndexReplicas could not be serialized
+            self.cacheable = False
+        # the single index copied to shards and replicas
+        self.template = None
+        self.shard_indexes = []
+        self.wrappers = []
         self.index = self.create_index()
+        self.count = 0
 
     def create_index(self) -> Union[faiss.Index, None]:
+        if not self.distributed:
+            return self.create_single_index()
+        self.template = self.create_single_index()
+        if not self.id_map and faiss.try_extract_index_ivf(self.template) is None:
+            # ids are assigned by IndexShards, shards need to store them
+            self.template = faiss.IndexIDMap2(self.template)
+        return self.distribute(self.template)
+
+    def distribute(self, template: faiss.Index) -> faiss.Index:
+        """
+        Copy the template to shards(IndexShards) of replicas(IndexReplicas).
+        Adds are split across shards and run in parallel, searches fan out
+        to all shards in parallel and merge their top-k, queries are split
+        between replicas.
+        """
+        # sub-indexes are not owned by the wrappers, keep them alive
+        self.shard_indexes = []
+        self.wrappers = []
+        for _ in range(self.replicas):
+            index = faiss.IndexShards(self.dimension, True, False)
+            for _ in range(self.shards):
+                shard = faiss.clone_index(template)
+                index.add_shard(shard)
+                self.shard_indexes.append(shard)
+            self.wrappers.append(index)
+        if self.replicas == 1:
+            self.log.info("create index IndexShards(shards=%d)", self.shards)
+            return index
+        index = faiss.IndexReplicas(self.dimension, True)
+        for replica in self.wrappers:
+            index.add_replica(replica)
+        self.wrappers.append(index)
+        self.log.info("create index IndexReplicas(shards=%d,replicas=%d)", self.shards, self.replicas)
+        return index
+
+    def base_index(self) -> faiss.Index:
+        """
+        The single index, the template of shards and replicas if distributed.
+        """
+        return self.index if self.template is None else self.template
+
+    def create_single_index(self) -> Union[faiss.Index, None]:
         faiss_metric = faiss.METRIC_L2
         if self.metric_type == MetricType.INNER_PRODUCT:
             faiss_metric = faiss.METRIC_INNER_PRODUCT
         elif self.metric_type == MetricType.JACCARD:
             # need faiss 1.7.4 or later
             faiss_metric = faiss.METRIC_Jaccard
-        is_binary = False
-        using_gpu = str(self.kwargs.get("gpu", "no")).lower() in [
-            "yes",
-            "true",
-            "1",
-            "on",
-        ]
+        is_binary = self.is_binary
+        using_gpu = self.using_gpu()
         index_string = self.kwargs.get("index", "flat")
         index = None
         if index_string == "flat":
             if is_binary:
-                index = faiss.IndexBinaryFlat(self.dimension, faiss_metric)
-                self.log.info("create index IndexBinaryFlat(d=%d,%s)", self.dimension, str(faiss_metric))
+                index = faiss.IndexBinaryFlat(self.dimension)
+                self.log.info("create index IndexBinaryFlat(d=%d)", self.dimension)
             else:
                 index = faiss.IndexFlat(self.dimension, faiss_metric)
                 self.log.info("create index IndexFlat(d=%d,%s)", self.dimension, str(faiss_metric))
         elif index_string == "ivfflat":
             nlist = self.kwargs.get("nlist", 128)
             if is_binary:
-                index = faiss.IndexBinaryFlat(self.dimension, faiss_metric)
-                index = faiss.IndexBinaryIVF(index, self.dimension, nlist)
-                self.log.info("create index IndexBinaryIVF(d=%d,nlist=%d,%s)", self.dimension, nlist, str(faiss_metric))
+                quantizer = faiss.IndexBinaryFlat(self.dimension)
+                index = faiss.IndexBinaryIVF(quantizer, self.dimension, nlist)
+                self.log.info("create index IndexBinaryIVF(d=%d,nlist=%d)", self.dimension, nlist)
             else:
                 quantizer = faiss.IndexFlat(self.dimension, faiss_metric)
                 index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, faiss_metric)
                 self.log.info("create index IndexIVFFlat(d=%d,nlist=%d,%s)", self.dimension, nlist, str(faiss_metric))
+        elif is_binary:
+            index = faiss.index_binary_factory(self.dimension, index_string)
+            self.log.info("create index %s(d=%d,binary)", index_string, self.dimension)
         elif index_string == "ivfpq":
             quantizer = faiss.IndexFlat(self.dimension, faiss_metric)
             nlist = self.kwargs.get("nlist", 128)
@@ -63,13 +144,19 @@ class FaissIndexUnderTest(IndexUnderTest):
         elif index_string == "ivfsq":
             quantizer = faiss.IndexFlat(self.dimension, faiss_metric)
             nlist = self.kwargs.get("nlist", 128)
+            qtype = self.kwargs.get("qtype", "8bit")
             index = faiss.IndexIVFScalarQuantizer(
                 quantizer,
                 self.dimension,
                 nlist,
-                faiss.ScalarQuantizer.QT_8bit,
+                SQ_TYPES[qtype],
+                faiss_metric,
             )
-            self.log.info("create index IndexIVFScalarQuantizer(d=%d,nlist=%d,QT_8bit)", self.dimension, nlist)
+            self.log.info("create index IndexIVFScalarQuantizer(d=%d,nlist=%d,QT_%s)", self.dimension, nlist, qtype)
+        elif index_string == "sq":
+            qtype = self.kwargs.get("qtype", "8bit")
+            index = faiss.IndexScalarQuantizer(self.dimension, SQ_TYPES[qtype], faiss_metric)
+            self.log.info("create index IndexScalarQuantizer(d=%d,QT_%s)", self.dimension, qtype)
         else:
             index = faiss.index_factory(self.dimension, index_string, faiss_metric)
             self.log.info("create index %s(d=%d,%s)", index_string, self.dimension,str(faiss_metric))
@@ -79,41 +166,224 @@ class FaissIndexUnderTest(IndexUnderTest):
             using_gpu,
             self.support_gpu(),
         )
-        if using_gpu and self.support_gpu():
+        if using_gpu and self.support_gpu() and not is_binary:
             self.log.debug("copy index to gpu")
             res = faiss.StandardGpuResources()
             index = faiss.index_cpu_to_gpu(res, 0, index)
+        if self.id_map:
+            self.log.info("wrap index with IndexIDMap2")
+            index = faiss.IndexBinaryIDMap2(index) if is_binary else faiss.IndexIDMap2(index)
         return index
 
+    def prepare(self, data: np.ndarray) -> np.ndarray:
+        data = np.asarray(data)
+        if self.metric_type == MetricType.JACCARD:
+            # faiss jaccard is of float vectors, unpack the bits
+            return np.unpackbits(data, axis=1, count=self.dimension).astype(np.float32)
+        return np.ascontiguousarray(super().prepare(data))
+
+    def using_gpu(self) -> bool:
+        return str(self.kwargs.get("gpu", "no")).lower() in [
+            "yes",
+            "true",
+            "1",
+            "on",
+        ]
+
+    def using_mmap(self) -> bool:
+        return str(self.kwargs.get("mmap", "no")).lower() in [
+            "yes",
+            "true",
+            "1",
+            "on",
+        ]
+
     @classmethod
     def support_gpu(cls) -> bool:
         return hasattr(faiss, "get_num_gpus") and faiss.get_num_gpus() > 0
 
     def train(self, data: np.ndarray) -> None:
-        return self.index.train(data)
+        if self.template is None:
+            return self.index.train(self.prepare(data))
+        # train once, shards and replicas are copies of the trained index
+        self.template.train(self.prepare(data))
+        self.index = self.distribute(self.template)
+
+    def train_chunks(self, chunks: Iterable[np.ndarray]) -> None:
+        # e.g. flat index, do not read the data at all
+        if self.index.is_trained:
+            return
+        super().train_chunks(chunks)
 
     def add(self, data: np.ndarray) -> None:
         count = data.shape[0]
         step_size = 10000
         for i in range(0, count, step_size):
-            self.index.add(data[i : i + step_size])
+            step_data = self.prepare(data[i : i + step_size])
+            if self.id_map:
+                # IndexIDMap2 only accepts explicit ids
+                ids = np.arange(self.count, self.count + len(step_data), dtype=np.int64)
+                self.index.add_with_ids(step_data, ids)
+            else:
+                self.index.add(step_data)
+            self.count += len(step_data)
         return
 
+    def add_with_ids(self, data: np.ndarray, ids: np.ndarray) -> None:
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+        step_size = 10000
+        for i in range(0, data.shape[0], step_size):
+            self.index.add_with_ids(self.prepare(data[i : i + step_size]), ids[i : i + step_size])
+        if len(ids):
+            # later add continues after the given ids
+            self.count = max(self.count, int(ids.max()) + 1)
+
+    def remove(self, ids: np.ndarray) -> None:
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+        if self.distributed:
+            # shards store their ids, each removes the ids it has
+            for shard in self.shard_indexes:
+                shard.remove_ids(ids)
+            # shards before replicas
+            for wrapper in self.wrappers:
+                wrapper.syncWithSubIndexes()
+            return
+        if self.is_binary:
+            ivf = isinstance(self.index, faiss.IndexBinaryIVF)
+        else:
+            ivf = faiss.try_extract_index_ivf(self.index) is not None
+        if not self.id_map and not ivf:
+            # e.g. flat index shifts ids of the remaining items on remove
+            raise NotImplementedError(
+                "remove needs stable ids, use an IVF index or set id_map"
+            )
+        self.index.remove_ids(ids)
+
     def warmup(self) -> None:
         for _ in range(3):
-            random_data = np.random.rand(10, self.dimension).astype("float32")
-            random_data /= np.linalg.norm(random_data, axis=1)[:, None]
-            self.search(random_data, 10)
+            self.search(self.random_queries(10), 10)
 
     def search(self, query: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
-        return self.index.search(query, k)
+        return self.index.search(self.prepare(query), k)
+
+    def set_threads(self, threads: int) -> None:
+        # per calling thread, the OpenMP team of each search job
+        faiss.omp_set_num_threads(threads)
+
+    def parameter_space(self) -> faiss.ParameterSpace:
+        if self.using_gpu() and self.support_gpu():
+            return faiss.GpuParameterSpace()
+        return faiss.ParameterSpace()
 
     def update_search_args(self, **kwargs):
-        if "nprobe" in kwargs:
-            self.index.nprobe = int(kwargs["nprobe"])
+        """
+        Set search parameters by faiss ParameterSpace, so any parameter of
+        the built index could be set, e.g. nprobe, efSearch, k_factor_rf,
+        quantizer_efSearch or ht. Names not supported by the index raise
+        ValueError.
+        """
+        if self.is_binary:
+            self.update_binary_search_args(**kwargs)
+            return
+        space = self.parameter_space()
+        for name, value in kwargs.items():
+            try:
+                space.set_index_parameter(self.index, name, float(value))
+            except RuntimeError as e:
+                if name == "nprobe" and faiss.try_extract_index_ivf(self.base_index()) is None:
+                    # nprobe is in the default query args, also for e.g. flat index
+                    self.log.warning("ignore nprobe of index without inverted lists")
+                    continue
+                raise ValueError(
+                    f"search parameter {name} is not supported by {self.kwargs.get('index', 'flat')}"
+                ) from e
+
+    def update_binary_search_args(self, **kwargs):
+        index = self.index
+        if isinstance(index, faiss.IndexBinaryIDMap2):
+            index = faiss.downcast_IndexBinary(index.index)
+        for name, value in kwargs.items():
+            if name == "nprobe" and isinstance(index, faiss.IndexBinaryIVF):
+                index.nprobe = int(value)
+            elif name == "efSearch" and isinstance(index, faiss.IndexBinaryHNSW):
+                index.hnsw.efSearch = int(value)
+            elif name == "nprobe" and isinstance(index, faiss.IndexBinaryFlat):
+                self.log.warning("ignore nprobe of index without inverted lists")
+            else:
+                raise ValueError(f"search parameter {name} is not supported by binary index")
+
+    def auto_query_args(
+        self, xq: np.ndarray, ground_truth: np.ndarray, topk: int, **kwargs
+    ) -> List[Tuple[Dict, float, float]]:
+        """
+        Explore search parameter combinations by faiss ParameterSpace and
+        keep the pareto optimal operating points(faiss OperatingPoints).
+        :param experiments: Max number of combinations tried, default 100.
+        """
+        if self.is_binary:
+            return super().auto_query_args(xq, ground_truth, topk, **kwargs)
+        space = self.parameter_space()
+        # parameters are set through shards and replicas
+        space.initialize(self.base_index())
+        if space.n_combinations() <= 1:
+            return []
+        space.n_experiments = int(kwargs.get("experiments", 100))
+        space.verbose = 0
+        criterion = faiss.IntersectionCriterion(len(xq), topk)
+        criterion.set_groundtruth(
+            None, np.ascontiguousarray(ground_truth[:, :topk], dtype=np.int64)
+        )
+        points = space.explore(self.index, self.prepare(xq), criterion)
+        frontier = []
+        for i in range(points.optimal_pts.size()):
+            point = points.optimal_pts.at(i)
+            if point.cno < 0:
+                # the empty point faiss starts the frontier with
+                continue
+            args = {}
+            for item in point.key.split(","):
+                name, value = item.split("=")
+                value = float(value)
+                args[name] = int(value) if value.is_integer() else value
+            frontier.append((args, point.perf, point.t))
+        return frontier
+
+    def save(self, path: str) -> None:
+        if self.distributed:
+            raise NotImplementedError("shards and replicas could not be saved")
+        index = self.index
+        if self.is_binary:
+            faiss.write_index_binary(index, path)
+            return
+        if self.using_gpu() and self.support_gpu():
+            index = faiss.index_gpu_to_cpu(index)
+        faiss.write_index(index, path)
+
+    def load(self, path: str) -> None:
+        if self.is_binary:
+            self.index = faiss.read_index_binary(path)
+            self.count = self.index.ntotal
+            return
+        if self.using_mmap() and not (self.using_gpu() and self.support_gpu()):
+            # pages are faulted in lazily by search, the index is read only
+            self.log.info("load index %s with mmap", path)
+            index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        else:
+            index = faiss.read_index(path)
+        if self.using_gpu() and self.support_gpu():
+            res = faiss.StandardGpuResources()
+            index = faiss.index_cpu_to_gpu(res, 0, index)
+        self.index = index
+        self.count = index.ntotal
+
+    def baseline_index(self) -> "FaissIndexUnderTest":
+        kwargs = {k: v for k, v in self.kwargs.items() if k not in ("shards", "replicas")}
+        return type(self)(self.name, self.dimension, self.metric_type, **kwargs)
 
     def cleanup(self) -> None:
-        self.index.reset()
+        # reset keeps the trained quantizers, a new index is trained again
+        self.index = self.create_index()
+        self.count = 0
 
 
 class FaissIndexUnderTestFactory(IndexUnderTestFactory):
@@ -8,7 +8,7 @@ class FaissIndexUnderTestDeployment(IndexUnderTestDeployment):
         deployment_type = kwargs.get('deployment_type', 'builtin')
         if deployment_type == 'venv':
             kwargs['requirements'] = [
-                'pymilvus'
+                'pymilvus>=3.0,<3.1'
             ]
         return super().deploy(**kwargs)
 
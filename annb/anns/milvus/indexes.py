@@ -1,18 +1,97 @@
-from typing import List, Tuple, Union
+from collections import deque
+import os
+import shutil
+import threading
+from time import sleep
+from typing import Iterable, List, Tuple, Union
 import numpy as np
-from pymilvus import Collection, connections, CollectionSchema, FieldSchema, DataType
+from pymilvus import (
+    AsyncMilvusClient,
+    BulkInsertState,
+    Collection,
+    connections,
+    CollectionSchema,
+    FieldSchema,
+    DataType,
+    utility,
+)
+from pymilvus.grpc_gen import milvus_pb2, schema_pb2
 from annb.indexes import IndexUnderTest, IndexUnderTestFactory, MetricType
 
+# numpy: insert requests built from arrays, sent through the pymilvus handler
+# (pinned in setup.cfg, see test_milvus_insert_request), list: pymilvus
+# converts lists of python floats, bulk: numpy files imported by the server
+INSERT_MODES = ("numpy", "list", "bulk")
+
+
+def varint(value: int) -> bytes:
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def mutation_fields(ids: np.ndarray, vectors: np.ndarray) -> List[schema_pb2.FieldData]:
+    """
+    Build the id and vector fields of an insert/upsert request without
+    boxing each float into a python object.
+    """
+    id_field = schema_pb2.FieldData(type=schema_pb2.DataType.Int64, field_name="id")
+    id_field.scalars.long_data.data.extend(ids.tolist())
+    vector_field = schema_pb2.FieldData(
+        type=schema_pb2.DataType.FloatVector, field_name="vector"
+    )
+    vector_field.vectors.dim = vectors.shape[1]
+    # a packed repeated float(field 1 of FloatArray) is the raw little endian
+    # floats, parsing it copies the buffer at once
+    payload = np.ascontiguousarray(vectors, dtype="<f4").tobytes()
+    vector_field.vectors.float_vector.MergeFromString(b"\x0a" + varint(len(payload)) + payload)
+    return [id_field, vector_field]
+
+
+def insert_request(
+    collection_name: str, ids: np.ndarray, vectors: np.ndarray
+) -> milvus_pb2.InsertRequest:
+    return milvus_pb2.InsertRequest(
+        collection_name=collection_name,
+        num_rows=len(ids),
+        fields_data=mutation_fields(ids, vectors),
+    )
+
+
+def upsert_request(
+    collection_name: str, ids: np.ndarray, vectors: np.ndarray
+) -> milvus_pb2.UpsertRequest:
+    return milvus_pb2.UpsertRequest(
+        collection_name=collection_name,
+        num_rows=len(ids),
+        fields_data=mutation_fields(ids, vectors),
+    )
+
 
 class MilvusIndexUnderTest(IndexUnderTest):
+    concurrent_add = True
+    parallel_add = True
+
     def __init__(
         self, index_name: str, dimension: int, metric_type: MetricType, **kwargs
     ):
         super().__init__(index_name, dimension, metric_type, **kwargs)
+        self.insert_mode = str(self.kwargs.get("insert", "numpy")).lower()
+        if self.insert_mode not in INSERT_MODES:
+            raise ValueError(f"Unknown insert mode: {self.insert_mode}")
+        # outstanding insert requests of numpy insert
+        self.insert_concurrency = int(self.kwargs.get("insert_concurrency", 4))
+        self.count_lock = threading.Lock()
+        if self.insert_mode == "bulk" and not self.kwargs.get("bulk_path"):
+            raise ValueError("bulk insert needs bulk_path, a directory of the milvus storage")
         self.connect()
         self.collection = self.create_collection()
         self.search_param = self.get_search_param()
         self.count = 0
+        self.async_client = None
 
     def get_search_param(self) -> dict:
         metric_type_text = self.get_index_param()['metric_type']
@@ -82,8 +161,17 @@ class MilvusIndexUnderTest(IndexUnderTest):
     def connect(self):
         uri = self.kwargs.get("uri", "http://localhost:19530")
         token = self.kwargs.get("token", "")
+        # the default alias may be connected to another server(e.g. a stand-in)
+        if connections.has_connection('default'):
+            connections.disconnect('default')
         connections.connect(uri=uri, token=token)
 
+    def worker_init(self) -> None:
+        # grpc channel of the parent could not be used after fork
+        self.connect()
+        self.collection = Collection('annb_collection')
+        self.async_client = None
+
     def create_collection(self) -> Union[Collection, None]:
         schema = CollectionSchema(
             fields=[
@@ -114,15 +202,112 @@ class MilvusIndexUnderTest(IndexUnderTest):
     def train(self, data: np.ndarray) -> None:
         pass
 
+    def train_chunks(self, chunks: Iterable[np.ndarray]) -> None:
+        pass
+
     def add(self, data: np.ndarray) -> None:
-        add_count = data.shape[0]
+        ids = np.arange(self.count, self.count + data.shape[0], dtype=np.int64)
+        self.insert(data, ids)
+        self.count += data.shape[0]
+
+    def add_with_ids(self, data: np.ndarray, ids: np.ndarray) -> None:
+        ids = np.asarray(ids, dtype=np.int64)
+        self.insert(data, ids)
+        if len(ids):
+            # later add continues after the given ids, writers may run in parallel
+            with self.count_lock:
+                self.count = max(self.count, int(ids.max()) + 1)
+
+    def insert(self, data: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Insert by steps of about 1M floats, for numpy insert up to
+        insert_concurrency requests are sent before waiting for the oldest,
+        so building the next request overlaps the ones in flight.
+        """
+        if self.insert_mode == "bulk":
+            self.bulk_insert(data, ids)
+            return
+        step_size = 1000000 // self.dimension
+        if self.insert_mode == "list":
+            for i in range(0, data.shape[0], step_size):
+                step_data = self.prepare(data[i : i + step_size])
+                self.collection.insert([ids[i : i + step_size].tolist(), step_data.tolist()])
+            return
+        handler = connections._fetch_handler("default")
+        self.send(handler.batch_insert, "insert_param", insert_request, data, ids)
+
+    def send(self, method, param: str, build_request, data: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Send prebuilt requests by steps through a pymilvus handler method
+        (batch_insert or upsert take the request as insert_param/upsert_param),
+        keeping up to insert_concurrency requests in flight.
+        """
         step_size = 1000000 // self.dimension
-        for i in range(0, add_count, step_size):
-            step_data = data[i : i + step_size]
-            step_count = step_data.shape[0]
-            ids = list(range(self.count, self.count + step_count))
-            self.collection.insert([ids, step_data.tolist()])
-            self.count += step_count
+        # the request is built here, pymilvus does not need to describe the collection
+        schema = self.collection.schema.to_dict()
+        pending = deque()
+        for i in range(0, data.shape[0], step_size):
+            request = build_request(
+                self.collection.name, ids[i : i + step_size], self.prepare(data[i : i + step_size])
+            )
+            if len(pending) >= self.insert_concurrency:
+                pending.popleft().result()
+            pending.append(
+                method(self.collection.name, [], schema=schema, _async=True, **{param: request})
+            )
+        for future in pending:
+            future.result()
+
+    def bulk_insert(self, data: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Write ids and vectors as numpy files to bulk_path, a directory of
+        the milvus storage(bulk_remote_path as seen by milvus, default
+        bulk_path), and wait for the server to import them.
+        """
+        if len(ids) == 0:
+            return
+        name = f"annb-{ids[0]}-{len(ids)}"
+        local = os.path.join(self.kwargs["bulk_path"], name)
+        remote = f'{self.kwargs.get("bulk_remote_path", self.kwargs["bulk_path"])}/{name}'
+        os.makedirs(local, exist_ok=True)
+        try:
+            np.save(os.path.join(local, "id.npy"), ids)
+            np.save(os.path.join(local, "vector.npy"), self.prepare(data))
+            task = utility.do_bulk_insert(
+                self.collection.name, files=[f"{remote}/id.npy", f"{remote}/vector.npy"]
+            )
+            while True:
+                state = utility.get_bulk_insert_state(task)
+                if state.state == BulkInsertState.ImportCompleted:
+                    break
+                if state.state in (
+                    BulkInsertState.ImportFailed,
+                    BulkInsertState.ImportFailedAndCleaned,
+                ):
+                    raise RuntimeError(f"bulk insert {name} failed: {state.failed_reason}")
+                sleep(0.1)
+        finally:
+            shutil.rmtree(local, ignore_errors=True)
+
+    def remove(self, ids: np.ndarray) -> None:
+        # delete takes a boolean expression, ids are formatted into its text,
+        # keep the expression short
+        step_size = 10000
+        for i in range(0, len(ids), step_size):
+            step_ids = [int(id_) for id_ in ids[i : i + step_size]]
+            self.collection.delete(f'id in {step_ids}')
+
+    def upsert(self, data: np.ndarray, ids: np.ndarray) -> None:
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.insert_mode == "list":
+            step_size = 1000000 // self.dimension
+            for i in range(0, data.shape[0], step_size):
+                step_data = self.prepare(data[i : i + step_size])
+                self.collection.upsert([ids[i : i + step_size].tolist(), step_data.tolist()])
+            return
+        # bulk import only inserts, upserts are sent as numpy requests
+        handler = connections._fetch_handler("default")
+        self.send(handler.upsert, "upsert_param", upsert_request, data, ids)
 
     def warmup(self) -> None:
         index_params = self.get_index_param()
@@ -133,13 +318,11 @@ class MilvusIndexUnderTest(IndexUnderTest):
         )
         self.collection.load()
         for _ in range(3):
-            random_data = np.random.rand(10, self.dimension).astype("float32")
-            random_data /= np.linalg.norm(random_data, axis=1)[:, None]
-            self.search(random_data, 10)
+            self.search(self.random_queries(10), 10)
 
     def search(self, query: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
         result = self.collection.search(
-            data=query,
+            data=self.prepare(query),
             anns_field='vector',
             param=self.search_param,
             limit=k,
@@ -152,6 +335,30 @@ class MilvusIndexUnderTest(IndexUnderTest):
             ids.append(r.ids)
         return distances, ids
 
+    async def search_async(self, query: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
+        if self.async_client is None:
+            # the async client is bound to the running event loop
+            self.async_client = AsyncMilvusClient(
+                uri=self.kwargs.get("uri", "http://localhost:19530"),
+                token=self.kwargs.get("token", ""),
+            )
+        result = await self.async_client.search(
+            collection_name='annb_collection',
+            data=self.prepare(query),
+            anns_field='vector',
+            search_params=self.search_param,
+            limit=k,
+            consistency_level='Strong',
+        )
+        distances = [[hit['distance'] for hit in hits] for hits in result]
+        ids = [[hit['id'] for hit in hits] for hits in result]
+        return distances, ids
+
+    async def close_async(self) -> None:
+        if self.async_client is not None:
+            await self.async_client.close()
+            self.async_client = None
+
     def update_search_args(self, **kwargs):
         if "nprobe" in kwargs:
             self.search_param['params']['nprobe'] = kwargs['nprobe']
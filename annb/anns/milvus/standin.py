@@ -0,0 +1,189 @@
+"""
+Local gRPC stand-in of the milvus server, to measure the client side cost
+of inserts without a cluster.
+
+    python -m annb.anns.milvus.standin --count 100000 --dimension 128
+"""
+from argparse import ArgumentParser
+from concurrent import futures
+import os
+import threading
+from time import monotonic_ns
+from typing import Dict, Iterable
+
+import grpc
+import numpy as np
+from google.protobuf import message_factory
+from pymilvus.grpc_gen import common_pb2, milvus_pb2, schema_pb2
+
+from annb.indexes import MetricType
+
+SERVICE = milvus_pb2.DESCRIPTOR.services_by_name['MilvusService']
+
+
+class MilvusStandIn(grpc.GenericRpcHandler):
+    """
+    Answer every MilvusService method, keeps collection schemas so the
+    pymilvus ORM works, and counts inserted(and upserted) rows and bytes
+    without storing them. Methods not handled return an empty(successful) response.
+    """
+
+    def __init__(self, workers: int = 16):
+        self.workers = workers
+        self.schemas = {}
+        self.rows = 0
+        self.upserts = 0
+        self.bytes = 0
+        # row count of bulk insert tasks
+        self.tasks = []
+        self.lock = threading.Lock()
+        self.server = None
+        self.port = 0
+
+    @property
+    def uri(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def start(self) -> 'MilvusStandIn':
+        self.server = grpc.server(
+            futures.ThreadPoolExecutor(self.workers),
+            options=[('grpc.max_receive_message_length', -1)],
+        )
+        self.server.add_generic_rpc_handlers((self,))
+        self.port = self.server.add_insecure_port('127.0.0.1:0')
+        self.server.start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.stop(None)
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def service(self, handler_call_details):
+        name = handler_call_details.method.rsplit('/', 1)[-1]
+        method = SERVICE.methods_by_name.get(name)
+        if method is None:
+            return None
+        request_type = message_factory.GetMessageClass(method.input_type)
+        response_type = message_factory.GetMessageClass(method.output_type)
+        handle = getattr(self, f'handle_{name}', None)
+
+        def unary(request, context):
+            response = response_type()
+            if handle is not None:
+                handle(request, response)
+            return response
+
+        return grpc.unary_unary_rpc_method_handler(
+            unary,
+            request_deserializer=request_type.FromString,
+            response_serializer=response_type.SerializeToString,
+        )
+
+    def handle_CreateCollection(self, request, response):
+        self.schemas[request.collection_name] = schema_pb2.CollectionSchema.FromString(
+            request.schema
+        )
+
+    def handle_DropCollection(self, request, response):
+        self.schemas.pop(request.collection_name, None)
+
+    def handle_HasCollection(self, request, response):
+        response.value = request.collection_name in self.schemas
+
+    def handle_DescribeCollection(self, request, response):
+        schema = self.schemas.get(request.collection_name)
+        if schema is None:
+            response.status.error_code = common_pb2.CollectionNotExists
+            response.status.code = 100
+            response.status.reason = f'collection not found[{request.collection_name}]'
+            return
+        response.schema.CopyFrom(schema)
+        response.collection_name = request.collection_name
+
+    def handle_Import(self, request, response):
+        # files are local to the stand-in, count rows of the id file
+        id_files = [file for file in request.files if file.endswith('id.npy')]
+        if not id_files:
+            response.status.error_code = common_pb2.IllegalArgument
+            response.status.code = common_pb2.IllegalArgument
+            response.status.reason = f'no id.npy in import files {list(request.files)}'
+            return
+        rows = len(np.load(id_files[0], mmap_mode='r'))
+        with self.lock:
+            self.rows += rows
+            self.bytes += sum(os.path.getsize(file) for file in request.files)
+            self.tasks.append(rows)
+            response.tasks.append(len(self.tasks))
+
+    def handle_GetImportState(self, request, response):
+        response.state = common_pb2.ImportCompleted
+        response.row_count = self.tasks[request.task - 1]
+
+    def handle_Insert(self, request, response):
+        with self.lock:
+            self.rows += request.num_rows
+            self.bytes += request.ByteSize()
+        response.insert_cnt = request.num_rows
+
+    def handle_Upsert(self, request, response):
+        with self.lock:
+            self.upserts += request.num_rows
+            self.bytes += request.ByteSize()
+        response.upsert_cnt = request.num_rows
+
+
+def benchmark_insert(
+    count: int, dimension: int, configs: Iterable[Dict], chunk_size: int = 100000
+) -> Dict[str, float]:
+    """
+    Insert count random vectors with each insert config of the milvus index
+    into a stand-in server.
+    :return: Dict of config text -> vectors per second.
+    """
+    from annb.anns.milvus.indexes import MilvusIndexUnderTest
+
+    data = np.random.rand(count, dimension).astype(np.float32)
+    rates = {}
+    with MilvusStandIn() as standin:
+        for config in configs:
+            index = MilvusIndexUnderTest(
+                'standin', dimension, MetricType.L2, uri=standin.uri, **config
+            )
+            started = monotonic_ns()
+            for i in range(0, count, chunk_size):
+                index.add(data[i : i + chunk_size])
+            duration = monotonic_ns() - started
+            if standin.rows != count:
+                raise RuntimeError(f'stand-in received {standin.rows} of {count} rows')
+            standin.rows = 0
+            text = ','.join(f'{k}={v}' for k, v in config.items())
+            rates[text] = count / (duration / 1000000000.0)
+    return rates
+
+
+def main():
+    parser = ArgumentParser(description='Measure client side insert cost against a milvus stand-in')
+    parser.add_argument('--count', default=100000, type=int, help='vectors inserted')
+    parser.add_argument('--dimension', default=128, type=int, help='dimension of vectors')
+    parser.add_argument(
+        '--concurrency', default=4, type=int, help='outstanding insert requests of the numpy insert'
+    )
+    opts = parser.parse_args()
+    configs = [
+        {'insert': 'list'},
+        {'insert': 'numpy', 'insert_concurrency': 1},
+        {'insert': 'numpy', 'insert_concurrency': opts.concurrency},
+    ]
+    for text, rate in benchmark_insert(opts.count, opts.dimension, configs).items():
+        print(f'{text}: {rate:.1f} vectors/s')
+
+
+if __name__ == '__main__':
+    main()
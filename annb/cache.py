@@ -0,0 +1,101 @@
+import json
+import os
+from hashlib import sha1
+from logging import getLogger
+from typing import Union
+
+from .dataset import BaseDataset
+from .indexes import IndexUnderTest
+
+
+class IndexCache:
+    """
+    On-disk cache of built indexes, one file per index saved by
+    IndexUnderTest.save. The least recently used files are evicted when the
+    total size is over max_size.
+    """
+
+    def __init__(self, directory: str, max_size: int):
+        """
+        :param directory: Directory of cached index files.
+        :param max_size: Max total size(bytes) of cached index files.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.log = getLogger('annb')
+
+    @staticmethod
+    def key(dataset: BaseDataset, index: IndexUnderTest) -> str:
+        """
+        Key of the index built from the dataset, by the dataset contents and
+        the index type, dimension, metric and index args, except runtime args.
+        """
+        index_args = {
+            k: v for k, v in index.kwargs.items() if k not in index.runtime_args
+        }
+        identity = json.dumps(
+            [
+                dataset.fingerprint(),
+                f'{type(index).__module__}.{type(index).__qualname__}',
+                int(index.dimension),
+                index.metric_type.name,
+                index_args,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return sha1(identity.encode('utf-8')).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.index')
+
+    def lookup(self, key: str) -> Union[str, None]:
+        """
+        :return: Path of the cached index file, or None if not cached.
+        """
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        # mtime is the last use time for LRU
+        os.utime(path)
+        return path
+
+    def store(self, key: str, index: IndexUnderTest) -> str:
+        """
+        Save the index to the cache, then evict least recently used files.
+        :return: Path of the cached index file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        # write to a temporary file, so that no partial file is ever looked up
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            index.save(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Union[str, None] = None) -> None:
+        """
+        Remove least recently used files until the total size fits max_size.
+        :param keep: File never evicted, e.g. the one just stored.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.index'):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            self.log.info('evict cached index %s, %d bytes', path, size)
+            os.remove(path)
+            total -= size
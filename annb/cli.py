@@ -1,16 +1,21 @@
 from argparse import ArgumentParser
-from typing import Union
+from typing import Dict, Union
 from logging import getLogger, Formatter, StreamHandler, FileHandler
 from sys import stdout
 from tempfile import gettempdir
 from os import path
 
+from .dataset.bigann_dataset import BigAnnDataset, FORMATS as BIGANN_FORMATS
+from .dataset.cache import DatasetCache
 from .dataset.hdf5_dataset import AnnbHdf5Dataset
 from .dataset.random_dataset import RandomDataset
 from .indexes import IndexUnderTestFactory
 from .plot import plot_result_recall_vs_qps
 from .result import BenchmarkResult
-from .runner import Runner
+from .runner import Runner, EXECUTORS, LOOP_MODES, QUERY_ARGS_AUTO
+from .workloads import WORKLOADS
+from .loadgen import ARRIVALS
+from .threads import load_thread_grid
 from .config import load_configs
 from . import __version__ as annb_version
 
@@ -60,6 +65,42 @@ def load_dict(s):
     return data
 
 
+def load_query_args(s):
+    """
+    >>> load_query_args('nprobe=16')
+    {'nprobe': 16}
+    >>> load_query_args('auto')
+    'auto'
+    """
+    if s.strip() == QUERY_ARGS_AUTO:
+        return QUERY_ARGS_AUTO
+    return load_dict(s)
+
+
+def load_list(s):
+    """
+    >>> load_list('100,200.5')
+    [100.0, 200.5]
+    """
+    return [float(x) for x in s.strip().split(',') if x]
+
+
+def load_int_list(s):
+    """
+    >>> load_int_list('1,10')
+    [1, 10]
+    """
+    return [int(x) for x in s.strip().split(',') if x]
+
+
+def load_thread_grid_text(s):
+    """
+    >>> load_thread_grid_text('1x8,2x4')
+    [(1, 8), (2, 4)]
+    """
+    return load_thread_grid([x for x in s.strip().split(',') if x])
+
+
 def load_index_factory(index_factory, index_factory_args) -> IndexUnderTestFactory:
     """
     >>> load_index_factory('annb.anns.faiss.indexes.index_under_test_factory')
@@ -74,20 +115,32 @@ def load_index_factory(index_factory, index_factory_args) -> IndexUnderTestFacto
         exit(1)
 
 
-def create_or_load_dataset(dataset_file: str, dimension: int, metric_type: str, count: int):
+def create_or_load_dataset(
+    dataset_file: str,
+    dimension: int,
+    metric_type: str,
+    count: int,
+    dataset_args: Union[Dict, None] = None,
+):
     """
     >>> create_or_load_dataset('sift-128-euclidean.hdf5', 128, 'euclidean')
     <annb.dataset.hdf5_dataset.AnnbHdf5Dataset object at 0x7f6b3d0b9e10>
     """
+    dataset_args = dataset_args or {}
     if dataset_file:
         try:
-            dataset = AnnbHdf5Dataset(dataset_file)
+            if path.splitext(dataset_file)[1].lower() in BIGANN_FORMATS:
+                dataset = BigAnnDataset(dataset_file, **dataset_args)
+            else:
+                dataset = AnnbHdf5Dataset(dataset_file, **dataset_args)
         except Exception as e:
             logger.error('Load dataset failed', e)
             exit(1)
     else:
         temp_file = path.join(gettempdir(), f'.annb_random_d{dimension}_{metric_type}_{count}.hdf5')
-        dataset = RandomDataset(temp_file, dimension=dimension, metric=metric_type, count=count)
+        dataset = RandomDataset(
+            temp_file, dimension=dimension, metric=metric_type, count=count, **dataset_args
+        )
     logger.info(
         'use dataset: %s, dim: %d, metric: %s',
         dataset,
@@ -115,11 +168,19 @@ def run_once(
     loop,
     step,
     count,
+    datasets: Union[DatasetCache, None] = None,
+    dataset_args: Union[Dict, None] = None,
+    **runner_args,
 ):
     factory = load_index_factory(index_factory, index_factory_args)
-    dataset, index_dim, index_metric_type = create_or_load_dataset(
-        dataset, index_dim, index_metric_type, count
-    )
+    load_args = (dataset, index_dim, index_metric_type, count, dataset_args)
+    if datasets is None:
+        dataset, index_dim, index_metric_type = create_or_load_dataset(*load_args)
+    else:
+        dataset, index_dim, index_metric_type = datasets.get(
+            DatasetCache.key(*load_args),
+            lambda: create_or_load_dataset(*load_args),
+        )
     index = factory.create(index_name, index_dim, index_metric_type, **index_args)
     logger.info(
         'use index: %s, dim: %d, metric: %s, %s',
@@ -142,6 +203,7 @@ def run_once(
         loop=loop,
         step=step,
         rlog=rlog,
+        **runner_args,
     )
     runner.run()
     if result:
@@ -151,28 +213,84 @@ def run_once(
         print(runner.benchmark_result)
 
 
+# optional runner options, passed to Runner only if set in run file
+RUNNER_OPTIONS = (
+    'executor',
+    'concurrency',
+    'load_rates',
+    'arrival',
+    'arrival_seed',
+    'recall_at',
+    'loop_mode',
+    'min_loop',
+    'max_loop',
+    'ci_width',
+    'time_budget',
+    'tune',
+    'workload',
+    'mixed_holdback',
+    'insert_rate',
+    'insert_batch',
+    'churn_fraction',
+    'churn_cycles',
+    'churn_seed',
+    'index_cache',
+    'index_cache_size',
+    'train_sizes',
+    'auto_sample',
+    'auto_experiments',
+    'thread_budget',
+    'omp_threads',
+    'pin',
+    'thread_grid',
+    'fanout_baseline',
+    'insert_chunk',
+    'insert_writers',
+    'insert_prefetch',
+)
+
+
 def run_file(filename, **kwargs):
     runs = load_configs(filename)
+    datasets = DatasetCache()
+    dataset_keys = []
     for run in runs:
         run.update(kwargs)
-        run_once(
-            run['name'],
-            run['index_factory'],
-            run['index_factory_args'],
-            run['index_name'],
+        dataset_key = DatasetCache.key(
+            run['dataset'],
             run['index_dim'],
             run['index_metric_type'],
-            run['index_args'],
-            run['query_args'],
-            run['dataset'],
-            run['result'],
-            run['result_log'],
-            run['topk'],
-            run['jobs'],
-            run['loop'],
-            run['step'],
             run.get('count', 1000),
+            run.get('dataset_args', {}),
         )
+        datasets.expect(dataset_key)
+        dataset_keys.append(dataset_key)
+    for run, dataset_key in zip(runs, dataset_keys):
+        runner_args = {key: run[key] for key in RUNNER_OPTIONS if key in run}
+        try:
+            run_once(
+                run['name'],
+                run['index_factory'],
+                run['index_factory_args'],
+                run['index_name'],
+                run['index_dim'],
+                run['index_metric_type'],
+                run['index_args'],
+                run['query_args'],
+                run['dataset'],
+                run['result'],
+                run['result_log'],
+                run['topk'],
+                run['jobs'],
+                run['loop'],
+                run['step'],
+                run.get('count', 1000),
+                datasets,
+                run.get('dataset_args', {}),
+                **runner_args,
+            )
+        finally:
+            datasets.release(dataset_key)
 
 
 def report_plain(inputs, output):
@@ -311,11 +429,100 @@ def test_main():
     parser.add_argument(
         '--query-args',
         default=[{'nprobe': 1}],
-        type=load_dict,
+        type=load_query_args,
         action='append',
-        help='Query args, comma separated key=value, set multiple times to run multiple queries',
+        help='Query args, comma separated key=value, set multiple times to run multiple queries,'
+        ' or auto to explore the pareto optimal query args of the built index(faiss OperatingPoints)',
+    )
+    parser.add_argument(
+        '--auto-experiments',
+        default=100,
+        type=int,
+        help='max query args combinations tried by --query-args auto',
+    )
+    parser.add_argument(
+        '--tune',
+        default=None,
+        type=load_dict,
+        help='Tune a monotone search parameter to reach a target recall, then measure it,'
+        ' comma separated key=value, e.g. param=nprobe,target_recall=0.95,min=1,max=4096,sample=1000',
+    )
+    parser.add_argument(
+        '--workload',
+        default='search',
+        choices=WORKLOADS,
+        help='search: add all data then search,'
+        ' mixed: insert held back data at --insert-rate while searching,'
+        ' churn: remove and insert --churn-fraction of data per cycle, search after each cycle',
+    )
+    parser.add_argument(
+        '--mixed-holdback',
+        default=0.5,
+        type=float,
+        help='fraction of data inserted while searching, only used with --workload mixed',
+    )
+    parser.add_argument(
+        '--insert-rate',
+        default=0,
+        type=float,
+        help='insert rate(vectors/s) while searching, 0 for as fast as possible',
+    )
+    parser.add_argument(
+        '--churn-fraction',
+        default=0.1,
+        type=float,
+        help='fraction of data removed and inserted per cycle, only used with --workload churn',
+    )
+    parser.add_argument(
+        '--churn-cycles',
+        default=5,
+        type=int,
+        help='number of churn cycles, only used with --workload churn',
+    )
+    parser.add_argument(
+        '--index-cache',
+        action='store_true',
+        help='load the built index from the on-disk cache under run dir,'
+        ' keyed by dataset contents, dim, metric and index args, build and save it on miss',
+    )
+    parser.add_argument(
+        '--index-cache-size',
+        default=16,
+        type=float,
+        help='max size(GiB) of the index cache, least recently used indexes are evicted',
+    )
+    parser.add_argument(
+        '--insert-chunk',
+        default=0,
+        type=int,
+        help='rows per add when building the index, 0 for the chunks of the dataset(see chunk_size dataset arg)',
+    )
+    parser.add_argument(
+        '--insert-writers',
+        default=1,
+        type=int,
+        help='parallel writers adding chunks, only for indexes supporting parallel add(e.g. milvus)',
+    )
+    parser.add_argument(
+        '--insert-prefetch',
+        default=2,
+        type=int,
+        help='chunks read ahead from the dataset while adding',
+    )
+    parser.add_argument(
+        '--train-sizes',
+        default=[],
+        type=load_list,
+        help='Train sample sizes swept, counts(> 1) or fractions(<= 1) of train data,'
+        ' comma separated, the index is rebuilt and searched for each',
     )
     parser.add_argument('--topk', default=10, type=int, help='topk')
+    parser.add_argument(
+        '--recall-at',
+        default=[],
+        type=load_int_list,
+        help='Extra k values(<= topk) to report recall@k, comma separated',
+    )
     parser.add_argument(
         '--step', default=10, type=int, help='step size, also as batch size, if use 0, will query all test data once'
     )
@@ -328,16 +535,115 @@ def test_main():
         type=int,
         help='jobs, how many query jobs to run in parallel',
     )
+    parser.add_argument(
+        '--executor',
+        default='thread',
+        choices=EXECUTORS,
+        help='executor for query jobs, thread: jobs as threads in one process,'
+        ' process: jobs as forked processes with shared memory query/result buffers,'
+        ' async: each job runs an event loop with --concurrency outstanding searches',
+    )
+    parser.add_argument(
+        '--concurrency',
+        default=16,
+        type=int,
+        help='outstanding searches per job, only used with --executor async',
+    )
+    parser.add_argument(
+        '--thread-budget',
+        default=None,
+        type=int,
+        help='threads partitioned between jobs and intra-query(OpenMP) threads of each job,'
+        ' 0 for all cores, if not set threads are not controlled',
+    )
+    parser.add_argument(
+        '--omp-threads',
+        default=0,
+        type=int,
+        help='intra-query threads per job, 0 for thread budget // jobs',
+    )
+    parser.add_argument(
+        '--pin',
+        default=False,
+        action='store_true',
+        help='pin each job to its own cores',
+    )
+    parser.add_argument(
+        '--thread-grid',
+        default=[],
+        type=load_thread_grid_text,
+        help='(jobs x omp_threads) layouts swept for each query args, comma separated, e.g. 1x8,2x4,8x1',
+    )
+    parser.add_argument(
+        '--fanout-baseline',
+        default=False,
+        action='store_true',
+        help='also build the single index of a sharded/replicated index(e.g. --index-args shards=4)'
+        ' and report the fan-out overhead against it',
+    )
+    parser.add_argument(
+        '--load-rates',
+        default=[],
+        type=load_list,
+        help='Open-loop target arrival rates(queries/s), comma separated,'
+        ' if set, each query args also run once per rate with scheduled arrival',
+    )
+    parser.add_argument(
+        '--arrival',
+        default='constant',
+        choices=ARRIVALS,
+        help='Arrival process for open-loop load, only used with --load-rates',
+    )
     parser.add_argument(
         '--loop',
         default=5,
         type=int,
         help='loop, how many times to run the query, only use the best one',
     )
+    parser.add_argument(
+        '--loop-mode',
+        default='fixed',
+        choices=LOOP_MODES,
+        help='fixed: run --loop times and use the best one,'
+        ' adaptive: loop until QPS and p99 converge, report median and confidence interval',
+    )
+    parser.add_argument(
+        '--ci-width',
+        default=0.05,
+        type=float,
+        help='target relative confidence interval width, only used with --loop-mode adaptive',
+    )
+    parser.add_argument(
+        '--min-loop',
+        default=3,
+        type=int,
+        help='min loops, only used with --loop-mode adaptive',
+    )
+    parser.add_argument(
+        '--max-loop',
+        default=100,
+        type=int,
+        help='max loops, only used with --loop-mode adaptive',
+    )
+    parser.add_argument(
+        '--time-budget',
+        default=300,
+        type=float,
+        help='time budget(seconds) per query args, only used with --loop-mode adaptive',
+    )
     parser.add_argument(
         '--dataset',
         default='',
-        help='Dataset file, if not set will generate random dataset',
+        help='Dataset file, hdf5 or big-ann-benchmarks binary(.fvecs/.bvecs/.fbin/.u8bin/.i8bin),'
+        ' if not set will generate random dataset',
+    )
+    parser.add_argument(
+        '--dataset-args',
+        default={},
+        type=load_dict,
+        help='Dataset args, comma separated key=value, e.g. lazy=1,chunk_size=100000'
+        ' to read data by chunks when used instead of loading it upfront,'
+        ' query=<file>,ground_truth=<file>,metric=l2,begin=0,end=<n> for big-ann-benchmarks binary dataset',
     )
     parser.add_argument(
         '--result', default='', type=pth_file_path, help='Result file, if not set will print to stdout'
@@ -383,6 +689,35 @@ def test_main():
             opts.loop,
             opts.step,
             opts.count,
+            dataset_args=opts.dataset_args,
+            executor=opts.executor,
+            concurrency=opts.concurrency,
+            load_rates=opts.load_rates,
+            arrival=opts.arrival,
+            recall_at=opts.recall_at,
+            loop_mode=opts.loop_mode,
+            ci_width=opts.ci_width,
+            min_loop=opts.min_loop,
+            max_loop=opts.max_loop,
+            time_budget=opts.time_budget,
+            tune=opts.tune,
+            workload=opts.workload,
+            mixed_holdback=opts.mixed_holdback,
+            insert_rate=opts.insert_rate,
+            churn_fraction=opts.churn_fraction,
+            churn_cycles=opts.churn_cycles,
+            index_cache=opts.index_cache,
+            index_cache_size=opts.index_cache_size,
+            train_sizes=opts.train_sizes,
+            auto_experiments=opts.auto_experiments,
+            thread_budget=opts.thread_budget,
+            omp_threads=opts.omp_threads,
+            pin=opts.pin,
+            thread_grid=opts.thread_grid,
+            fanout_baseline=opts.fanout_baseline,
+            insert_chunk=opts.insert_chunk,
+            insert_writers=opts.insert_writers,
+            insert_prefetch=opts.insert_prefetch,
         )
 
 
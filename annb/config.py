@@ -9,12 +9,44 @@ default:
   index_dim: <the default index dimension, if not set use from dataset>
   index_metric_type: <the default index metric type, if not set use from dataset>
   index_args: <the default index args, if not set use {}>
-  query_args: <the default query args, if not set use {}>
+  query_args: <the default query args, if not set use {}, or auto to explore the pareto optimal query args of the built index(faiss OperatingPoints)>
+  auto_sample: <number of test queries used to explore query args for auto query args, if not set use 1000>
+  auto_experiments: <max query args combinations tried for auto query args, if not set use 100>
+  tune: <tune a monotone search parameter to reach target recall instead of query_args, e.g. {param: nprobe, target_recall: 0.95, min: 1, max: 4096, sample: 1000}, if not set no tuning>
+  workload: <search, mixed(insert while searching) or churn(remove and insert between searches), if not set use search>
+  mixed_holdback: <fraction of data inserted while searching for mixed workload, if not set use 0.5>
+  insert_rate: <insert rate(vectors/s) for mixed workload, 0 for as fast as possible, if not set use 0>
+  insert_batch: <vectors per insert for mixed workload, if not set use 1000>
+  churn_fraction: <fraction of data removed and inserted per cycle for churn workload, if not set use 0.1>
+  churn_cycles: <number of cycles for churn workload, if not set use 5>
+  churn_seed: <random seed choosing removed items for churn workload, if not set use 0>
+  index_cache: <load the built index from the on-disk cache, build and save it on miss, if not set use false>
+  index_cache_size: <max size(GiB) of the index cache, if not set use 16>
+  insert_chunk: <rows per add when building the index, 0 for the chunks of the dataset, if not set use 0>
+  insert_writers: <parallel writers adding chunks, only for indexes supporting parallel add(e.g. milvus), if not set use 1>
+  insert_prefetch: <chunks read ahead from the dataset while adding, if not set use 2>
+  train_sizes: <train sample sizes swept, counts(> 1) or fractions(<= 1), the index is rebuilt and searched for each, if not set use []>
   topk: <the default topk, if not set use 10>
+  recall_at: <extra k values(<= topk) to report recall@k, if not set use []>
   step: <the default step, if not set use 10>
   jobs: <the default jobs, if not set use 1>
+  executor: <the default executor for jobs, thread, process or async, if not set use thread>
+  concurrency: <outstanding searches per job for async executor, if not set use 16>
+  thread_budget: <threads partitioned between jobs and intra-query(OpenMP) threads of each job, 0 for all cores, if not set threads are not controlled>
+  omp_threads: <intra-query threads per job, 0 for thread_budget // jobs, if not set use 0>
+  pin: <pin each job to its own cores, if not set use false>
+  thread_grid: <(jobs, omp_threads) layouts swept for each query args, e.g. [[1, 8], [2, 4], [8, 1]] or [1x8, 2x4, 8x1], if not set use []>
+  fanout_baseline: <also build the single index of a sharded/replicated index(e.g. index_args {shards: 4}) and report the fan-out overhead against it, if not set use false>
+  load_rates: <open-loop target arrival rates(queries/s) swept for each query args, if not set use []>
+  arrival: <open-loop arrival process, constant or poisson, if not set use constant>
   loop: <the default loop, if not set use 5>
+  loop_mode: <fixed or adaptive, if not set use fixed>
+  min_loop: <min loops for adaptive loop mode, if not set use 3>
+  max_loop: <max loops for adaptive loop mode, if not set use 100>
+  ci_width: <target relative confidence interval width for adaptive loop mode, if not set use 0.05>
+  time_budget: <time budget(seconds) per query args for adaptive loop mode, if not set use 300>
   dataset: <the default dataset, if not set use annb.RandomDataset>
+  dataset_args: <the default dataset args, e.g. {lazy: true, chunk_size: 100000} to read data by chunks when used, {train_size: 0.1, train_sampling: stratified} to train on a sample, if not set use {}>
   result: <the default result file, if not set use None>
 
 runs:
@@ -69,6 +101,7 @@ def load_configs(filename: str):
         "topk": 10,
         "step": 10,
         "jobs": 1,
+        "executor": "thread",
         "loop": 5,
         "dataset": "annb.RandomDataset",
         "result": None,
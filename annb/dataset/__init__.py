@@ -1,5 +1,17 @@
 from .base_dataset import BaseDataset
+from .bigann_dataset import BigAnnDataset
+from .cache import DatasetCache
 from .hdf5_dataset import AnnbHdf5Dataset, Hdf5Dataset
 from .random_dataset import RandomDataset
+from .synthetic import SyntheticGenerator, generate_dataset
 
-__all__ = ['Hdf5Dataset', 'AnnbHdf5Dataset', 'BaseDataset', 'RandomDataset']
+__all__ = [
+    'Hdf5Dataset',
+    'AnnbHdf5Dataset',
+    'BaseDataset',
+    'BigAnnDataset',
+    'DatasetCache',
+    'RandomDataset',
+    'SyntheticGenerator',
+    'generate_dataset',
+]
@@ -1,20 +1,67 @@
 from abc import ABC, abstractmethod
+from hashlib import sha1
+from typing import Iterator, Union
 import numpy as np
 
 from ..indexes import MetricType
 
+SAMPLINGS = ('uniform', 'stratified')
+
+
+def hash_rows(sha1sum, rows, end: Union[int, None] = None) -> None:
+    """
+    Update the hash with the shape, type and contents of rows [0, end).
+    """
+    end = len(rows) if end is None else end
+    sha1sum.update(f'{(end, *rows.shape[1:])}:{rows.dtype};'.encode('utf-8'))
+    # hash by chunks of rows, so that no full copy is made
+    step = max(1, (1 << 24) // max(1, rows[:1].nbytes))
+    for i in range(0, end, step):
+        sha1sum.update(np.ascontiguousarray(rows[i : min(i + step, end)]).data)
+
+
+def fingerprint_rows(rows, end: Union[int, None] = None) -> str:
+    """
+    Hash of rows [0, end) of an array.
+    """
+    sha1sum = sha1()
+    hash_rows(sha1sum, rows, end)
+    return sha1sum.hexdigest()
+
 
 class BaseDataset(ABC):
     name = 'Dataset'
     metric_type = MetricType.L2
     dimension = 0
     count = 0
+    # rows per chunk of iter_data/iter_train, 0 for all rows in one chunk
+    chunk_size = 0
+    # rows of train used for training, a count(> 1) or a fraction, 0 for all
+    train_size = 0
+    train_sampling = 'uniform'
+    train_seed = 0
+    # train_size of datasets read lazily if not set, training concatenates
+    # the train rows in memory
+    lazy_train_size = 1000000
 
     def __init__(self, **kwargs):
         """
         :param dataset_name: Name of the dataset.
+        :param chunk_size: Rows per chunk of iter_data/iter_train.
+        :param train_size: Train on a sample of train, a count(> 1) or a
+            fraction(<= 1) of the rows, 0 for all rows.
+        :param train_sampling: uniform(random rows) or stratified(a random
+            row of each of train_size equal ranges of rows, covers data
+            ordered by source or time evenly), default uniform.
+        :param train_seed: Seed of the sample, default 0.
         """
         self.kwargs = kwargs
+        self.chunk_size = int(kwargs.get('chunk_size', self.chunk_size))
+        self.train_sampling = str(kwargs.get('train_sampling', self.train_sampling)).lower()
+        if self.train_sampling not in SAMPLINGS:
+            raise ValueError(f'Unknown train sampling: {self.train_sampling}')
+        self.train_seed = int(kwargs.get('train_seed', self.train_seed))
+        self.set_train_size(kwargs.get('train_size', self.train_size))
 
     @property
     @abstractmethod
@@ -57,9 +104,82 @@ class BaseDataset(ABC):
         """
         pass
 
+    def iter_data(
+        self, begin: int = 0, end: Union[int, None] = None
+    ) -> Iterator[np.ndarray]:
+        """
+        Rows [begin, end) of data by chunks, see chunk_size.
+        """
+        return self.iter_rows(self.data, begin, end)
+
+    def iter_train(self) -> Iterator[np.ndarray]:
+        """
+        Train data(or its sample, see train_size) by chunks, see chunk_size.
+        """
+        return self.iter_rows(self.train_sample(), 0, None)
+
+    def set_train_size(self, train_size: Union[int, float, None]) -> None:
+        """
+        Set the train sample size, see train_size.
+        """
+        self.train_size = float(train_size or 0)
+        self.train_ids_ = None
+        self.fingerprint_ = None
+
+    def train_sample_ids(self) -> Union[np.ndarray, None]:
+        """
+        Sorted ids of the train sample, None for all rows.
+        """
+        count = len(self.train)
+        size = self.train_size
+        size = int(size) if size > 1 else int(round(size * count))
+        if size <= 0 or size >= count:
+            return None
+        if getattr(self, 'train_ids_', None) is None:
+            rng = np.random.default_rng(self.train_seed)
+            if self.train_sampling == 'stratified':
+                bounds = np.linspace(0, count, size + 1).astype(np.int64)
+                widths = bounds[1:] - bounds[:-1]
+                ids = bounds[:-1] + (rng.random(size) * widths).astype(np.int64)
+            else:
+                ids = np.sort(rng.choice(count, size, replace=False))
+            self.train_ids_ = ids
+        return self.train_ids_
+
+    def train_sample(self):
+        """
+        Rows of train used for training, only the sampled rows are read.
+        """
+        ids = self.train_sample_ids()
+        if ids is None:
+            return self.train
+        return self.train[ids]
+
+    def iter_rows(self, rows, begin: int, end: Union[int, None]) -> Iterator[np.ndarray]:
+        end = len(rows) if end is None else end
+        if self.chunk_size <= 0:
+            yield rows[begin:end]
+            return
+        for i in range(begin, end, self.chunk_size):
+            yield rows[i : min(i + self.chunk_size, end)]
+
     @abstractmethod
     def fit(self):
         """
         Fit the dataset for training/add/query.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the train(sample) and data contents, as the key of things
+        built from the data, e.g. cached indexes. Computed once per dataset.
+        """
+        if getattr(self, 'fingerprint_', None) is None:
+            sha1sum = sha1()
+            train = self.train_sample()
+            hash_rows(sha1sum, train)
+            if self.data is not train:
+                hash_rows(sha1sum, self.data)
+            self.fingerprint_ = sha1sum.hexdigest()
+        return self.fingerprint_
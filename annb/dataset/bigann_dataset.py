@@ -0,0 +1,248 @@
+from os import path
+from typing import Tuple, Union
+
+import numpy as np
+
+from ..indexes import MetricType
+from .base_dataset import BaseDataset
+from .lazy import LazyArray, fit_dtype, normalize_rows
+from .groundtruth_store import GroundTruthStore
+
+# element type of each format, *vecs files prefix each vector with an int32
+# dimension, *bin files have a (uint32 count, uint32 dimension) header
+VECS_TYPES = {
+    '.fvecs': np.float32,
+    '.ivecs': np.int32,
+    '.bvecs': np.uint8,
+}
+BIN_TYPES = {
+    '.fbin': np.float32,
+    '.u8bin': np.uint8,
+    '.i8bin': np.int8,
+    '.ibin': np.int32,
+}
+FORMATS = tuple(VECS_TYPES) + tuple(BIN_TYPES)
+
+
+def file_format(file: str) -> str:
+    ext = path.splitext(file)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f'Unknown vectors format: {file}')
+    return ext
+
+
+def vector_range(file: str, count: int, begin: int, end: Union[int, None]) -> int:
+    """
+    Check [begin, end) against the count of vectors in file.
+    :return: end, clamped to count.
+    """
+    end = count if end is None else min(end, count)
+    if not 0 <= begin <= end:
+        raise ValueError(f'Invalid range [{begin}, {end}) of {count} vectors in {file}')
+    return end
+
+
+def read_vectors(file: str, begin: int = 0, end: Union[int, None] = None) -> np.ndarray:
+    """
+    Map vectors [begin, end) of a big-ann-benchmarks binary file, without
+    reading or copying them.
+    :param file: Path of .fvecs/.ivecs/.bvecs/.fbin/.u8bin/.i8bin/.ibin file.
+    :param begin: First vector.
+    :param end: End of vectors, None for all.
+    :return: Read only 2-d memmap view.
+    """
+    ext = file_format(file)
+    if ext in VECS_TYPES:
+        dtype = np.dtype(VECS_TYPES[ext])
+        dimension = int(np.fromfile(file, dtype=np.int32, count=1)[0])
+        # each row is the int32 dimension followed by the vector
+        row_bytes = 4 + dimension * dtype.itemsize
+        count = path.getsize(file) // row_bytes
+        end = vector_range(file, count, begin, end)
+        if begin == end:
+            return np.empty((0, dimension), dtype=dtype)
+        rows = np.memmap(
+            file,
+            dtype=np.uint8,
+            mode='r',
+            offset=begin * row_bytes,
+            shape=(end - begin, row_bytes),
+        )
+        return rows[:, 4:].view(dtype)
+    dtype = np.dtype(BIN_TYPES[ext])
+    count, dimension = np.fromfile(file, dtype=np.uint32, count=2)
+    end = vector_range(file, int(count), begin, end)
+    if begin == end:
+        return np.empty((0, int(dimension)), dtype=dtype)
+    return np.memmap(
+        file,
+        dtype=dtype,
+        mode='r',
+        offset=8 + begin * int(dimension) * dtype.itemsize,
+        shape=(end - begin, int(dimension)),
+    )
+
+
+def write_vectors(file: str, vectors: np.ndarray) -> None:
+    """
+    Write vectors in the format of the file extension.
+    """
+    ext = file_format(file)
+    if ext in VECS_TYPES:
+        vectors = np.ascontiguousarray(vectors, dtype=VECS_TYPES[ext])
+        count, dimension = vectors.shape
+        header = np.full((count, 1), dimension, dtype=np.int32).view(np.uint8)
+        rows = np.hstack([header, vectors.view(np.uint8).reshape(count, -1)])
+        rows.tofile(file)
+        return
+    vectors = np.ascontiguousarray(vectors, dtype=BIN_TYPES[ext])
+    with open(file, 'wb') as f:
+        np.array(vectors.shape, dtype=np.uint32).tofile(f)
+        vectors.tofile(f)
+
+
+def create_vectors(file: str, count: int, dimension: int) -> np.ndarray:
+    """
+    Create a file of count vectors in the format of the file extension and
+    map it for writing, so vectors could be written by chunks.
+    :return: Writable 2-d memmap view, flush it after writing.
+    """
+    ext = file_format(file)
+    if ext in VECS_TYPES:
+        dtype = np.dtype(VECS_TYPES[ext])
+        row_bytes = 4 + dimension * dtype.itemsize
+        rows = np.memmap(file, dtype=np.uint8, mode='w+', shape=(count, row_bytes))
+        rows[:, :4] = np.array([dimension], dtype=np.int32).view(np.uint8)
+        return rows[:, 4:].view(dtype)
+    with open(file, 'wb') as f:
+        np.array((count, dimension), dtype=np.uint32).tofile(f)
+    return np.memmap(
+        file, dtype=BIN_TYPES[ext], mode='r+', offset=8, shape=(count, dimension)
+    )
+
+
+def read_ground_truth(file: str) -> Tuple[np.ndarray, Union[np.ndarray, None]]:
+    """
+    Read ground truth of big-ann-benchmarks(.bin: uint32 count and k header,
+    int32 ids, then float32 distances) or an .ivecs of ids.
+    :return: (neighbors, distances), distances is None for .ivecs.
+    """
+    if file.lower().endswith('.ivecs'):
+        return np.array(read_vectors(file), dtype=np.int64), None
+    count, k = (int(v) for v in np.fromfile(file, dtype=np.uint32, count=2))
+    neighbors = np.fromfile(file, dtype=np.int32, count=count * k, offset=8)
+    distances = np.fromfile(file, dtype=np.float32, count=count * k, offset=8 + count * k * 4)
+    return neighbors.reshape(count, k).astype(np.int64), distances.reshape(count, k)
+
+
+def write_ground_truth(file: str, neighbors: np.ndarray, distances: np.ndarray) -> None:
+    """
+    Write ground truth in the big-ann-benchmarks .bin format.
+    """
+    with open(file, 'wb') as f:
+        np.array(neighbors.shape, dtype=np.uint32).tofile(f)
+        np.ascontiguousarray(neighbors, dtype=np.int32).tofile(f)
+        np.ascontiguousarray(distances, dtype=np.float32).tofile(f)
+
+
+class BigAnnDataset(BaseDataset):
+    """
+    Dataset from big-ann-benchmarks binary files, the base vectors are
+    memory mapped and read only when used, like a lazy hdf5 dataset.
+    """
+
+    def __init__(self, file: str, **kwargs):
+        """
+        :param file: Path of the base vectors.
+        :param query: Path of the query vectors.
+        :param ground_truth: Path of the ground truth of the queries against
+            the base vectors in [begin, end), computed and kept in a sidecar
+            file next to the base vectors if not set.
+        :param train: Path of the train vectors, use the base vectors if not set.
+            The index is trained on lazy_train_size rows if train_size is not set.
+        :param metric: Metric type, l2, ip/angular, or hamming/jaccard of
+            packed bits(.u8bin), default l2.
+        :param begin: First base vector of the subset, default 0.
+        :param end: End of base vectors of the subset, default all.
+        """
+        super().__init__(**kwargs)
+        if 'query' not in kwargs:
+            raise ValueError('query file is required for big-ann dataset')
+        self.file = file
+        self.metric_type = MetricType.from_text(str(kwargs.get('metric', 'l2')))
+        begin = int(kwargs.get('begin', 0))
+        end = kwargs.get('end', None)
+        end = None if end is None else int(end)
+        base = read_vectors(file, begin, end)
+        self.data_ = LazyArray(base, base.dtype)
+        self.train_ = self.data_
+        if kwargs.get('train'):
+            train = read_vectors(kwargs['train'])
+            self.train_ = LazyArray(train, train.dtype)
+        self.test_data_ = np.array(read_vectors(kwargs['query']))
+        self.ground_truth_ = None
+        if kwargs.get('ground_truth'):
+            self.ground_truth_ = read_ground_truth(kwargs['ground_truth'])
+        self.dimension = base.shape[1]
+        if self.metric_type.binary:
+            # packed bits, 8 dimensions per byte
+            self.dimension *= 8
+        self.count = base.shape[0]
+        self.name = path.basename(file)
+        if begin or end is not None:
+            self.name += f'[{begin}:{begin + self.count}]'
+        if self.chunk_size <= 0:
+            self.chunk_size = 100000
+        if 'train_size' not in kwargs:
+            self.set_train_size(self.lazy_train_size)
+
+    def __str__(self) -> str:
+        return (
+            f'<{self.__class__.__name__}({self.name}, m={self.metric_type.name},'
+            f' d={self.dimension}, nb={self.count})>'
+        )
+
+    def fit(self):
+        dtype = fit_dtype(self.data_.dtype, self.metric_type)
+        transform = None
+        if self.metric_type == MetricType.INNER_PRODUCT:
+            transform = normalize_rows
+        self.data_ = LazyArray(self.data_.rows, dtype, transform)
+        if self.train_.rows is not self.data_.rows:
+            self.train_ = LazyArray(self.train_.rows, dtype, transform)
+        else:
+            self.train_ = self.data_
+        self.test_data_ = self.test_data_.astype(dtype)
+        if transform:
+            self.test_data_ = transform(self.test_data_)
+
+    @property
+    def data(self) -> np.ndarray:
+        return self.data_
+
+    @property
+    def train(self) -> np.ndarray:
+        return self.train_
+
+    @property
+    def test(self) -> np.ndarray:
+        return self.test_data_
+
+    def load_ground_truth(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.ground_truth_ is None:
+            # one sidecar per base file, a larger end of the same base extends it
+            store = GroundTruthStore(f'{self.file}.groundtruth.npz')
+            distances, neighbors = store.get(self.test_data_, self.data_, self.metric_type)
+            self.ground_truth_ = (neighbors, distances)
+        return self.ground_truth_
+
+    @property
+    def ground_truth_neighbors(self) -> np.ndarray:
+        return self.load_ground_truth()[0]
+
+    @property
+    def ground_truth_distances(self) -> np.ndarray:
+        distances = self.load_ground_truth()[1]
+        if distances is None:
+            raise RuntimeError('ground truth file has no distances')
+        return distances
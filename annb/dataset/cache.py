@@ -0,0 +1,56 @@
+from collections import Counter
+from logging import getLogger
+from os import path
+from typing import Callable, Dict, Union
+
+logger = getLogger('annb')
+
+
+class DatasetCache:
+    """
+    Process level cache of fitted datasets, shared by the runs of a run file.
+    The runs using each dataset are counted upfront by expect, an entry is
+    freed when its last run releases it.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.remaining = Counter()
+
+    @staticmethod
+    def key(
+        dataset_file: str,
+        dimension: int,
+        metric_type: str,
+        count: int,
+        dataset_args: Union[Dict, None] = None,
+    ):
+        """
+        Key by the dataset file, or by the options of the random dataset,
+        and the dataset args changing how it is loaded and fitted.
+        """
+        options = tuple(sorted((dataset_args or {}).items()))
+        if dataset_file:
+            return path.abspath(dataset_file), None, None, None, options
+        return None, dimension, metric_type, count, options
+
+    def expect(self, key):
+        self.remaining[key] += 1
+
+    def get(self, key, load: Callable):
+        """
+        :param load: Called to load the dataset on miss.
+        :return: The loaded dataset entry.
+        """
+        if key not in self.entries:
+            self.entries[key] = load()
+        else:
+            logger.info('reuse loaded dataset: %s', key)
+        return self.entries[key]
+
+    def release(self, key):
+        self.remaining[key] -= 1
+        if self.remaining[key] <= 0:
+            del self.remaining[key]
+            if self.entries.pop(key, None) is not None:
+                logger.debug('free dataset: %s', key)
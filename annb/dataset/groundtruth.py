@@ -0,0 +1,156 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import numpy as np
+
+from ..indexes import MetricType
+
+# default memory budget(bytes) of blocked_knn tiles and data blocks
+MEMORY_BUDGET = 1 << 30
+# bytes per element of a tile, float32 scores and the int64 argpartition
+TILE_ELEMENT_BYTES = 12
+
+
+def merge_topk(
+    scores: np.ndarray, ids: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the k smallest scores of each row, unordered.
+    """
+    if scores.shape[1] <= k:
+        return scores, ids
+    part = np.argpartition(scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, part, axis=1), np.take_along_axis(ids, part, axis=1)
+
+
+def block_rows(
+    dimension: int, query_block: int, data_block: int, threads: int, memory: int
+) -> int:
+    """
+    Data rows per block of blocked_knn within the memory budget.
+    :param dimension: Dimension of the float32 rows.
+    :param query_block: Queries per tile.
+    :param data_block: Data rows per tile, at most.
+    :param threads: Number of threads, each with a tile.
+    :param memory: Memory budget in bytes, 0 for unbounded.
+    :return: Data rows per block, at least 1.
+    """
+    if not memory:
+        return data_block
+    row_bytes = 2 * dimension * 4 + threads * query_block * TILE_ELEMENT_BYTES
+    return max(1, min(data_block, memory // row_bytes))
+
+
+def blocked_knn(
+    query: np.ndarray,
+    data,
+    k: int,
+    metric_type: MetricType,
+    query_block: int = 1024,
+    data_block: int = 16384,
+    threads: int = 0,
+    memory: int = MEMORY_BUDGET,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact k nearest neighbors by brute force over query x data tiles.
+
+    Data is streamed block by block(the next block is read while the
+    current one is searched), so it could be a memmap or a lazy array
+    larger than memory. Distances of a tile are computed by one matrix
+    multiply(||q||^2 - 2q.x + ||x||^2 for l2), then merged into the running
+    top-k of each query with argpartition. Query blocks of a data block are
+    spread across a thread pool, numpy releases the GIL in BLAS. Each
+    thread holds a query_block x data_block tile, data_block is shrunk so the
+    tiles and the two data blocks(current and prefetched) fit in memory.
+
+    Binary(packed bits) vectors are unpacked to 0/1 per block, so hamming
+    is |q| + |x| - 2q.x and jaccard similarity is q.x / (|q| + |x| - q.x).
+
+    :param query: Queries.
+    :param data: Data, any 2-d array supporting len and row slicing, of any
+        element type, converted to float32 per block.
+    :param k: Number of nearest neighbors.
+    :param metric_type: L2, INNER_PRODUCT, HAMMING or JACCARD.
+    :param query_block: Queries per tile.
+    :param data_block: Data rows per tile, at most.
+    :param threads: Number of threads, 0 for cpu count.
+    :param memory: Memory budget in bytes, 0 for unbounded.
+    :return: (distances, ids) in the order of faiss knn, squared l2 or
+        hamming ascending, inner product or jaccard descending, missing
+        neighbors are -1.
+    """
+    binary = metric_type.binary
+
+    def to_float(rows):
+        if binary:
+            return np.unpackbits(np.asarray(rows, dtype=np.uint8), axis=1).astype(np.float32)
+        return np.ascontiguousarray(rows, dtype=np.float32)
+
+    query = to_float(query)
+    query_count = len(query)
+    query_block = max(1, min(query_block, query_count))
+    # no more threads than query blocks, each one holds a tile
+    threads = max(1, min(threads or os.cpu_count(), -(-query_count // query_block)))
+    data_block = block_rows(query.shape[1], query_block, data_block, threads, memory)
+    # norms are popcounts for binary vectors
+    l2 = metric_type in (MetricType.L2, MetricType.HAMMING)
+    jaccard = metric_type == MetricType.JACCARD
+    query_norms = np.einsum('ij,ij->i', query, query) if l2 or jaccard else None
+    # running top-k, scores are smaller for nearer(negated inner product)
+    top_scores = np.full((query_count, k), np.inf, dtype=np.float32)
+    top_ids = np.full((query_count, k), -1, dtype=np.int64)
+    query_blocks = [
+        (begin, min(begin + query_block, query_count))
+        for begin in range(0, query_count, query_block)
+    ]
+
+    def read(begin):
+        return to_float(data[begin : begin + data_block])
+
+    def search(block, block_begin, block_norms, query_range):
+        begin, end = query_range
+        scores = query[begin:end] @ block.T
+        if l2:
+            scores *= -2.0
+            scores += query_norms[begin:end, np.newaxis]
+            scores += block_norms[np.newaxis, :]
+            np.maximum(scores, 0.0, out=scores)
+        elif jaccard:
+            union = query_norms[begin:end, np.newaxis] + block_norms[np.newaxis, :] - scores
+            # two empty sets are the same
+            np.divide(scores, union, out=scores, where=union > 0)
+            scores[union <= 0] = 1.0
+            np.negative(scores, out=scores)
+        else:
+            np.negative(scores, out=scores)
+        ids = np.broadcast_to(
+            np.arange(block_begin, block_begin + len(block), dtype=np.int64), scores.shape
+        )
+        scores, ids = merge_topk(scores, ids, k)
+        top_scores[begin:end], top_ids[begin:end] = merge_topk(
+            np.hstack([top_scores[begin:end], scores]),
+            np.hstack([top_ids[begin:end], ids]),
+            k,
+        )
+
+    data_count = len(data)
+    with ThreadPoolExecutor(1) as reader, ThreadPoolExecutor(threads) as pool:
+        next_block = reader.submit(read, 0) if data_count else None
+        for block_begin in range(0, data_count, data_block):
+            block = next_block.result()
+            if block_begin + data_block < data_count:
+                next_block = reader.submit(read, block_begin + data_block)
+            block_norms = np.einsum('ij,ij->i', block, block) if l2 or jaccard else None
+            list(
+                pool.map(
+                    lambda query_range: search(block, block_begin, block_norms, query_range),
+                    query_blocks,
+                )
+            )
+    order = np.argsort(top_scores, axis=1, kind='stable')
+    distances = np.take_along_axis(top_scores, order, axis=1)
+    ids = np.take_along_axis(top_ids, order, axis=1)
+    if not l2:
+        distances = -distances
+    return distances, ids
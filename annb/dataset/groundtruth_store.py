@@ -0,0 +1,123 @@
+import os
+from logging import getLogger
+from typing import Tuple, Union
+
+import numpy as np
+
+from ..indexes import MetricType
+from .base_dataset import fingerprint_rows
+from .groundtruth import merge_topk
+from .utils import generate_groundtruth
+
+
+def merge_ground_truth(
+    first: Tuple[np.ndarray, np.ndarray],
+    second: Tuple[np.ndarray, np.ndarray],
+    metric_type: MetricType,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge the (distances, ids) of the same queries against two disjoint
+    parts of the data into the top-k of the whole, missing ids are -1.
+    """
+    k = first[1].shape[1]
+    distances = np.hstack([first[0], second[0]]).astype(np.float32)
+    ids = np.hstack([first[1], second[1]])
+    # scores are smaller for nearer, missing neighbors are the farthest
+    scores = -distances if metric_type.similarity else distances
+    scores = np.where(ids >= 0, scores, np.inf)
+    scores, ids = merge_topk(scores, ids, k)
+    order = np.argsort(scores, axis=1, kind='stable')
+    ids = np.take_along_axis(ids, order, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    distances = -scores if metric_type.similarity else scores
+    return distances, ids
+
+
+class GroundTruthStore:
+    """
+    Ground truth of queries against data, memoized in memory and persisted
+    to a sidecar file(e.g. next to the dataset file) if set.
+
+    Entries are keyed by the query fingerprint and the metric, each entry
+    records the fingerprint and the count of the data it is computed on.
+    When the data is the recorded data with rows appended, only the new
+    rows are searched and merged into the recorded top-k. The sidecar keeps
+    the last computed entry.
+    """
+
+    def __init__(self, sidecar: Union[str, None] = None):
+        """
+        :param sidecar: Path of the sidecar(.npz) file, None for memory only.
+        """
+        self.sidecar = sidecar
+        self.entries = {}
+        self.log = getLogger('annb')
+
+    def load(self, key: str) -> Union[dict, None]:
+        if key in self.entries:
+            return self.entries[key]
+        if self.sidecar is None or not os.path.isfile(self.sidecar):
+            return None
+        with np.load(self.sidecar) as f:
+            if str(f['key']) != key:
+                return None
+            entry = {
+                'count': int(f['count']),
+                'data_fingerprint': str(f['data_fingerprint']),
+                'distances': f['distances'],
+                'ids': f['ids'],
+            }
+        self.entries[key] = entry
+        return entry
+
+    def save(self, key: str, entry: dict) -> None:
+        self.entries[key] = entry
+        if self.sidecar is None:
+            return
+        temp_path = f'{self.sidecar}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                np.savez(f, key=key, **entry)
+            os.replace(temp_path, self.sidecar)
+        except OSError as e:
+            self.log.warning('could not save ground truth to %s: %s', self.sidecar, e)
+
+    def get(
+        self, query: np.ndarray, data, metric_type: MetricType
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param query: Queries.
+        :param data: Data, in memory or lazy/memory mapped.
+        :param metric_type: Metric type.
+        :return: (distances, ids) as generate_groundtruth.
+        """
+        key = f'{fingerprint_rows(query)}:{metric_type.name}'
+        data_fingerprint = fingerprint_rows(data)
+        entry = self.load(key)
+        if entry is not None and entry['data_fingerprint'] == data_fingerprint:
+            return entry['distances'], entry['ids']
+        count = len(data)
+        if (
+            entry is not None
+            and entry['count'] < count
+            and fingerprint_rows(data, entry['count']) == entry['data_fingerprint']
+        ):
+            begin = entry['count']
+            self.log.info('extend ground truth from %d to %d items', begin, count)
+            distances, ids = generate_groundtruth(query, data[begin:count], metric_type)
+            ids = np.where(ids >= 0, ids + begin, -1)
+            distances, ids = merge_ground_truth(
+                (entry['distances'], entry['ids']), (distances, ids), metric_type
+            )
+        else:
+            distances, ids = generate_groundtruth(query, data, metric_type)
+        self.save(
+            key,
+            {
+                'count': count,
+                'data_fingerprint': data_fingerprint,
+                'distances': distances,
+                'ids': ids,
+            },
+        )
+        return distances, ids
@@ -5,7 +5,8 @@ import numpy as np
 
 from ..indexes import MetricType
 from .base_dataset import BaseDataset
-from .utils import generate_groundtruth
+from .lazy import LazyArray, fit_dtype, normalize_rows, open_rows, pack_rows
+from .groundtruth_store import GroundTruthStore
 
 
 class Hdf5Dataset(BaseDataset):
@@ -17,6 +18,9 @@ class Hdf5Dataset(BaseDataset):
     def __init__(self, file: Union[str, h5.File], **kwargs):
         """
         :param file: Path or hdf5 file to the dataset file.
+        :param lazy: Read train rows from the file only when accessed, by
+            mmap if stored contiguous, instead of loading them upfront. The
+            index is trained on lazy_train_size rows if train_size is not set.
         """
         super().__init__(**kwargs)
         if isinstance(file, str):
@@ -25,7 +29,16 @@ class Hdf5Dataset(BaseDataset):
             self.hd5_file = file
         self.validate()
         # load the data
-        self.data_ = np.array(self.hd5_file['train'])
+        self.lazy = str(kwargs.get('lazy', False)).lower() in ('yes', 'true', '1', 'on')
+        if self.lazy:
+            train = self.hd5_file['train']
+            self.data_ = LazyArray(open_rows(train), train.dtype)
+            if self.chunk_size <= 0:
+                self.chunk_size = 100000
+            if 'train_size' not in kwargs:
+                self.set_train_size(self.lazy_train_size)
+        else:
+            self.data_ = np.array(self.hd5_file['train'])
         self.test_data_ = np.array(self.hd5_file['test'])
         if 'dimension' in self.hd5_file.attrs:
             self.dimension = self.hd5_file.attrs['dimension']
@@ -34,7 +47,13 @@ class Hdf5Dataset(BaseDataset):
             self.dimension = self.data.shape[1]
             self.count = self.data.shape[0]
         self.metric_type = MetricType.from_text(str(self.hd5_file.attrs['distance']))
+        if self.metric_type.binary and self.data.dtype != np.bool_:
+            # packed bits, 8 dimensions per byte
+            self.dimension *= 8
         self.name = path.basename(self.hd5_file.filename)
+        # read from the file once when first used
+        self.ground_truth_distances_ = None
+        self.ground_truth_neighbors_ = None
 
 
     def __str__(self) -> str:
@@ -95,6 +114,8 @@ class Hdf5Dataset(BaseDataset):
         """
 
         def get_distance_text(the_metric: MetricType) -> str:
+            if the_metric.binary:
+                return the_metric.name.lower()
             return 'euclidean' if the_metric == MetricType.L2 else 'angular'
 
         if normalize and metric == MetricType.L2:
@@ -119,13 +140,14 @@ class Hdf5Dataset(BaseDataset):
             test_size = min(data_and_train.shape[0], 10000)
             test = data_and_train[:test_size]
             neighbors, distances = None, None
-        else:
+        elif normalize:
             # normalize for test data
             test /= np.linalg.norm(test, axis=1)[:, np.newaxis]
 
         if neighbors is None or distances is None:
             if ground_truth:
-                distances, neighbors = generate_groundtruth(
+                # reused if the same data and test are created again
+                distances, neighbors = GroundTruthStore(f'{output}.groundtruth.npz').get(
                     test, data_and_train, metric
                 )
             else:
@@ -159,14 +181,18 @@ class Hdf5Dataset(BaseDataset):
         """
         Return dataset data.
         """
-        return np.array(self.hd5_file['distances'])
+        if self.ground_truth_distances_ is None:
+            self.ground_truth_distances_ = np.array(self.hd5_file['distances'])
+        return self.ground_truth_distances_
 
     @property
     def ground_truth_neighbors(self) -> np.ndarray:
         """
         Return dataset ground truth.
         """
-        return np.array(self.hd5_file['neighbors'])
+        if self.ground_truth_neighbors_ is None:
+            self.ground_truth_neighbors_ = np.array(self.hd5_file['neighbors'])
+        return self.ground_truth_neighbors_
 
 
 class AnnbHdf5Dataset(Hdf5Dataset):
@@ -216,12 +242,35 @@ class AnnbHdf5Dataset(Hdf5Dataset):
         )
 
     def fit(self):
-        # format float32 for float index
-        if self.metric_type in (MetricType.L2, MetricType.INNER_PRODUCT):
-            if self.data_.dtype != np.float32:
-                self.data_ = self.data_.astype(np.float32)
+        if self.lazy:
+            self.fit_lazy()
+            return
+        # keep the element type, e.g. uint8, see fit_dtype
+        dtype = fit_dtype(self.data_.dtype, self.metric_type)
+        if self.metric_type.binary and self.data_.dtype == np.bool_:
+            self.data_ = pack_rows(self.data_)
+            self.test_data_ = pack_rows(self.test_data_)
+        if self.data_.dtype != dtype:
+            self.data_ = self.data_.astype(dtype)
         # normalize for angular/ip metric
         if not self.normalized and self.metric_type == MetricType.INNER_PRODUCT:
             self.data_ /= np.linalg.norm(self.data_, axis=1)[:, np.newaxis]
-            self.test_data_ /= np.linalg.norm(self.test_data_, axis=1)[:, np.newaxis]
+            self.test_data_ = normalize_rows(self.test_data_.astype(np.float32))
+            self.normalized = True
+
+    def fit_lazy(self):
+        """
+        Fit lazy data by chunks when they are read, test data is in memory.
+        """
+        dtype = fit_dtype(self.data_.dtype, self.metric_type)
+        transform = None
+        columns = None
+        if self.metric_type.binary and self.data_.dtype == np.bool_:
+            transform = pack_rows
+            columns = (self.data_.shape[1] + 7) // 8
+            self.test_data_ = pack_rows(self.test_data_)
+        if not self.normalized and self.metric_type == MetricType.INNER_PRODUCT:
+            transform = normalize_rows
+            self.test_data_ = normalize_rows(self.test_data_.astype(np.float32))
             self.normalized = True
+        self.data_ = LazyArray(self.data_.rows, dtype, transform, columns)
@@ -0,0 +1,105 @@
+from typing import Callable, Union
+
+import h5py as h5
+import numpy as np
+
+from ..indexes import MetricType
+
+
+def open_rows(dataset: h5.Dataset) -> Union[np.memmap, h5.Dataset]:
+    """
+    Open a 2-d hdf5 dataset for lazy row access.
+    :return: Direct mmap of the file if the dataset is stored contiguous and
+        uncompressed, otherwise the hdf5 dataset read by slicing.
+    """
+    offset = dataset.id.get_offset()
+    if dataset.chunks is None and dataset.compression is None and offset is not None:
+        return np.memmap(
+            dataset.file.filename,
+            dtype=dataset.dtype,
+            mode='r',
+            offset=offset,
+            shape=dataset.shape,
+        )
+    return dataset
+
+
+def normalize_rows(rows: np.ndarray) -> np.ndarray:
+    rows /= np.linalg.norm(rows, axis=1)[:, np.newaxis]
+    return rows
+
+
+def pack_rows(rows: np.ndarray) -> np.ndarray:
+    """
+    Pack rows of 0/1(e.g. bool rows of ann-benchmarks) to bits.
+    """
+    return np.packbits(rows, axis=1)
+
+
+def fit_dtype(dtype: np.dtype, metric_type: MetricType) -> np.dtype:
+    """
+    Element type rows are kept in after fit. Types are not widened, e.g.
+    uint8 and float16 rows stay as they are, indexes convert the chunks
+    they take. float64 is narrowed to float32, inner product is normalized
+    in float32, and binary rows are packed bits.
+    """
+    dtype = np.dtype(dtype)
+    if metric_type.binary:
+        return np.dtype(np.uint8)
+    if metric_type == MetricType.INNER_PRODUCT or dtype == np.float64:
+        return np.dtype(np.float32)
+    return dtype
+
+
+class LazyArray:
+    """
+    Read only 2-d array of rows stored in a file, rows are read and fitted
+    by the transform only when accessed. Supports len, shape, slicing and
+    indexing rows by an int array like numpy arrays.
+    """
+
+    def __init__(
+        self,
+        rows: Union[np.memmap, h5.Dataset],
+        dtype: np.dtype,
+        transform: Union[Callable[[np.ndarray], np.ndarray], None] = None,
+        columns: Union[int, None] = None,
+    ):
+        """
+        :param rows: Rows opened by open_rows.
+        :param dtype: Data type of rows after transform.
+        :param transform: Fit rows read from the file, e.g. normalize.
+        :param columns: Columns of rows after transform, e.g. packed bits,
+            default the columns of rows.
+        """
+        self.rows = rows
+        self.dtype = np.dtype(dtype)
+        self.transform = transform
+        self.columns = rows.shape[1] if columns is None else columns
+
+    @property
+    def shape(self):
+        return (self.rows.shape[0], self.columns)
+
+    @property
+    def ndim(self):
+        return len(self.rows.shape)
+
+    def __len__(self):
+        return self.rows.shape[0]
+
+    def __getitem__(self, key) -> np.ndarray:
+        if isinstance(self.rows, h5.Dataset) and isinstance(key, (list, np.ndarray)):
+            # hdf5 only reads increasing unique rows
+            unique, inverse = np.unique(np.asarray(key), return_inverse=True)
+            rows = self.rows[unique][inverse]
+        else:
+            rows = np.asarray(self.rows[key])
+        rows = rows.astype(self.dtype, copy=True)
+        if self.transform:
+            rows = self.transform(rows)
+        return rows
+
+    def __array__(self, dtype=None, copy=None):
+        rows = self[:]
+        return rows if dtype is None else rows.astype(dtype)
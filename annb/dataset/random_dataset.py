@@ -1,14 +1,32 @@
+import json
+
 import numpy as np
 
 from .hdf5_dataset import AnnbHdf5Dataset
+from .synthetic import SyntheticGenerator, generate_dataset
 from ..indexes import MetricType
 
 
 class RandomDataset(AnnbHdf5Dataset):
     def __init__(self, file: str, **kwargs):
+        """
+        :param file: Path of the hdf5 file, generated if not exists or not
+            generated by the same args.
+        :param metric: Metric type, default l2.
+        :param dimension: Dimension, default 256.
+        :param count: Count, default 1000000.
+        :param normalize: Normalize data, only for angular/ip metric.
+        :param ground_truth: Generate ground truth, default True.
+        :param test_count: Number of queries, default min(count, 10000).
+        :param queries: data to query the first data rows, separate to draw
+            the queries apart from the data, default data.
+        Other args are of the SyntheticGenerator, e.g. distribution.
+        """
         metric_type = MetricType.from_text(kwargs.get('metric', 'l2'))
         dims = int(kwargs.get('dimension', 256))
         count = int(kwargs.get('count', 1000000))
+        queries = str(kwargs.get('queries', 'data')).lower()
+        generator = SyntheticGenerator(**{**kwargs, 'dimension': dims})
         try:
             hdfile = AnnbHdf5Dataset.load_hdf5(file)
             temp_dataset = AnnbHdf5Dataset(hdfile)
@@ -25,23 +43,34 @@ class RandomDataset(AnnbHdf5Dataset):
             if temp_dataset.count != count:
                 hdfile.close()
                 raise RuntimeError(f'Count mismatch: {temp_dataset.count} != {count}')
+            synthetic = json.dumps(generator.args(), sort_keys=True)
+            if hdfile.attrs.get('synthetic') != synthetic:
+                hdfile.close()
+                raise RuntimeError('Generator args mismatch')
+            if hdfile.attrs.get('queries', 'data') != queries:
+                hdfile.close()
+                raise RuntimeError(f'Queries mismatch: {queries}')
         except (FileNotFoundError, RuntimeError):
-            metric_type = MetricType.from_text(kwargs.get('metric', 'l2'))
-            dims = int(kwargs.get('dimension', 256))
-            count = int(kwargs.get('count', 1000000))
-            normalize = kwargs.get('normalize', False)
-            data = self.generate_data(dims, count, normalize)
-            ground_truth = kwargs.get('ground_truth', True)
-            AnnbHdf5Dataset.create(
-                file, metric_type, data, normalize=normalize, ground_truth=ground_truth
+            # written by chunks, the data is not held in memory
+            generate_dataset(
+                file,
+                generator,
+                count,
+                metric_type,
+                test_count=kwargs.get('test_count'),
+                normalize=kwargs.get('normalize', False),
+                ground_truth=kwargs.get('ground_truth', True),
+                queries=queries,
             )
             hdfile = AnnbHdf5Dataset.load_hdf5(file)
         super().__init__(hdfile, **kwargs)
 
     @classmethod
-    def generate_data(cls, dimension, count, normalize) -> np.ndarray:
+    def generate_data(cls, dimension, count, normalize, **kwargs) -> np.ndarray:
         """
-        Generate random data.
+        Generate random data, in memory.
         """
-        data = np.random.random((count, dimension)).astype(np.float32)
+        data = SyntheticGenerator(**{**kwargs, 'dimension': dimension}).generate(0, count)
+        if normalize:
+            data /= np.linalg.norm(data, axis=1)[:, np.newaxis]
         return data
@@ -0,0 +1,260 @@
+import json
+from logging import getLogger
+from os import path
+from typing import Iterator, Tuple, Union
+
+import h5py as h5
+import numpy as np
+
+from ..indexes import MetricType
+from .bigann_dataset import (
+    BIN_TYPES,
+    VECS_TYPES,
+    create_vectors,
+    write_ground_truth,
+    write_vectors,
+)
+from .groundtruth_store import merge_ground_truth
+from .lazy import normalize_rows
+from .utils import generate_groundtruth
+
+DISTRIBUTIONS = ('uniform', 'gaussian', 'anisotropic')
+CLUSTER_SIZES = ('equal', 'powerlaw')
+
+# streams of the generator, each seeded separately
+STREAM_DATA = 0
+STREAM_QUERY = 1
+STREAM_PARAMS = 2
+
+# queries of generated datasets: the first data rows, or a separate stream
+QUERIES = ('data', 'separate')
+
+
+class SyntheticGenerator:
+    """
+    Generate vectors block by block, so any row range is reproducible
+    without generating the rows before it.
+
+    Rows are drawn in a latent space of intrinsic_dimension dimensions,
+    then projected to dimension by a random orthonormal basis(plus noise),
+    so that the data lies near a low dimensional subspace like real
+    embeddings.
+
+    Distributions:
+    - uniform: uniform in [0, 1) in the latent space.
+    - gaussian: gaussian mixture of clusters, isotropic with std spread.
+    - anisotropic: gaussian mixture, each cluster with its own axis scales
+      (log-uniform within anisotropy times) and orientation.
+
+    Cluster sizes of mixtures are equal, or follow a power law(zipf) with
+    the size of the i-th cluster proportional to i^-alpha.
+    """
+
+    block_size = 4096
+
+    def __init__(self, dimension: int, **kwargs):
+        """
+        :param dimension: Dimension of generated vectors.
+        :param distribution: uniform, gaussian or anisotropic, default uniform.
+        :param clusters: Number of clusters of mixtures, default 100.
+        :param cluster_sizes: equal or powerlaw, default equal.
+        :param alpha: Exponent of powerlaw cluster sizes, default 1.0.
+        :param spread: Std of rows around the cluster center, centers are
+            standard normal, default 0.3.
+        :param anisotropy: Ratio of the largest to the smallest axis scale of
+            anisotropic clusters, default 10.
+        :param intrinsic_dimension: Dimension of the latent space, default
+            dimension(no projection).
+        :param noise: Std of gaussian noise added after projection, default 0.
+        :param seed: Random seed, default 0.
+        """
+        self.dimension = int(dimension)
+        self.distribution = str(kwargs.get('distribution', 'uniform')).lower()
+        if self.distribution not in DISTRIBUTIONS:
+            raise ValueError(f'Unknown distribution: {self.distribution}')
+        self.cluster_sizes = str(kwargs.get('cluster_sizes', 'equal')).lower()
+        if self.cluster_sizes not in CLUSTER_SIZES:
+            raise ValueError(f'Unknown cluster sizes: {self.cluster_sizes}')
+        self.clusters = int(kwargs.get('clusters', 100))
+        self.alpha = float(kwargs.get('alpha', 1.0))
+        self.spread = float(kwargs.get('spread', 0.3))
+        self.anisotropy = float(kwargs.get('anisotropy', 10.0))
+        self.intrinsic_dimension = int(kwargs.get('intrinsic_dimension', self.dimension))
+        if not 0 < self.intrinsic_dimension <= self.dimension:
+            raise ValueError(
+                f'intrinsic_dimension must be in [1, {self.dimension}]: {self.intrinsic_dimension}'
+            )
+        self.noise = float(kwargs.get('noise', 0.0))
+        self.seed = int(kwargs.get('seed', 0))
+        self.init_params()
+
+    def init_params(self) -> None:
+        rng = np.random.default_rng([self.seed, STREAM_PARAMS])
+        latent = self.intrinsic_dimension
+        self.basis = None
+        if latent < self.dimension:
+            self.basis, _ = np.linalg.qr(rng.standard_normal((self.dimension, latent)))
+            self.basis = self.basis.T.astype(np.float32)
+        self.weights = None
+        if self.cluster_sizes == 'powerlaw':
+            self.weights = np.arange(1, self.clusters + 1, dtype=np.float64) ** -self.alpha
+            self.weights /= self.weights.sum()
+        if self.distribution == 'uniform':
+            return
+        self.centers = rng.standard_normal((self.clusters, latent)).astype(np.float32)
+        self.scales = np.full((self.clusters, latent), self.spread, dtype=np.float32)
+        self.reflections = None
+        if self.distribution == 'anisotropic':
+            half = np.log(self.anisotropy) / 2
+            self.scales *= np.exp(rng.uniform(-half, half, (self.clusters, latent)))
+            # a householder reflection per cluster orients its axes, O(d) to apply
+            reflections = rng.standard_normal((self.clusters, latent))
+            reflections /= np.linalg.norm(reflections, axis=1)[:, np.newaxis]
+            self.reflections = reflections.astype(np.float32)
+
+    def args(self) -> dict:
+        """
+        Arguments that determine the generated rows.
+        """
+        return {
+            'dimension': self.dimension,
+            'distribution': self.distribution,
+            'clusters': self.clusters,
+            'cluster_sizes': self.cluster_sizes,
+            'alpha': self.alpha,
+            'spread': self.spread,
+            'anisotropy': self.anisotropy,
+            'intrinsic_dimension': self.intrinsic_dimension,
+            'noise': self.noise,
+            'seed': self.seed,
+        }
+
+    def generate_block(self, stream: int, block: int) -> np.ndarray:
+        rng = np.random.default_rng([self.seed, stream, block])
+        count = self.block_size
+        latent = self.intrinsic_dimension
+        if self.distribution == 'uniform':
+            rows = rng.random((count, latent), dtype=np.float32)
+        else:
+            if self.weights is None:
+                labels = rng.integers(0, self.clusters, count)
+            else:
+                labels = rng.choice(self.clusters, count, p=self.weights)
+            rows = rng.standard_normal((count, latent), dtype=np.float32)
+            rows *= self.scales[labels]
+            if self.reflections is not None:
+                reflections = self.reflections[labels]
+                rows -= 2 * np.einsum('ij,ij->i', rows, reflections)[:, np.newaxis] * reflections
+            rows += self.centers[labels]
+        if self.basis is not None:
+            rows = rows @ self.basis
+        if self.noise > 0:
+            rows += self.noise * rng.standard_normal(rows.shape, dtype=np.float32)
+        return rows
+
+    def generate(self, begin: int, end: int, stream: int = STREAM_DATA) -> np.ndarray:
+        """
+        Rows [begin, end) of a stream, data and queries are different streams.
+        """
+        if end <= begin:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        first, last = begin // self.block_size, (end - 1) // self.block_size
+        rows = np.vstack([self.generate_block(stream, i) for i in range(first, last + 1)])
+        offset = first * self.block_size
+        return rows[begin - offset : end - offset]
+
+    def iter_chunks(
+        self, count: int, chunk_size: int, stream: int = STREAM_DATA
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        (begin, rows) of chunks of the first count rows of a stream.
+        """
+        for begin in range(0, count, chunk_size):
+            yield begin, self.generate(begin, min(begin + chunk_size, count), stream)
+
+
+def generate_dataset(
+    output: str,
+    generator: SyntheticGenerator,
+    count: int,
+    metric_type: MetricType,
+    test_count: Union[int, None] = None,
+    normalize: bool = False,
+    ground_truth: bool = True,
+    chunk_size: int = 100000,
+    k: int = 100,
+    queries: str = 'data',
+) -> None:
+    """
+    Generate a dataset by chunks straight to the output file, only one
+    chunk of data is in memory. The ground truth is computed as the data is
+    generated, by searching each chunk and merging into the running top-k.
+
+    For .hdf5/.h5 output an ann-benchmarks(annb) hdf5 file is written. For
+    big-ann-benchmarks formats(e.g. .fbin) the base vectors are written by
+    mmap, queries to <stem>.query<ext> and ground truth to <stem>.gt.bin.
+
+    :param output: Output file path.
+    :param generator: Generator of rows.
+    :param count: Number of data rows.
+    :param metric_type: Metric type.
+    :param test_count: Number of queries, default min(count, 10000).
+    :param normalize: Normalize rows, only for angular/ip metric.
+    :param ground_truth: Generate ground truth.
+    :param chunk_size: Rows per chunk.
+    :param k: Number of neighbors of the ground truth.
+    :param queries: data to query the first data rows, separate to draw the
+        queries from their own stream, default data.
+    """
+    log = getLogger('annb')
+    if normalize and metric_type == MetricType.L2:
+        raise ValueError('normalize only support angular/ip metric.')
+    test_count = min(count, 10000) if test_count is None else int(test_count)
+    if queries not in QUERIES:
+        raise ValueError(f'Unknown queries: {queries}')
+    stream = STREAM_QUERY if queries == 'separate' else STREAM_DATA
+    test = generator.generate(0, test_count, stream)
+    if normalize:
+        test = normalize_rows(test)
+    stem, ext = path.splitext(output)
+    bigann = ext.lower() in VECS_TYPES or ext.lower() in BIN_TYPES
+    if bigann and {**VECS_TYPES, **BIN_TYPES}[ext.lower()] != np.float32:
+        raise ValueError(f'Synthetic vectors are float32, use .fbin or .fvecs: {output}')
+    if bigann:
+        hd = None
+        data = create_vectors(output, count, generator.dimension)
+    else:
+        hd = h5.File(output, 'w')
+        hd.attrs['distance'] = 'euclidean' if metric_type == MetricType.L2 else 'angular'
+        hd.attrs['normalized'] = normalize
+        hd.attrs['synthetic'] = json.dumps(generator.args(), sort_keys=True)
+        hd.attrs['queries'] = queries
+        data = hd.create_dataset('train', (count, generator.dimension), dtype=np.float32)
+    top = None
+    try:
+        for begin, rows in generator.iter_chunks(count, chunk_size):
+            if normalize:
+                rows = normalize_rows(rows)
+            data[begin : begin + len(rows)] = rows
+            if ground_truth:
+                # the same search as the ground truth of in memory datasets
+                distances, ids = generate_groundtruth(test, rows, metric_type, k)
+                ids = np.where(ids >= 0, ids + begin, -1)
+                top = (distances, ids) if top is None else merge_ground_truth(
+                    top, (distances, ids), metric_type
+                )
+            log.debug('generated %d/%d rows of %s', begin + len(rows), count, output)
+        if bigann:
+            data.flush()
+            write_vectors(f'{stem}.query{ext}', test)
+            if top is not None:
+                write_ground_truth(f'{stem}.gt.bin', top[1], top[0])
+            return
+        hd.create_dataset('test', data=test)
+        if top is None:
+            top = (np.zeros((test_count, k), np.float32), np.zeros((test_count, k), np.int64))
+        hd.create_dataset('distances', data=top[0])
+        hd.create_dataset('neighbors', data=top[1])
+    finally:
+        if hd is not None:
+            hd.close()
@@ -2,6 +2,7 @@ from time import monotonic
 from typing import Tuple
 import numpy as np
 from ..indexes import MetricType
+from .groundtruth import blocked_knn
 
 
 def execution(stage, func, *args, **kwargs):
@@ -23,18 +24,28 @@ def execution(stage, func, *args, **kwargs):
     return res
 
 
-def generate_groundtruth(query, data, metric_type) -> Tuple[np.ndarray, np.ndarray]:
+def generate_groundtruth(query, data, metric_type, k: int = 100) -> Tuple[np.ndarray, np.ndarray]:
     """
     Generate ground truth for dataset.
 
     :param query: Query data
-    :param data: Dataset data
+    :param data: Dataset data, in memory or lazy/memory mapped
     :param metric_type: Metric type
+    :param k: Number of neighbors
 
     :return: Ground truth
     """
-    query_max = min(16384, query.shape[0])
-    k = 100
+    if (
+        not isinstance(data, np.ndarray)
+        or isinstance(data, np.memmap)
+        or data.dtype != np.float32
+        or metric_type not in (MetricType.L2, MetricType.INNER_PRODUCT)
+    ):
+        # data may not fit in memory, stream it by blocks, also widen
+        # uint8/float16 data per block, and for binary metrics
+        return execution(
+            'generate_groundtruth/blocked', blocked_knn, query, data, k, metric_type
+        )
     try:
         from faiss import knn_gpu
     except ImportError:
@@ -54,7 +65,7 @@ def generate_groundtruth(query, data, metric_type) -> Tuple[np.ndarray, np.ndarr
             'generate_groundtruth/knn_gpu',
             knn_gpu,
             res,
-            query[:query_max],
+            query,
             data,
             k,
             metric=metric,
@@ -68,20 +79,8 @@ def generate_groundtruth(query, data, metric_type) -> Tuple[np.ndarray, np.ndarr
         from faiss import METRIC_L2, METRIC_INNER_PRODUCT
 
         metric = METRIC_L2 if metric_type == MetricType.L2 else METRIC_INNER_PRODUCT
-        return execution(
-            'generate_groundtruth/knn', knn, query[:query_max], data, k, metric=metric
-        )
-
-    try:
-        from sklearn.neighbors import NearestNeighbors
-    except ImportError:
-        NearestNeighbors = None  # noqa
-
-    if NearestNeighbors:
-        metric_text = 'l2' if metric_type == MetricType.L2 else 'cosine'
-        nbs = NearestNeighbors(n_neighbors=k, metric=metric_text, n_jobs=-1).fit(data)
-        return execution(
-            'generate_groundtruth/sklearn', nbs.kneighbors, query[:query_max]
-        )
+        return execution('generate_groundtruth/knn', knn, query, data, k, metric=metric)
 
-    raise RuntimeError('No knn implementation found')
+    return execution(
+        'generate_groundtruth/blocked', blocked_knn, query, data, k, metric_type
+    )
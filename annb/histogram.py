@@ -0,0 +1,128 @@
+import math
+from typing import Dict, Iterable, Union
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram, similar to HdrHistogram.
+
+    Bucket i holds values in [base^i, base^(i+1)) with base = 1 + precision,
+    so any recorded value is reported within the relative precision, the
+    memory is fixed regardless of how many values are recorded, and
+    histograms with the same layout could be merged by adding counts.
+    """
+
+    def __init__(self, precision: float = 0.01, max_value: int = 10**12):
+        """
+        :param precision: Relative precision of the buckets.
+        :param max_value: Max value(ns) could be recorded, larger values are clamped.
+        """
+        self.precision = precision
+        self.max_value = max_value
+        self.log_base = math.log1p(precision)
+        self.counts = np.zeros(self.bucket_index(max_value) + 1, dtype=np.int64)
+        self.min = None
+        self.max = None
+        self.sum = 0
+
+    def bucket_index(self, values: Union[int, np.ndarray]):
+        values = np.clip(values, 1, self.max_value)
+        return np.floor(np.log(values) / self.log_base).astype(np.int64)
+
+    def bucket_value(self, index: Union[int, np.ndarray]):
+        # geometric middle of the bucket
+        return np.exp((index + 0.5) * self.log_base)
+
+    def record(self, value: int, count: int = 1) -> None:
+        """
+        Record a value count times.
+        """
+        value = int(value)
+        clamped = min(max(value, 1), self.max_value)
+        self.counts[int(math.log(clamped) / self.log_base)] += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def record_values(
+        self, values: np.ndarray, counts: Union[np.ndarray, None] = None
+    ) -> None:
+        """
+        Record values, with optional count for each value.
+        """
+        values = np.asarray(values, dtype=np.int64)
+        if values.size == 0:
+            return
+        if counts is None:
+            counts = np.ones(values.shape, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int64)
+        np.add.at(self.counts, self.bucket_index(values), counts)
+        self.sum += int((values * counts).sum())
+        low, high = int(values.min()), int(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def compatible(self, other: 'LatencyHistogram') -> bool:
+        return self.precision == other.precision and self.max_value == other.max_value
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """
+        Merge other histogram into this one.
+        """
+        if not self.compatible(other):
+            raise ValueError('Can not merge histograms with different layout')
+        self.counts += other.counts
+        self.sum += other.sum
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    @classmethod
+    def merged(cls, histograms: Iterable['LatencyHistogram']) -> 'LatencyHistogram':
+        result = None
+        for histogram in histograms:
+            if result is None:
+                result = cls(histogram.precision, histogram.max_value)
+            result.merge(histogram)
+        return result if result is not None else cls()
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        total = self.total
+        return self.sum / total if total else 0.0
+
+    def percentile(self, n: float) -> int:
+        """
+        Value at percentile n(0-100).
+        """
+        total = self.total
+        if total == 0:
+            return 0
+        rank = max(int(math.ceil(total * n / 100.0)), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        value = int(self.bucket_value(index))
+        return min(max(value, self.min), self.max)
+
+    def percentiles(self, ns: Iterable[float]) -> Dict[float, int]:
+        return {n: self.percentile(n) for n in ns}
+
+    def __getstate__(self):
+        # store non-empty buckets only to keep saved results compact
+        state = self.__dict__.copy()
+        nonzero = np.nonzero(self.counts)[0]
+        state['counts'] = (len(self.counts), nonzero, self.counts[nonzero])
+        return state
+
+    def __setstate__(self, state):
+        size, nonzero, counts = state['counts']
+        state['counts'] = np.zeros(size, dtype=np.int64)
+        state['counts'][nonzero] = counts
+        self.__dict__.update(state)
@@ -1,7 +1,8 @@
+import asyncio
 import os
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Tuple, List, Union, Dict
+from typing import Tuple, List, Union, Dict, Iterable
 from hashlib import sha1
 from logging import getLogger
 
@@ -13,6 +14,21 @@ class MetricType(Enum):
     INNER_PRODUCT = 1
     L2 = 2
     JACCARD = 3
+    HAMMING = 4
+
+    @property
+    def binary(self) -> bool:
+        """
+        Vectors are packed bits, uint8 rows of dimension / 8 bytes.
+        """
+        return self in (MetricType.HAMMING, MetricType.JACCARD)
+
+    @property
+    def similarity(self) -> bool:
+        """
+        Larger is nearer, e.g. inner product, otherwise smaller is nearer.
+        """
+        return self in (MetricType.INNER_PRODUCT, MetricType.JACCARD)
 
     @classmethod
     def from_text(cls, text: str):
@@ -28,6 +44,8 @@ class MetricType(Enum):
             return cls.L2
         elif text.lower() == 'jaccard':
             return cls.JACCARD
+        elif text.lower() == 'hamming':
+            return cls.HAMMING
         else:
             raise ValueError('Unknown metric type: {}'.format(text))
 
@@ -37,6 +55,19 @@ class IndexUnderTest(ABC):
     Abstract class for the index.
     """
 
+    # whether add could run concurrently with search
+    concurrent_add = False
+    # whether add_with_ids could be called from parallel threads
+    parallel_add = False
+    # whether the built index could be saved to and loaded from a local file
+    cacheable = False
+    # whether searches fan out to shards or replicas, see baseline_index
+    distributed = False
+    # index args which do not change the built index, e.g. how it is loaded
+    runtime_args = ()
+    # element types taken without conversion, others are converted to the first
+    dtypes = (np.float32,)
+
     def __init__(
         self, index_name: str, dimension: int, metric_type: MetricType, **kwargs
     ):
@@ -76,12 +107,47 @@ class IndexUnderTest(ABC):
         """
         pass
 
+    def train_chunks(self, chunks: Iterable[np.ndarray]) -> None:
+        """
+        Train the index with data read by chunks.
+        By default the chunks are concatenated for train, indexes which do
+        not need training or could train incrementally should override it.
+        :param chunks: Chunks of data to train the index with.
+        """
+        chunks = list(chunks)
+        self.train(chunks[0] if len(chunks) == 1 else np.concatenate(chunks))
+
     def warmup(self) -> None:
         """
         Warmup the index, called before search.
         """
         pass
 
+    def prepare(self, data: np.ndarray) -> np.ndarray:
+        """
+        Convert data(a chunk of add or a batch of search) to the element type
+        the index takes, datasets keep their own type, e.g. uint8, so that
+        only the chunk in use is widened.
+        """
+        data = np.asarray(data)
+        if data.dtype in self.dtypes:
+            return data
+        return data.astype(self.dtypes[0])
+
+    def random_queries(self, count: int) -> np.ndarray:
+        """
+        Random queries of the type and shape the index takes, e.g. for warmup.
+        """
+        if self.metric_type.binary:
+            return np.random.randint(0, 256, (count, self.dimension // 8), dtype=np.uint8)
+        dtype = np.dtype(self.dtypes[0])
+        if dtype.kind in 'iu':
+            info = np.iinfo(dtype)
+            return np.random.randint(info.min, info.max, (count, self.dimension)).astype(dtype)
+        queries = np.random.rand(count, self.dimension).astype(dtype)
+        queries /= np.linalg.norm(queries, axis=1)[:, None]
+        return queries
+
     @abstractmethod
     def add(self, data: np.ndarray) -> None:
         """
@@ -90,6 +156,46 @@ class IndexUnderTest(ABC):
         """
         pass
 
+    def add_with_ids(self, data: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Add data with the given ids to the index, optional.
+        :param data: List of data to add to the index.
+        :param ids: int64 id of each item.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support add_with_ids')
+
+    def remove(self, ids: np.ndarray) -> None:
+        """
+        Remove items from the index, optional.
+        :param ids: int64 id of items to remove, ids added by add are the
+            sequential row numbers of the data.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support remove')
+
+    def upsert(self, data: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Insert or replace items with the given ids, optional.
+        By default items are removed then added again.
+        :param data: List of data to upsert.
+        :param ids: int64 id of each item.
+        """
+        self.remove(ids)
+        self.add_with_ids(data, ids)
+
+    def save(self, path: str) -> None:
+        """
+        Save the built index to a file, optional, see cacheable.
+        :param path: File path to write.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support save')
+
+    def load(self, path: str) -> None:
+        """
+        Replace the index with one saved by save, optional, see cacheable.
+        :param path: File path to read.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support load')
+
     @abstractmethod
     def search(self, query: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
         """
@@ -100,6 +206,66 @@ class IndexUnderTest(ABC):
         """
         pass
 
+    async def search_async(
+        self, query: np.ndarray, k: int
+    ) -> Tuple[List[float], List[int]]:
+        """
+        Search the index from an event loop.
+        :param query: Query data.
+        :param k: Number of nearest neighbors to return.
+        :return: List of nearest neighbors, distances and ids
+
+        Network backends could override this with a native async client,
+        by default the sync search is offloaded to the loop's default executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.search, query, k)
+
+    async def close_async(self) -> None:
+        """
+        Release resources bound to the running event loop, called before the
+        event loop used for search_async is closed.
+        """
+        pass
+
+    def worker_init(self) -> None:
+        """
+        Called in forked worker processes before search.
+        Backends holding connections which could not be shared across fork
+        should re-create them here.
+        """
+        pass
+
+    def set_threads(self, threads: int) -> None:
+        """
+        Limit the intra-query threads(e.g. OpenMP) of searches from the
+        calling thread, called in each search job with a thread layout.
+        Backends without intra-query threads ignore it.
+        :param threads: Number of threads.
+        """
+        pass
+
+    def baseline_index(self) -> 'IndexUnderTest':
+        """
+        The single index counterpart of a sharded or replicated index, with
+        the other index args unchanged, optional.
+        :return: A new index, not built.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support fan-out baseline')
+
+    def auto_query_args(
+        self, xq: np.ndarray, ground_truth: np.ndarray, topk: int, **kwargs
+    ) -> List[Tuple[Dict, float, float]]:
+        """
+        Explore search args of the built index on a query sample, optional.
+        :param xq: Query sample.
+        :param ground_truth: Ground truth neighbors of the query sample.
+        :param topk: Number of nearest neighbors to search.
+        :return: (args, recall, search seconds) of the pareto optimal
+            operating points, in increasing recall.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support auto query args')
+
     @abstractmethod
     def update_search_args(self, **kwargs) -> None:
         """
@@ -0,0 +1,112 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from logging import getLogger
+from time import monotonic_ns
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+from .indexes import IndexUnderTest
+from .result import InsertChunk
+
+
+def split_chunks(chunks: Iterable[np.ndarray], chunk_size: int) -> Iterator[np.ndarray]:
+    """
+    Split chunks into chunk_size rows, rows are not merged across chunks.
+    """
+    for chunk in chunks:
+        if chunk_size <= 0:
+            yield chunk
+            continue
+        for i in range(0, len(chunk), chunk_size):
+            yield chunk[i : i + chunk_size]
+
+
+def load_chunk(chunk: np.ndarray) -> np.ndarray:
+    # mapped rows are read by the prefetch thread, not by add
+    if isinstance(chunk, np.memmap):
+        return np.array(chunk)
+    return chunk
+
+
+class IngestPipeline:
+    """
+    Add data to the index chunk by chunk, a reader thread prefetches the
+    next chunks from the dataset(e.g. from a lazy file) while the current
+    one is added.
+
+    With writers > 1 chunks are added by parallel writer threads, by
+    add_with_ids with the row numbers as ids, only for indexes with
+    parallel_add.
+    """
+
+    def __init__(
+        self, index: IndexUnderTest, chunk_size: int = 0, writers: int = 1, prefetch: int = 2
+    ):
+        """
+        :param index: Index to add to.
+        :param chunk_size: Rows per add, 0 for the chunks of the dataset.
+        :param writers: Number of parallel writers.
+        :param prefetch: Number of chunks read ahead.
+        """
+        self.index = index
+        self.chunk_size = int(chunk_size)
+        self.writers = max(1, int(writers))
+        self.prefetch = max(1, int(prefetch))
+        if self.writers > 1 and not index.parallel_add:
+            getLogger('annb').warning(
+                '%s could not add in parallel, use one writer', type(index).__name__
+            )
+            self.writers = 1
+
+    def run(self, chunks: Iterable[np.ndarray], begin: int = 0) -> List[InsertChunk]:
+        """
+        Add all chunks.
+        :param chunks: Chunks of data.
+        :param begin: Row number(id) of the first row.
+        :return: Timings of chunks, in order of rows.
+        """
+        rows = split_chunks(chunks, self.chunk_size)
+        timings = []
+        started = monotonic_ns()
+
+        def read():
+            chunk = next(rows, None)
+            return None if chunk is None else load_chunk(chunk)
+
+        def add(offset, chunk, waited):
+            add_started = monotonic_ns()
+            if self.writers > 1:
+                ids = np.arange(offset, offset + len(chunk), dtype=np.int64)
+                self.index.add_with_ids(chunk, ids)
+            else:
+                self.index.add(chunk)
+            duration = monotonic_ns() - add_started
+            timings.append(
+                InsertChunk(offset, len(chunk), add_started - started, duration, waited)
+            )
+
+        # one reader thread, so the dataset iterator is read in order
+        with ThreadPoolExecutor(1) as reader, ThreadPoolExecutor(self.writers) as writers:
+            pending = deque(reader.submit(read) for _ in range(self.prefetch))
+            running = set()
+            offset = begin
+            while True:
+                wait_started = monotonic_ns()
+                chunk = pending.popleft().result()
+                waited = monotonic_ns() - wait_started
+                if chunk is None:
+                    break
+                pending.append(reader.submit(read))
+                if self.writers == 1:
+                    add(offset, chunk, waited)
+                else:
+                    if len(running) >= self.writers:
+                        done, running = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    running.add(writers.submit(add, offset, chunk, waited))
+                offset += len(chunk)
+            for future in running:
+                future.result()
+        return sorted(timings, key=lambda t: t.offset)
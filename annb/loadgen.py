@@ -0,0 +1,159 @@
+from itertools import count as counter
+from multiprocessing.dummy import Process
+from time import monotonic_ns, sleep
+from typing import Union
+
+import numpy as np
+
+from .histogram import LatencyHistogram
+from .indexes import IndexUnderTest
+
+ARRIVAL_CONSTANT = 'constant'
+ARRIVAL_POISSON = 'poisson'
+ARRIVALS = (ARRIVAL_CONSTANT, ARRIVAL_POISSON)
+
+
+def arrival_schedule(
+    rate: float, count: int, arrival: str = ARRIVAL_CONSTANT, seed: Union[int, None] = None
+) -> np.ndarray:
+    """
+    Generate the send time offsets(ns) of requests.
+    :param rate: Target arrival rate, requests per second.
+    :param count: Number of requests.
+    :param arrival: Arrival process, constant or poisson.
+    :param seed: Random seed for poisson arrival.
+    :return: int64 array of offsets from the start of the schedule.
+    """
+    if rate <= 0:
+        raise ValueError(f'arrival rate must be positive: {rate}')
+    interval = 1000000000.0 / rate
+    if arrival == ARRIVAL_CONSTANT:
+        offsets = np.arange(count, dtype=np.float64) * interval
+    elif arrival == ARRIVAL_POISSON:
+        rng = np.random.default_rng(seed)
+        gaps = rng.exponential(interval, count)
+        offsets = np.concatenate([[0.0], np.cumsum(gaps[:-1])])
+    else:
+        raise ValueError(f'Unknown arrival: {arrival}')
+    return offsets.astype(np.int64)
+
+
+class OpenLoopResult:
+    def __init__(
+        self,
+        count: int,
+        latencies: LatencyHistogram,
+        service_times: LatencyHistogram,
+        started: int,
+        ended: int,
+    ):
+        """
+        :param count: Number of queries.
+        :param latencies: Request latency(ns) from the scheduled send time.
+        :param service_times: Request latency(ns) from the actual send time.
+        :param started: Start of the schedule, monotonic ns.
+        :param ended: Completion of the last request, monotonic ns.
+        """
+        self.count = count
+        self.latencies = latencies
+        self.service_times = service_times
+        self.started = started
+        self.ended = ended
+
+    @property
+    def achieved_rate(self) -> float:
+        """
+        Completed queries per second.
+        """
+        return float(self.count) / max(self.ended - self.started, 1) * 1000000000.0
+
+
+class OpenLoopGenerator:
+    """
+    Open-loop load generator.
+
+    Requests are issued at scheduled times regardless of whether previous
+    requests completed, by a pool of jobs workers. If all workers are busy a
+    request is sent late, and its latency is still measured from the
+    scheduled send time, so the queueing delay is not hidden
+    (coordinated-omission corrected).
+    """
+
+    def __init__(
+        self,
+        index: IndexUnderTest,
+        xq: np.ndarray,
+        topk: int,
+        step: int,
+        jobs: int,
+        rate: float,
+        arrival: str = ARRIVAL_CONSTANT,
+        seed: Union[int, None] = None,
+    ):
+        """
+        :param index: Index to search.
+        :param xq: Queries, sent in step-sized requests.
+        :param topk: Number of nearest neighbors to search.
+        :param step: Number of queries per request.
+        :param jobs: Number of workers, the max number of outstanding requests.
+        :param rate: Target arrival rate, queries per second.
+        :param arrival: Arrival process, constant or poisson.
+        :param seed: Random seed for poisson arrival.
+        """
+        self.index = index
+        self.xq = xq
+        self.topk = topk
+        self.step = step
+        self.jobs = jobs
+        self.rate = rate
+        self.begins = np.arange(0, len(xq), step)
+        # schedule requests, a request is step queries
+        self.offsets = arrival_schedule(rate / step, len(self.begins), arrival, seed)
+
+    def run(self) -> OpenLoopResult:
+        request_count = len(self.begins)
+        latencies = [LatencyHistogram() for _ in range(self.jobs)]
+        service_times = [LatencyHistogram() for _ in range(self.jobs)]
+        ended = [0] * self.jobs
+        # error of each worker, raised after all workers stopped
+        errors = [None] * self.jobs
+        next_request = counter()
+        started = monotonic_ns() + 1000000
+
+        def worker(job):
+            while True:
+                i = next(next_request)
+                if i >= request_count or any(errors):
+                    return
+                scheduled = started + int(self.offsets[i])
+                now = monotonic_ns()
+                if now < scheduled:
+                    sleep((scheduled - now) / 1000000000.0)
+                sent = monotonic_ns()
+                query = self.xq[self.begins[i] : self.begins[i] + self.step]
+                try:
+                    self.index.search(query, self.topk)
+                except Exception as e:
+                    errors[job] = e
+                    return
+                end = monotonic_ns()
+                # one value per request, a request is step queries
+                latencies[job].record(end - scheduled)
+                service_times[job].record(end - sent)
+                ended[job] = end
+
+        workers = [Process(target=worker, args=(job,)) for job in range(self.jobs)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+        for error in errors:
+            if error:
+                raise error
+        return OpenLoopResult(
+            len(self.xq),
+            LatencyHistogram.merged(latencies),
+            LatencyHistogram.merged(service_times),
+            started,
+            max(ended),
+        )
@@ -0,0 +1,71 @@
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+
+def match_positions(ground_truth: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """
+    Find where each ground truth neighbor appears in the result labels.
+
+    The rows are matched all at once with a sort-and-search: each id is
+    offset by its row so one sorted key array holds every result row.
+    Negative ids are padding, a padded ground truth entry never matches,
+    and a padded label never counts as a hit.
+
+    :param ground_truth: (nq, k_gt) ground truth neighbor ids.
+    :param labels: (nq, k) result labels.
+    :return: (nq, k_gt) position of the first occurrence of each ground truth
+        id in its result row, or k if it is not found.
+    """
+    ground_truth = np.asarray(ground_truth, dtype=np.int64)
+    labels = np.asarray(labels, dtype=np.int64)
+    nq, k = labels.shape
+    if nq == 0 or k == 0 or ground_truth.size == 0:
+        return np.full(ground_truth.shape, k, dtype=np.int64)
+    # shift ids by 1, so all padding(<0) collapse to 0 and real ids start at 1
+    span = int(max(ground_truth.max(), labels.max(), 0)) + 2
+    rows = np.arange(nq, dtype=np.int64)[:, np.newaxis] * span
+    # sort within rows only, the row offsets keep the keys globally sorted,
+    # stable sort, so the leftmost equal key is the first occurrence
+    order = np.argsort(labels, axis=1, kind='stable')
+    sorted_keys = (
+        np.maximum(np.take_along_axis(labels, order, axis=1), -1) + 1 + rows
+    ).ravel()
+    order = order.ravel()
+    gt_keys = (np.maximum(ground_truth, -1) + 1 + rows).ravel()
+    found_at = np.minimum(np.searchsorted(sorted_keys, gt_keys), len(sorted_keys) - 1)
+    found = (sorted_keys[found_at] == gt_keys) & (ground_truth.ravel() >= 0)
+    positions = np.where(found, order[found_at], k)
+    return positions.reshape(ground_truth.shape)
+
+
+def recall_at(
+    ground_truth: np.ndarray, labels: np.ndarray, ks: Iterable[int]
+) -> Dict[int, Tuple[float, np.ndarray]]:
+    """
+    Compute recall@k for several k in one pass.
+
+    recall@k of a query is |gt[:k] & labels[:k]| / |gt[:k]|, padding ids in
+    the ground truth are not counted.
+
+    :param ground_truth: (nq, k_gt) ground truth neighbor ids.
+    :param labels: (nq, k) result labels.
+    :param ks: k values, clipped to the number of result labels.
+    :return: dict of k -> (recall, per query recall vector)
+    """
+    count = min(len(ground_truth), len(labels))
+    labels = np.asarray(labels)[:count]
+    ground_truth = np.asarray(ground_truth)[:count]
+    k_max = min(max(ks), labels.shape[1])
+    positions = match_positions(ground_truth[:, :k_max], labels[:, :k_max])
+    recalls = {}
+    for k in ks:
+        k = min(k, k_max)
+        hits = (positions[:, :k] < k).sum(axis=1)
+        totals = (ground_truth[:, :k] >= 0).sum(axis=1)
+        per_query = np.divide(
+            hits, totals, out=np.zeros(count, dtype=np.float64), where=totals > 0
+        )
+        total = int(totals.sum())
+        recalls[k] = (int(hits.sum()) / total if total else 0.0, per_query)
+    return recalls
@@ -1,8 +1,16 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple, Union
 import os
 import pickle
 
+import numpy as np
+
+from annb.histogram import LatencyHistogram
 from annb.indexes import MetricType
+from annb.stats import median_ci
+
+# percentiles of batch latency, a batch is a step-sized search request, the
+# latency of a single query is measured only with step 1
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
 
 
 class DurationWithCount:
@@ -11,11 +19,299 @@ class DurationWithCount:
         self.duration = duration
 
 
+class LoopSummary:
+    def __init__(
+        self, loop: int, count: int, wall_duration: int, qps: float, p50: int, p99: int
+    ):
+        """
+        :param loop: Loop index.
+        :param count: Number of queries.
+        :param wall_duration: Wall clock duration(ns) of the loop.
+        :param qps: Queries per wall clock second.
+        :param p50: Batch latency(ns) p50.
+        :param p99: Batch latency(ns) p99.
+        """
+        self.loop = loop
+        self.count = count
+        self.wall_duration = wall_duration
+        self.qps = qps
+        self.p50 = p50
+        self.p99 = p99
+
+
 class QueryResult:
-    def __init__(self, recall: float, durations: List[DurationWithCount], args):
+    def __init__(
+        self,
+        recall: float,
+        durations: List[DurationWithCount],
+        args,
+        histogram: Union[LatencyHistogram, None] = None,
+        recalls: Union[Dict[int, float], None] = None,
+        per_query_recall: Union[np.ndarray, None] = None,
+        wall_duration: Union[int, None] = None,
+        timeline: Union[np.ndarray, None] = None,
+        loops: Union[List[LoopSummary], None] = None,
+    ):
+        """
+        :param recall: Recall of the query, recall@topk.
+        :param durations: Durations of each query batch.
+        :param args: Query args.
+        :param histogram: Batch latency histogram.
+        :param recalls: Dict of k -> recall@k.
+        :param per_query_recall: Recall@topk of each query.
+        :param wall_duration: Wall clock duration(ns) of all jobs.
+        :param timeline: Per batch (job, start offset, duration, count) of jobs.
+        :param loops: Summary of every complete loop.
+        """
         self.recall = recall
         self.durations = durations
         self.args = args
+        self.histogram = histogram
+        self.recalls = recalls or {}
+        self.per_query_recall = per_query_recall
+        self.wall_duration = wall_duration
+        self.timeline = timeline
+        self.loops = loops or []
+
+    def qps_ci(self) -> Tuple[float, float, float]:
+        """
+        Median QPS over loops and its confidence interval.
+        """
+        return median_ci([s.qps for s in getattr(self, 'loops', [])])
+
+    def p99_ci(self) -> Tuple[float, float, float]:
+        """
+        Median p99 latency(ns) over loops and its confidence interval.
+        """
+        return median_ci([s.p99 for s in getattr(self, 'loops', [])])
+
+    def qps(self, jobs: int) -> float:
+        """
+        Queries per wall clock second, fallback to the ideal scaled QPS for
+        results without wall clock duration.
+        """
+        wall_duration = getattr(self, 'wall_duration', None)
+        if not wall_duration:
+            return BenchmarkResult.qps(self.durations, jobs)
+        return sum([d.count for d in self.durations]) / (wall_duration / 1000000000.0)
+
+    def concurrency_efficiency(self, jobs: int) -> float:
+        """
+        Ratio of wall clock QPS to the QPS of jobs perfectly scaled, 1.0 means
+        jobs never contend or wait.
+        """
+        return self.qps(jobs) / BenchmarkResult.qps(self.durations, jobs)
+
+    def latency_pn(self, n: float) -> int:
+        """
+        Batch latency(ns) at percentile n, fallback to the batch durations
+        for results without histogram.
+        """
+        if getattr(self, 'histogram', None) is not None:
+            return self.histogram.percentile(n)
+        return BenchmarkResult.latency_pn(self.durations, n)
+
+
+class InsertChunk:
+    def __init__(self, offset: int, count: int, started: int, duration: int, wait: int):
+        """
+        :param offset: Row number of the first row, the index size when the
+            chunk is added.
+        :param count: Number of rows of the chunk.
+        :param started: Start(ns) of the add from the start of the ingestion.
+        :param duration: Duration(ns) of the add.
+        :param wait: Duration(ns) the chunk was waited for from the dataset,
+            0 if it was prefetched in time.
+        """
+        self.offset = offset
+        self.count = count
+        self.started = started
+        self.duration = duration
+        self.wait = wait
+
+
+class LoadResult:
+    def __init__(
+        self,
+        target_rate: float,
+        achieved_rate: float,
+        count: int,
+        latencies: LatencyHistogram,
+        service_times: LatencyHistogram,
+        args,
+    ):
+        """
+        :param target_rate: Offered load, queries per second.
+        :param achieved_rate: Completed queries per second.
+        :param count: Number of queries.
+        :param latencies: Batch latency histogram from scheduled send time.
+        :param service_times: Batch latency histogram from actual send time.
+        :param args: Query args.
+        """
+        self.target_rate = target_rate
+        self.achieved_rate = achieved_rate
+        self.count = count
+        self.latencies = latencies
+        self.service_times = service_times
+        self.args = args
+
+
+class TuningResult:
+    def __init__(self, param: str, target_recall: float, value, trace: List):
+        """
+        :param param: Tuned search parameter.
+        :param target_recall: Target recall.
+        :param value: Chosen value, None if target recall is not reached.
+        :param trace: List of TuningPoint, for each probe.
+        """
+        self.param = param
+        self.target_recall = target_recall
+        self.value = value
+        self.trace = trace
+
+
+class CheckpointResult:
+    def __init__(
+        self,
+        elapsed: int,
+        visible_start: int,
+        visible_end: int,
+        recall: float,
+        qps: float,
+        histogram: LatencyHistogram,
+        args,
+    ):
+        """
+        :param elapsed: Start of the search pass(ns) since inserts started.
+        :param visible_start: Number of items in the index when the pass started.
+        :param visible_end: Number of items in the index when the pass ended.
+        :param recall: Recall against the ground truth of the visible items.
+        :param qps: Queries per wall clock second.
+        :param histogram: Batch latency histogram.
+        :param args: Query args.
+        """
+        self.elapsed = elapsed
+        self.visible_start = visible_start
+        self.visible_end = visible_end
+        self.recall = recall
+        self.qps = qps
+        self.histogram = histogram
+        self.args = args
+
+
+class ChurnResult:
+    def __init__(
+        self,
+        cycle: int,
+        churn_count: int,
+        live_count: int,
+        remove_duration: int,
+        insert_duration: int,
+        recall: float,
+        qps: float,
+        histogram: LatencyHistogram,
+        args,
+    ):
+        """
+        :param cycle: Churn cycle, 0 for the baseline before churn.
+        :param churn_count: Number of items removed and inserted in the cycle.
+        :param live_count: Number of live items after the cycle.
+        :param remove_duration: Duration(ns) of remove.
+        :param insert_duration: Duration(ns) of insert.
+        :param recall: Recall against the ground truth of the live items.
+        :param qps: Queries per wall clock second.
+        :param histogram: Batch latency histogram.
+        :param args: Query args.
+        """
+        self.cycle = cycle
+        self.churn_count = churn_count
+        self.live_count = live_count
+        self.remove_duration = remove_duration
+        self.insert_duration = insert_duration
+        self.recall = recall
+        self.qps = qps
+        self.histogram = histogram
+        self.args = args
+
+
+class TrainSizeResult:
+    def __init__(
+        self,
+        train_size: float,
+        train_count: int,
+        train_duration: Union[int, None],
+        recall: float,
+        qps: float,
+        args,
+    ):
+        """
+        :param train_size: Train size of the sweep, a count or a fraction.
+        :param train_count: Number of rows trained on.
+        :param train_duration: Duration(ns) of training, None if the index
+            is loaded from the cache.
+        :param recall: Recall of the query.
+        :param qps: Queries per second.
+        :param args: Query args.
+        """
+        self.train_size = train_size
+        self.train_count = train_count
+        self.train_duration = train_duration
+        self.recall = recall
+        self.qps = qps
+        self.args = args
+
+
+class ThreadScalingResult:
+    def __init__(self, layout: Dict, recall: float, qps: float, p99: int, args):
+        """
+        :param layout: Thread layout, see ThreadLayout.as_dict.
+        :param recall: Recall of the query.
+        :param qps: Queries per second.
+        :param p99: Batch latency(ns) p99.
+        :param args: Query args.
+        """
+        self.layout = layout
+        self.recall = recall
+        self.qps = qps
+        self.p99 = p99
+        self.args = args
+
+
+class FanoutResult:
+    def __init__(
+        self,
+        recall: float,
+        qps: float,
+        p99: int,
+        insert_duration: int,
+        baseline_recall: float,
+        baseline_qps: float,
+        baseline_p99: int,
+        baseline_insert_duration: int,
+        args,
+    ):
+        """
+        :param recall: Recall of the sharded/replicated index.
+        :param qps: Queries per second of the sharded/replicated index.
+        :param p99: Batch latency(ns) p99 of the sharded/replicated index.
+        :param insert_duration: Duration(ns) of adding data to the
+            sharded/replicated index.
+        :param baseline_recall: Recall of the single index.
+        :param baseline_qps: Queries per second of the single index.
+        :param baseline_p99: Batch latency(ns) p99 of the single index.
+        :param baseline_insert_duration: Duration(ns) of adding data to the
+            single index.
+        :param args: Query args.
+        """
+        self.recall = recall
+        self.qps = qps
+        self.p99 = p99
+        self.insert_duration = insert_duration
+        self.baseline_recall = baseline_recall
+        self.baseline_qps = baseline_qps
+        self.baseline_p99 = baseline_p99
+        self.baseline_insert_duration = baseline_insert_duration
+        self.args = args
 
 
 class BenchmarkResult:
@@ -36,29 +332,161 @@ class BenchmarkResult:
         'Query Args',
         'Recall',
         'QPS',
-        'Query Latency(ms)',
-        'Query Latency P95(ms)',
-        'Query Latency P99(ms)',
+        'Concurrency Efficiency',
+        'Batch Latency(ms)',
+        'Batch Latency P50(ms)',
+        'Batch Latency P90(ms)',
+        'Batch Latency P95(ms)',
+        'Batch Latency P99(ms)',
+        'Batch Latency P99.9(ms)',
     )
 
     def __init__(self):
         self.training_durations = []
         self.insert_durations = []
         self.query_results = []
+        self.load_results = []
+        self.tuning_results = []
+        self.checkpoint_results = []
+        self.churn_results = []
+        self.train_size_results = []
+        self.thread_scaling_results = []
+        self.fanout_results = []
+        # timings of chunks of each ingestion through IngestPipeline
+        self.insert_chunks = []
         self.attributes = {}
 
+    def __setstate__(self, state):
+        # results saved by older versions may miss newer fields
+        self.__init__()
+        self.__dict__.update(state)
+
     def add_training_duration(self, count, duration):
         self.training_durations.append(DurationWithCount(count, duration))
 
     def add_insert_duration(self, count, duration):
         self.insert_durations.append(DurationWithCount(count, duration))
 
-    def add_query_result(self, recall, durations: List, query_arg: Dict):
-        result = QueryResult(recall, [], query_arg)
+    def add_insert_chunks(self, chunks: List[InsertChunk]):
+        self.insert_chunks.append(chunks)
+
+    def add_query_result(
+        self,
+        recall,
+        durations: List,
+        query_arg: Dict,
+        histogram: Union[LatencyHistogram, None] = None,
+        recalls: Union[Dict[int, float], None] = None,
+        per_query_recall: Union[np.ndarray, None] = None,
+        wall_duration: Union[int, None] = None,
+        timeline: Union[np.ndarray, None] = None,
+        loops: Union[List[LoopSummary], None] = None,
+    ):
+        result = QueryResult(
+            recall,
+            [],
+            query_arg,
+            histogram,
+            recalls,
+            per_query_recall,
+            wall_duration,
+            timeline,
+            loops,
+        )
         for count, duration in durations:
             result.durations.append(DurationWithCount(count, duration))
         self.query_results.append(result)
 
+    def add_load_result(
+        self, target_rate, achieved_rate, count, latencies, service_times, query_arg
+    ):
+        self.load_results.append(
+            LoadResult(
+                target_rate,
+                achieved_rate,
+                count,
+                latencies,
+                service_times,
+                query_arg,
+            )
+        )
+
+    def add_tuning_result(self, param, target_recall, value, trace):
+        self.tuning_results.append(TuningResult(param, target_recall, value, trace))
+
+    def add_checkpoint_result(
+        self, elapsed, visible_start, visible_end, recall, qps, histogram, query_arg
+    ):
+        self.checkpoint_results.append(
+            CheckpointResult(
+                elapsed, visible_start, visible_end, recall, qps, histogram, query_arg
+            )
+        )
+
+    def add_churn_result(
+        self,
+        cycle,
+        churn_count,
+        live_count,
+        remove_duration,
+        insert_duration,
+        recall,
+        qps,
+        histogram,
+        query_arg,
+    ):
+        self.churn_results.append(
+            ChurnResult(
+                cycle,
+                churn_count,
+                live_count,
+                remove_duration,
+                insert_duration,
+                recall,
+                qps,
+                histogram,
+                query_arg,
+            )
+        )
+
+    def add_train_size_result(
+        self, train_size, train_count, train_duration, recall, qps, query_arg
+    ):
+        self.train_size_results.append(
+            TrainSizeResult(train_size, train_count, train_duration, recall, qps, query_arg)
+        )
+
+    def add_thread_scaling_result(self, layout, recall, qps, p99, query_arg):
+        self.thread_scaling_results.append(
+            ThreadScalingResult(layout, recall, qps, p99, query_arg)
+        )
+
+    def add_fanout_result(
+        self,
+        recall,
+        qps,
+        p99,
+        insert_duration,
+        baseline_recall,
+        baseline_qps,
+        baseline_p99,
+        baseline_insert_duration,
+        query_arg,
+    ):
+        self.fanout_results.append(
+            FanoutResult(
+                recall,
+                qps,
+                p99,
+                insert_duration,
+                baseline_recall,
+                baseline_qps,
+                baseline_p99,
+                baseline_insert_duration,
+                query_arg,
+            )
+        )
+
     def add_attribute(self, key, value):
         self.attributes[key] = value
 
@@ -95,14 +523,19 @@ class BenchmarkResult:
                 str(insert_durations / 1000000.0),
                 str(query_result.args),
                 str(query_result.recall),
-                str(BenchmarkResult.qps(query_result.durations, jobs)),
+                str(query_result.qps(jobs)),
+                str(query_result.concurrency_efficiency(jobs)),
                 str(BenchmarkResult.latency(query_result.durations) / 1000000.0),
-                str(BenchmarkResult.latency_pn(query_result.durations, 95) / 1000000.0),
-                str(BenchmarkResult.latency_pn(query_result.durations, 99) / 1000000.0),
+                str(query_result.latency_pn(50) / 1000000.0),
+                str(query_result.latency_pn(90) / 1000000.0),
+                str(query_result.latency_pn(95) / 1000000.0),
+                str(query_result.latency_pn(99) / 1000000.0),
+                str(query_result.latency_pn(99.9) / 1000000.0),
             )
 
     @staticmethod
     def qps(durations, jobs):
+        # ideal QPS, assumes jobs scale linearly without any contention
         return sum([d.count for d in durations]) / (
             sum([d.duration for d in durations]) / 1000000000.0
         ) * jobs
@@ -117,6 +550,31 @@ class BenchmarkResult:
         duration_values.sort()
         return duration_values[int(len(duration_values) * n / 100)]
 
+    @staticmethod
+    def _insert_curve(chunks: List[InsertChunk], points: int = 10):
+        """
+        Insert throughput as the index grows, chunks are grouped into at most
+        points groups of consecutive rows.
+        :return: List of (first row, end row, rows per wall clock second,
+            wait(ns) for the dataset).
+        """
+        curve = []
+        size = -(-len(chunks) // points)
+        for i in range(0, len(chunks), size):
+            group = chunks[i : i + size]
+            count = sum(c.count for c in group)
+            # wall clock span, writers may overlap
+            span = max(c.started + c.duration for c in group) - min(c.started for c in group)
+            curve.append(
+                (
+                    group[0].offset,
+                    group[-1].offset + group[-1].count,
+                    count / (max(span, 1) / 1000000000.0),
+                    sum(c.wait for c in group),
+                )
+            )
+        return curve
+
     @staticmethod
     def _summary(durations):
         return (
@@ -125,6 +583,16 @@ class BenchmarkResult:
             f' {sum([d.duration for d in durations])/1000000.0}ms'
         )
 
+    @staticmethod
+    def _args_text(args):
+        text = ''
+        if isinstance(args, Dict):
+            for key, value in args.items():
+                text += f'{key}={value}'
+        else:
+            text = 'none'
+        return text
+
     @property
     def training_durations_summary(self):
         return self._summary(self.training_durations)
@@ -150,26 +618,151 @@ class BenchmarkResult:
             attributes += f'    {key}: {value}\n'
         query_durations = ''
         for query_result in self.query_results:
-            args = ''
-            if isinstance(query_result.args, Dict):
-                for key, value in query_result.args.items():
-                    args += f'{key}={value}'
-            else:
-                args = 'none'
+            args = self._args_text(query_result.args)
             recall = f'recall={query_result.recall}'
+            for k, value in sorted(getattr(query_result, 'recalls', {}).items()):
+                if k != self.attributes.get('topk'):
+                    recall += f',recall@{k}={value}'
             durations_total_query = sum([d.count for d in query_result.durations])
             durations_total_duration = sum([d.duration for d in query_result.durations])
-            durations_total_qps = BenchmarkResult.qps(query_result.durations, self.attributes['jobs'])
+            jobs = self.attributes['jobs']
+            durations_total_qps = query_result.qps(jobs)
+            efficiency = query_result.concurrency_efficiency(jobs)
             latency = BenchmarkResult.latency(query_result.durations)
-            latency_p95 = BenchmarkResult.latency_pn(query_result.durations, 95)
-            latency_p99 = BenchmarkResult.latency_pn(query_result.durations, 99)
             duration_summary = f'{durations_total_query} items,'
             duration_summary += f' {durations_total_duration/1000000.0}ms,'
+            wall_duration = getattr(query_result, 'wall_duration', None)
+            if wall_duration:
+                duration_summary += f' wall={wall_duration/1000000.0}ms,'
             duration_summary += f' {durations_total_qps}qps,'
-            duration_summary += f' latency={latency/1000000.0}ms,'
-            duration_summary += f' p95={latency_p95/1000000.0}ms,'
-            duration_summary += f' p99={latency_p99/1000000.0}ms'
+            duration_summary += f' efficiency={efficiency:.3f},'
+            duration_summary += f' batch latency={latency/1000000.0}ms'
+            for n in LATENCY_PERCENTILES:
+                duration_summary += f', p{n:g}={query_result.latency_pn(n)/1000000.0}ms'
+            loops = getattr(query_result, 'loops', [])
+            if self.attributes.get('loop_mode') == 'adaptive' and loops:
+                qps, qps_low, qps_high = query_result.qps_ci()
+                p99, p99_low, p99_high = query_result.p99_ci()
+                duration_summary += (
+                    f', {len(loops)} loops median {qps}qps[{qps_low}, {qps_high}],'
+                    f' batch p99={p99/1000000.0}ms[{p99_low/1000000.0}, {p99_high/1000000.0}]'
+                )
             query_durations += f'      {args},{recall} -> {duration_summary}\n'
+        load_summary = ''
+        for load_result in self.load_results:
+            args = self._args_text(load_result.args)
+            latency = ', '.join(
+                f'p{n:g}={load_result.latencies.percentile(n)/1000000.0}ms'
+                for n in LATENCY_PERCENTILES
+            )
+            service_time = ', '.join(
+                f'p{n:g}={load_result.service_times.percentile(n)/1000000.0}ms'
+                for n in LATENCY_PERCENTILES
+            )
+            load_summary += (
+                f'      {args},target={load_result.target_rate}qps'
+                f' -> {load_result.count} items, {load_result.achieved_rate}qps,'
+                f' batch latency: {latency}, batch service: {service_time}\n'
+            )
+        if load_summary:
+            load_summary = '    load:\n' + load_summary
+        tuning_summary = ''
+        for tuning_result in self.tuning_results:
+            trace = ', '.join(
+                f'{p.value}:{p.recall:.4f}/{p.duration/1000000.0:.3f}ms'
+                for p in tuning_result.trace
+            )
+            tuning_summary += (
+                f'      {tuning_result.param},target={tuning_result.target_recall}'
+                f' -> {tuning_result.value}, trace: {trace}\n'
+            )
+        if tuning_summary:
+            tuning_summary = '    tuning:\n' + tuning_summary
+        checkpoint_summary = ''
+        for checkpoint in self.checkpoint_results:
+            args = self._args_text(checkpoint.args)
+            latency = ', '.join(
+                f'p{n:g}={checkpoint.histogram.percentile(n)/1000000.0}ms'
+                for n in LATENCY_PERCENTILES
+            )
+            checkpoint_summary += (
+                f'      {args},{checkpoint.elapsed/1000000000.0}s'
+                f' -> {checkpoint.visible_start}-{checkpoint.visible_end} items,'
+                f' recall={checkpoint.recall}, {checkpoint.qps}qps, batch latency: {latency}\n'
+            )
+        if checkpoint_summary:
+            checkpoint_summary = '    checkpoints:\n' + checkpoint_summary
+        churn_summary = ''
+        for churn in self.churn_results:
+            args = self._args_text(churn.args)
+            latency = ', '.join(
+                f'p{n:g}={churn.histogram.percentile(n)/1000000.0}ms'
+                for n in LATENCY_PERCENTILES
+            )
+            # drift against the baseline cycle
+            baseline = self.churn_results[0]
+            churn_summary += (
+                f'      {args},cycle={churn.cycle}'
+                f' -> {churn.churn_count} churned, {churn.live_count} live,'
+                f' remove={churn.remove_duration/1000000.0}ms,'
+                f' insert={churn.insert_duration/1000000.0}ms,'
+                f' recall={churn.recall}({churn.recall - baseline.recall:+.6f}),'
+                f' {churn.qps}qps({(churn.qps / baseline.qps - 1.0) * 100.0:+.2f}%),'
+                f' batch latency: {latency}\n'
+            )
+        if churn_summary:
+            churn_summary = '    churn:\n' + churn_summary
+        train_size_summary = ''
+        for train_size in self.train_size_results:
+            args = self._args_text(train_size.args)
+            train_duration = 'cached'
+            if train_size.train_duration is not None:
+                train_duration = f'{train_size.train_duration/1000000.0}ms'
+            train_size_summary += (
+                f'      {args},train_size={train_size.train_size:g}'
+                f' -> {train_size.train_count} items, train={train_duration},'
+                f' recall={train_size.recall}, {train_size.qps}qps\n'
+            )
+        if train_size_summary:
+            train_size_summary = '    train sizes:\n' + train_size_summary
+        thread_summary = ''
+        baselines = {}
+        for scaling in self.thread_scaling_results:
+            args = self._args_text(scaling.args)
+            # speedup against the first layout of the same query args
+            baseline = baselines.setdefault(args, scaling)
+            layout = scaling.layout
+            threads = layout['jobs'] * layout['omp_threads']
+            thread_summary += (
+                f'      {args},jobs={layout["jobs"]},omp_threads={layout["omp_threads"]}'
+                f' -> {threads} threads, recall={scaling.recall}, {scaling.qps}qps'
+                f'(x{scaling.qps / baseline.qps:.2f}), batch p99={scaling.p99/1000000.0}ms\n'
+            )
+        if thread_summary:
+            thread_summary = '    threads:\n' + thread_summary
+        fanout_summary = ''
+        for fanout in self.fanout_results:
+            args = self._args_text(fanout.args)
+            # overhead of scatter-gather over the single index
+            fanout_summary += (
+                f'      {args} -> recall={fanout.recall}({fanout.baseline_recall}),'
+                f' {fanout.qps}qps({fanout.baseline_qps}qps, x{fanout.qps / fanout.baseline_qps:.2f}),'
+                f' batch p99={fanout.p99/1000000.0}ms({fanout.baseline_p99/1000000.0}ms,'
+                f' {(fanout.p99 - fanout.baseline_p99)/1000000.0:+}ms),'
+                f' insert={fanout.insert_duration/1000000.0}ms'
+                f'({fanout.baseline_insert_duration/1000000.0}ms,'
+                f' x{fanout.baseline_insert_duration / fanout.insert_duration:.2f})\n'
+            )
+        if fanout_summary:
+            fanout_summary = '    fan-out(single index):\n' + fanout_summary
+        insert_summary = ''
+        for i, chunks in enumerate(self.insert_chunks):
+            for first, last, rate, wait in self._insert_curve(chunks):
+                insert_summary += (
+                    f'      {i}: {first}-{last} items -> {rate} items/s, wait={wait/1000000.0}ms\n'
+                )
+        if insert_summary:
+            insert_summary = '    insert throughput:\n' + insert_summary
 
         return f"""
 BenchmarkResult:
@@ -179,5 +772,5 @@ BenchmarkResult:
     training: {self.training_durations_summary}
     insert: {self.insert_durations_summary}
     query:
-{query_durations}
+{query_durations}{load_summary}{tuning_summary}{checkpoint_summary}{churn_summary}{train_size_summary}{thread_summary}{fanout_summary}{insert_summary}
 """
@@ -1,22 +1,110 @@
 from queue import Empty
+import os
 import sys
 from collections import namedtuple
 from logging import getLogger, Logger, DEBUG
-from time import monotonic_ns
+from time import monotonic, monotonic_ns
+from multiprocessing import get_context
 from multiprocessing.dummy import Process, Queue
-from typing import List, Dict
+from typing import List, Dict, Tuple, Union
 from datetime import datetime
 
 import numpy as np
 
+from .cache import IndexCache
+from .envs import get_run_dir
 from .indexes import IndexUnderTest
 from .dataset import BaseDataset
-from .result import BenchmarkResult
+from .dataset.groundtruth_store import GroundTruthStore
+from .dataset.utils import generate_groundtruth
+from .aio import run_search_batches
+from .histogram import LatencyHistogram
+from .ingest import IngestPipeline
+from .loadgen import OpenLoopGenerator, ARRIVAL_CONSTANT, ARRIVALS
+from .recall import recall_at
+from .result import BenchmarkResult, LoopSummary
+from .shared import SharedArray
+from .stats import median_ci, relative_width
+from .threads import ThreadLayout, load_thread_grid
+from .tuner import ParameterTuner
+from .workloads import (
+    WORKLOAD_SEARCH,
+    WORKLOAD_MIXED,
+    WORKLOAD_CHURN,
+    WORKLOADS,
+    InsertStreamer,
+    LockedIndex,
+    ReadWriteLock,
+)
 
 SingleResult = namedtuple(
-    'SingleResult', ['distances', 'labels', 'time', 'test_indexes', 'count']
+    'SingleResult',
+    ['distances', 'labels', 'time', 'test_indexes', 'count', 'job', 'started'],
+    defaults=(0, 0),
 )
 
+EXECUTOR_THREAD = 'thread'
+EXECUTOR_PROCESS = 'process'
+EXECUTOR_ASYNC = 'async'
+EXECUTORS = (EXECUTOR_THREAD, EXECUTOR_PROCESS, EXECUTOR_ASYNC)
+
+LOOP_FIXED = 'fixed'
+LOOP_ADAPTIVE = 'adaptive'
+LOOP_MODES = (LOOP_FIXED, LOOP_ADAPTIVE)
+
+# query_args value to explore query args of the built index
+QUERY_ARGS_AUTO = 'auto'
+
+
+def process_search_worker(
+    job_index: int,
+    index: IndexUnderTest,
+    descriptors: Tuple[Tuple, Tuple, Tuple, Tuple],
+    batches: List[Tuple[int, int, int]],
+    topk: int,
+    queue,
+    concurrency: int = 0,
+    layout: Union[ThreadLayout, None] = None,
+):
+    """
+    Search worker for process and async executor.
+
+    The index is inherited from the parent by fork, the queries are read from
+    and the results are written to shared memory, only the batch number is
+    sent back through the queue.
+    If concurrency is set, batches are searched by an event loop with
+    concurrency outstanding requests.
+
+    :param descriptors: Shared queries, labels, distances and (start, duration) times.
+    :param layout: Thread layout applied to the worker.
+    """
+    index.worker_init()
+    if layout is not None:
+        layout.apply(index, job_index)
+    shared_xq, shared_labels, shared_distances, shared_times = [
+        SharedArray.attach(descriptor) for descriptor in descriptors
+    ]
+
+    def emit(batch, begin, end, started, duration, distances, labels):
+        shared_labels.array[begin:end] = labels
+        shared_distances.array[begin:end] = distances
+        shared_times.array[batch] = (started, duration)
+        queue.put((batch, begin, end))
+
+    try:
+        if concurrency:
+            run_search_batches(index, shared_xq.array, batches, topk, concurrency, emit)
+        else:
+            for batch, begin, end in batches:
+                start = monotonic_ns()
+                distances, labels = index.search(shared_xq.array[begin:end], topk)
+                emit(batch, begin, end, start, monotonic_ns() - start, distances, labels)
+        queue.put(job_index)
+    finally:
+        for shared in (shared_xq, shared_labels, shared_distances, shared_times):
+            shared.close()
+
+
 class RunnerLog(Logger):
     def __init__(self, name, rlog):
         super().__init__(name, DEBUG)
@@ -34,15 +122,108 @@ class Runner:
         self.index = index
         self.dataset = dataset
         self.query_args = kwargs.get('query_args', [])
+        # explore query args of the built index instead, see run_auto_query_args
+        self.auto_query_args = self.query_args == QUERY_ARGS_AUTO or (
+            isinstance(self.query_args, list) and QUERY_ARGS_AUTO in self.query_args
+        )
+        self.auto_sample = kwargs.get('auto_sample', 1000)
+        self.auto_experiments = kwargs.get('auto_experiments', 100)
         self.topk = kwargs.get('topk', 10)
+        self.recall_at = [k for k in kwargs.get('recall_at', []) if k <= self.topk]
         self.step = kwargs.get('step', 10)
         self.jobs = kwargs.get('jobs', 1)
         self.loop = kwargs.get('loop', 5)
+        self.loop_mode = kwargs.get('loop_mode', LOOP_FIXED)
+        if self.loop_mode not in LOOP_MODES:
+            raise ValueError(f'Unknown loop mode: {self.loop_mode}')
+        # for adaptive loop mode, loop until the relative width of QPS/p99
+        # confidence intervals are within ci_width, or time budget runs out
+        self.min_loop = kwargs.get('min_loop', 3)
+        self.max_loop = kwargs.get('max_loop', 100)
+        self.ci_width = kwargs.get('ci_width', 0.05)
+        self.time_budget = kwargs.get('time_budget', 300)
+        # tune a monotone search parameter to reach target recall, e.g.
+        # {'param': 'nprobe', 'target_recall': 0.95, 'min': 1, 'max': 4096, 'sample': 1000}
+        self.tune = kwargs.get('tune', None)
+        if self.tune and not 1 <= int(self.tune.get('min', 1)) <= int(self.tune.get('max', 65536)):
+            raise ValueError(f'Invalid tuning range: {self.tune}')
         self.query_timeout = kwargs.get('query_timeout', 180)
+        self.executor = kwargs.get('executor', EXECUTOR_THREAD)
+        if self.executor not in EXECUTORS:
+            raise ValueError(f'Unknown executor: {self.executor}')
+        # outstanding requests per event loop for async executor
+        self.concurrency = kwargs.get('concurrency', 16)
+        self.load_rates = kwargs.get('load_rates', [])
+        self.arrival = kwargs.get('arrival', ARRIVAL_CONSTANT)
+        if self.arrival not in ARRIVALS:
+            raise ValueError(f'Unknown arrival: {self.arrival}')
+        self.arrival_seed = kwargs.get('arrival_seed', None)
+        self.workload = kwargs.get('workload', WORKLOAD_SEARCH)
+        if self.workload not in WORKLOADS:
+            raise ValueError(f'Unknown workload: {self.workload}')
+        forked = self.executor == EXECUTOR_PROCESS or (
+            self.executor == EXECUTOR_ASYNC and self.jobs > 1
+        )
+        if self.workload == WORKLOAD_MIXED and forked:
+            raise ValueError('forked search jobs could not see inserts of the parent')
+        mutating = self.workload in (WORKLOAD_MIXED, WORKLOAD_CHURN)
+        if mutating and isinstance(self.query_args, list) and len(self.query_args) > 1:
+            raise ValueError(f'{self.workload} workload searches with one query args')
+        # for mixed workload, the fraction of data inserted while searching
+        self.mixed_holdback = kwargs.get('mixed_holdback', 0.5)
+        self.insert_rate = kwargs.get('insert_rate', 0)
+        self.insert_batch = kwargs.get('insert_batch', 1000)
+        # for churn workload, the fraction of data removed and inserted per cycle
+        self.churn_fraction = kwargs.get('churn_fraction', 0.1)
+        self.churn_cycles = kwargs.get('churn_cycles', 5)
+        self.churn_seed = kwargs.get('churn_seed', 0)
+        # load built index from the on-disk cache, max cache size in GiB
+        self.index_cache = kwargs.get('index_cache', False)
+        self.index_cache_size = kwargs.get('index_cache_size', 16)
+        # data is added by chunks of insert_chunk rows(0 for the chunks of
+        # the dataset) by insert_writers parallel writers, insert_prefetch
+        # chunks are read ahead
+        self.insert_chunk = kwargs.get('insert_chunk', 0)
+        self.insert_writers = kwargs.get('insert_writers', 1)
+        self.insert_prefetch = kwargs.get('insert_prefetch', 2)
+        # sweep of train sample sizes(counts or fractions), the index is
+        # rebuilt and searched for each
+        self.train_sizes = kwargs.get('train_sizes', [])
+        if self.train_sizes and self.workload != WORKLOAD_SEARCH:
+            raise ValueError('train sizes sweep only supports the search workload')
+        # partition thread_budget(0 for all cores) between jobs and the
+        # omp_threads(0 for budget // jobs) of each job, optionally pinned,
+        # threads are not controlled if none is set
+        self.thread_budget = kwargs.get('thread_budget', None)
+        self.omp_threads = kwargs.get('omp_threads', 0)
+        self.pin = kwargs.get('pin', False)
+        self.thread_layout = None
+        if self.thread_budget is not None or self.omp_threads or self.pin:
+            self.thread_layout = ThreadLayout(
+                self.jobs, self.omp_threads, self.thread_budget or 0, self.pin
+            )
+        # sweep of (jobs, omp_threads) layouts, each query args is searched
+        # with every layout
+        self.thread_grid = load_thread_grid(kwargs.get('thread_grid', []))
+        if self.thread_grid and self.workload != WORKLOAD_SEARCH:
+            raise ValueError('thread grid sweep only supports the search workload')
+        # build the single index counterpart of a sharded/replicated index
+        # and compare against it, see run_fanout_baseline
+        self.fanout_baseline = kwargs.get('fanout_baseline', False)
+        if self.fanout_baseline and (self.workload != WORKLOAD_SEARCH or self.thread_grid):
+            raise ValueError('fan-out baseline only supports the search workload without thread grid')
+        if self.fanout_baseline and not self.index.distributed:
+            raise ValueError('fan-out baseline needs a sharded or replicated index')
+        if self.fanout_baseline and self.index_cache:
+            # the insert duration is compared, a cached index is not inserted
+            raise ValueError('fan-out baseline could not use the index cache')
+        self.train_duration = None
         self.benchmark_result = BenchmarkResult()
         self.loop_index = 0
         self.queue = Queue()
         self.records = {}
+        self.histograms = {}
+        self.loop_summaries = []
         for key, value in kwargs.items():
             self.benchmark_result.add_attribute(key, value)
         self.benchmark_result.add_attribute('name', self.name)
@@ -50,8 +231,16 @@ class Runner:
         self.benchmark_result.add_attribute('step', self.step)
         self.benchmark_result.add_attribute('jobs', self.jobs)
         self.benchmark_result.add_attribute('loop', self.loop)
+        self.benchmark_result.add_attribute('loop_mode', self.loop_mode)
+        self.benchmark_result.add_attribute('workload', self.workload)
+        self.benchmark_result.add_attribute('executor', self.executor)
+        if self.executor == EXECUTOR_ASYNC:
+            self.benchmark_result.add_attribute('concurrency', self.concurrency)
+        if self.thread_layout is not None:
+            self.benchmark_result.add_attribute('thread_layout', self.thread_layout.as_dict())
         self.benchmark_result.add_attribute('query_args', self.query_args)
         self.benchmark_result.add_attribute('dataset', self.dataset.name)
+        self.benchmark_result.add_attribute('dtype', str(self.dataset.data.dtype))
         self.benchmark_result.add_attribute('index', self.index.name)
         self.benchmark_result.add_attribute('dim', self.index.dimension)
         self.benchmark_result.add_attribute('metric_type', self.index.metric_type)
@@ -74,18 +263,407 @@ class Runner:
         return res, duration
 
     def run(self):
+        if not self.train_sizes:
+            self.run_build_and_search()
+            return
+        train_size = self.dataset.train_size
+        try:
+            for size in self.train_sizes:
+                self.log.info('train size %s', size)
+                self.dataset.set_train_size(size)
+                begin = len(self.benchmark_result.query_results)
+                self.run_build_and_search()
+                self.add_train_size_results(begin)
+        finally:
+            # the dataset may be shared by other runs
+            self.dataset.set_train_size(train_size)
+
+    def run_build_and_search(self):
+        self.train_duration = None
         self.index.cleanup()
+        cached = self.workload == WORKLOAD_SEARCH and self.index_cache
+        if cached and not self.index.cacheable:
+            self.log.warning('%s could not be cached, build it', type(self.index).__name__)
+            cached = False
+        if cached:
+            self.build_with_cache()
+        else:
+            self.train_index()
+            if self.workload == WORKLOAD_MIXED:
+                self.run_mixed()
+                return
+            if self.workload == WORKLOAD_CHURN:
+                self.run_churn()
+                return
+            self.add_data()
+        if self.auto_query_args:
+            self.run_auto_query_args()
+        elif self.tune:
+            self.run_tuning()
+        begin = len(self.benchmark_result.query_results)
+        self.run_search_loop()
+        if self.fanout_baseline:
+            self.run_fanout_baseline(begin)
+
+    def run_fanout_baseline(self, begin: int):
+        """
+        Build the single index counterpart of the index from the same data,
+        search it with the same query args, and pair its results with the
+        query results from begin, the difference is the fan-out overhead.
+        """
+        insert_duration = self.benchmark_result.insert_durations[-1].duration
+        end = len(self.benchmark_result.query_results)
+        index = self.index
+        self.index = index.baseline_index()
+        try:
+            self.log.info('build fan-out baseline')
+            train = self.dataset.train_sample()
+            self.index.train_chunks(self.dataset.iter_rows(train, 0, None))
+            _, baseline_insert_duration = self.duration_run(
+                f'add {len(self.dataset.data)} items to baseline',
+                self.ingest_pipeline().run,
+                self.dataset.iter_data(),
+            )
+            self.index.warmup()
+            for query_arg in self.query_args or [None]:
+                if isinstance(query_arg, Dict):
+                    self.index.update_search_args(**query_arg)
+                self.run_loops(query_arg)
+        finally:
+            # release the baseline index
+            self.index.cleanup()
+            self.index = index
+        query_results = self.benchmark_result.query_results
+        baselines = query_results[end:]
+        # only reported as fan-out results
+        del query_results[end:]
+        for result, baseline in zip(query_results[begin:end], baselines):
+            self.benchmark_result.add_fanout_result(
+                result.recall,
+                result.qps(self.jobs),
+                result.latency_pn(99),
+                insert_duration,
+                baseline.recall,
+                baseline.qps(self.jobs),
+                baseline.latency_pn(99),
+                baseline_insert_duration,
+                result.args,
+            )
+
+    def train_index(self):
+        train = self.dataset.train_sample()
         _, duration = self.duration_run(
-            f'train {len(self.dataset.train)} items',
-            self.index.train,
-            self.dataset.train,
+            f'train {len(train)} items',
+            self.index.train_chunks,
+            self.dataset.iter_rows(train, 0, None),
         )
-        self.benchmark_result.add_training_duration(len(self.dataset.train), duration)
-        _, duration = self.duration_run(
-            f'add {len(self.dataset.data)} items', self.index.add, self.dataset.data
+        self.train_duration = duration
+        self.benchmark_result.add_training_duration(len(train), duration)
+
+    def add_train_size_results(self, begin: int):
+        """
+        Pair the training of the current train size with its query results.
+        """
+        ids = self.dataset.train_sample_ids()
+        train_count = len(self.dataset.train) if ids is None else len(ids)
+        for query_result in self.benchmark_result.query_results[begin:]:
+            self.benchmark_result.add_train_size_result(
+                self.dataset.train_size,
+                train_count,
+                self.train_duration,
+                query_result.recall,
+                query_result.qps(self.jobs),
+                query_result.args,
+            )
+
+    def ingest_pipeline(self) -> IngestPipeline:
+        return IngestPipeline(
+            self.index, self.insert_chunk, self.insert_writers, self.insert_prefetch
         )
-        self.benchmark_result.add_insert_duration(len(self.dataset.data), duration)
-        self.run_search_loop()
+
+    def add_data(self, begin: int = 0, end: Union[int, None] = None):
+        """
+        Add rows [begin, end) of data through the ingest pipeline, record the
+        total and per chunk durations.
+        """
+        end = len(self.dataset.data) if end is None else end
+        chunks, duration = self.duration_run(
+            f'add {end - begin} items',
+            self.ingest_pipeline().run,
+            self.dataset.iter_data(begin, end),
+            begin,
+        )
+        self.benchmark_result.add_insert_duration(end - begin, duration)
+        self.benchmark_result.add_insert_chunks(chunks)
+
+    def build_with_cache(self):
+        """
+        Load the index from the cache, or build and save it to the cache.
+        On a hit, training and insert durations are not recorded.
+        """
+        cache = IndexCache(
+            os.path.join(get_run_dir(), 'index-cache'),
+            int(self.index_cache_size * (1 << 30)),
+        )
+        key = cache.key(self.dataset, self.index)
+        path = cache.lookup(key)
+        if path:
+            _, duration = self.duration_run(
+                f'load cached index {path}', self.index.load, path
+            )
+            self.benchmark_result.add_attribute('index_cache', 'hit')
+            self.measure_startup()
+        else:
+            self.train_index()
+            self.add_data()
+            _, duration = self.duration_run('save index to cache', cache.store, key, self.index)
+            self.benchmark_result.add_attribute('index_cache', 'miss')
+        self.benchmark_result.add_attribute('index_cache_duration', duration)
+
+    def measure_startup(self):
+        """
+        Latency(ns) of the first batch searched right after the index is
+        loaded, and of the same batch searched again. The cold one includes
+        faulting in the pages touched by the batch(e.g. mmap loaded faiss
+        index), files in the OS page cache are still counted as warm.
+        """
+        query_arg = self.query_args[0] if self.query_args else None
+        if isinstance(query_arg, Dict):
+            self.index.update_search_args(**query_arg)
+        xq = self.dataset.test[: self.step]
+        for state in ('cold', 'warm'):
+            _, duration = self.duration_run(
+                f'{state} search of {len(xq)} queries', self.index.search, xq, self.topk
+            )
+            self.benchmark_result.add_attribute(f'{state}_query_latency', duration)
+
+    def run_mixed(self):
+        """
+        Mixed workload, the held back part of data is inserted by a writer
+        thread while the test data is searched pass by pass. Each pass is a
+        checkpoint, its recall is against the ground truth of the data
+        prefix visible when the pass ends, as no later data could be returned.
+        """
+        data = self.dataset.data
+        base_count = int(len(data) * (1.0 - self.mixed_holdback))
+        self.add_data(0, base_count)
+        self.index.warmup()
+        query_arg = self.query_args[0] if self.query_args else None
+        if isinstance(query_arg, Dict):
+            self.index.update_search_args(**query_arg)
+        index = self.index
+        search_index = index
+        if not index.concurrent_add:
+            search_index = LockedIndex(index, ReadWriteLock())
+        streamer = InsertStreamer(
+            search_index, data, base_count, self.insert_rate, self.insert_batch
+        )
+        checkpoints = []
+        started = monotonic_ns()
+        self.index = search_index
+        try:
+            streamer.begin()
+            while True:
+                # one more pass after the writer finished
+                finished = streamer.finished
+                visible_start = streamer.visible
+                self.records.clear()
+                self.histograms.clear()
+                self.loop_index = 0
+                pass_started = monotonic_ns()
+                self.run_search()
+                records = self.records.get(0, [])
+                if records and self.loop_complete(records):
+                    checkpoints.append(
+                        (
+                            pass_started - started,
+                            visible_start,
+                            streamer.visible,
+                            self.labels(records),
+                            self.wall_duration(records),
+                            self.histograms[0],
+                        )
+                    )
+                if finished:
+                    break
+        finally:
+            self.index = index
+        streamer.join()
+        self.benchmark_result.add_insert_duration(len(data) - base_count, streamer.duration)
+        # ground truth after all passes, so that it does not slow down the writer,
+        # each checkpoint only searches the items appended since the previous one
+        store = GroundTruthStore()
+        for elapsed, visible_start, visible_end, labels, wall_duration, histogram in checkpoints:
+            _, ground_truth = store.get(
+                self.dataset.test, data[:visible_end], self.dataset.metric_type
+            )
+            recall = recall_at(ground_truth[:, : self.topk], labels, [self.topk])[self.topk][0]
+            qps = len(labels) / (wall_duration / 1000000000.0)
+            self.log.info(
+                'checkpoint at %fs, %d-%d items visible: recall %.6f, %fqps',
+                elapsed / 1000000000.0,
+                visible_start,
+                visible_end,
+                recall,
+                qps,
+            )
+            self.benchmark_result.add_checkpoint_result(
+                elapsed, visible_start, visible_end, recall, qps, histogram, query_arg
+            )
+
+    def run_churn(self):
+        """
+        Churn workload, each cycle removes a random churn_fraction of the live
+        items, inserts the same number of items which are out of the index,
+        then searches the test data once. Cycle 0 is the baseline before churn.
+        Item ids are the row numbers of the data, the recall of each cycle is
+        against the ground truth restricted to the live items.
+        """
+        data = self.dataset.data
+        churn_count = int(len(data) * self.churn_fraction)
+        base_count = len(data) - churn_count
+        rng = np.random.default_rng(self.churn_seed)
+        live = np.arange(base_count, dtype=np.int64)
+        dead = np.arange(base_count, len(data), dtype=np.int64)
+        self.add_data(0, base_count)
+        self.index.warmup()
+        query_arg = self.query_args[0] if self.query_args else None
+        if isinstance(query_arg, Dict):
+            self.index.update_search_args(**query_arg)
+        cycles = []
+        for cycle in range(self.churn_cycles + 1):
+            remove_duration = insert_duration = 0
+            if cycle:
+                removed = np.sort(rng.choice(live, churn_count, replace=False))
+                _, remove_duration = self.duration_run(
+                    f'cycle {cycle} remove {churn_count} items', self.index.remove, removed
+                )
+                _, insert_duration = self.duration_run(
+                    f'cycle {cycle} insert {churn_count} items',
+                    self.index.add_with_ids,
+                    data[dead],
+                    dead,
+                )
+                live = np.union1d(np.setdiff1d(live, removed), dead)
+                dead = removed
+            self.records.clear()
+            self.histograms.clear()
+            self.loop_index = 0
+            self.run_search()
+            records = self.records.get(0, [])
+            if not records or not self.loop_complete(records):
+                self.log.warning('search of cycle %d is incomplete, skipped', cycle)
+                continue
+            cycles.append(
+                (
+                    cycle,
+                    remove_duration,
+                    insert_duration,
+                    live,
+                    self.labels(records),
+                    self.wall_duration(records),
+                    self.histograms[0],
+                )
+            )
+        # ground truth after all cycles, as for mixed workload
+        for cycle, remove_duration, insert_duration, live, labels, wall_duration, histogram in cycles:
+            _, ground_truth = generate_groundtruth(
+                self.dataset.test, data[live], self.dataset.metric_type
+            )
+            ground_truth = ground_truth[:, : self.topk]
+            ground_truth = np.where(ground_truth >= 0, live[ground_truth], -1)
+            recall = recall_at(ground_truth, labels, [self.topk])[self.topk][0]
+            qps = len(labels) / (wall_duration / 1000000000.0)
+            self.log.info(
+                'churn cycle %d, %d items live: recall %.6f, %fqps',
+                cycle,
+                len(live),
+                recall,
+                qps,
+            )
+            self.benchmark_result.add_churn_result(
+                cycle,
+                churn_count if cycle else 0,
+                len(live),
+                remove_duration,
+                insert_duration,
+                recall,
+                qps,
+                histogram,
+                query_arg,
+            )
+
+    def query_sample(self, sample: int, seed) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Random sample of the test data and its ground truth neighbors.
+        """
+        xq = self.dataset.test
+        ground_truth = self.dataset.ground_truth_neighbors
+        count = min(len(xq), len(ground_truth))
+        if sample < count:
+            rng = np.random.default_rng(seed)
+            rows = np.sort(rng.choice(count, sample, replace=False))
+        else:
+            rows = np.arange(count)
+        return xq[rows], ground_truth[rows]
+
+    def run_auto_query_args(self):
+        """
+        Replace query args by the pareto optimal operating points explored
+        by the index on a query sample, e.g. faiss OperatingPoints, then each
+        is measured by the search loop with the full test data.
+        """
+        xq, ground_truth = self.query_sample(self.auto_sample, 0)
+        self.index.warmup()
+        frontier, duration = self.duration_run(
+            f'explore query args with {len(xq)} queries',
+            self.index.auto_query_args,
+            xq,
+            ground_truth,
+            self.topk,
+            experiments=self.auto_experiments,
+        )
+        for args, recall, seconds in frontier:
+            self.log.info('operating point %s: recall %.6f, %fms', args, recall, seconds * 1000.0)
+        self.query_args = [args for args, _, _ in frontier] or [None]
+        self.benchmark_result.add_attribute('query_args', self.query_args)
+        self.benchmark_result.add_attribute('operating_points', frontier)
+        self.benchmark_result.add_attribute('auto_query_args_duration', duration)
+
+    def run_tuning(self):
+        """
+        Tune the search parameter on a query sample, then the chosen value is
+        measured by the search loop with the full test data.
+        """
+        param = self.tune['param']
+        target_recall = float(self.tune.get('target_recall', 0.95))
+        xq, ground_truth = self.query_sample(
+            int(self.tune.get('sample', 1000)), self.tune.get('seed', 0)
+        )
+        base_args = dict(self.query_args[0]) if self.query_args else {}
+        base_args.pop(param, None)
+        self.index.warmup()
+        tuner = ParameterTuner(
+            self.index,
+            xq,
+            ground_truth,
+            self.topk,
+            param,
+            target_recall,
+            int(self.tune.get('min', 1)),
+            int(self.tune.get('max', 65536)),
+            base_args,
+        )
+        value, trace = tuner.tune()
+        self.benchmark_result.add_tuning_result(param, target_recall, value, trace)
+        if value is None:
+            value = trace[-1].value
+            self.log.warning(
+                'target recall %f not reached by %s <= %d', target_recall, param, value
+            )
+        self.log.info('tuned %s=%d with %d probes', param, value, len(trace))
+        self.query_args = [{**base_args, param: value}]
+        self.benchmark_result.add_attribute('query_args', self.query_args)
 
     def run_search_loop(self):
         self.index.warmup()
@@ -95,15 +673,146 @@ class Runner:
                 if isinstance(query_arg, Dict):
                     self.index.update_search_args(**query_arg)
                     self.log.info('Update query args: %s', query_arg)
-            self.records.clear()
+            if self.thread_grid:
+                self.run_thread_grid(query_arg)
+            else:
+                self.run_loops(query_arg)
+            for rate in self.load_rates:
+                self.run_open_loop(query_arg, float(rate))
+            self.log.info('Finish query args(%d/%d)', i + 1, len(query_args))
+
+    def run_loops(self, query_arg: Dict):
+        if self.thread_layout is not None and self.thread_layout.oversubscribed:
+            self.log.warning(
+                'thread layout %s oversubscribes the budget of %d threads',
+                self.thread_layout,
+                self.thread_layout.budget,
+            )
+        self.records.clear()
+        self.histograms.clear()
+        self.loop_summaries = []
+        if self.loop_mode == LOOP_ADAPTIVE:
+            self.run_adaptive_loops()
+        else:
             for loop_index in range(self.loop):
                 self.loop_index = loop_index
                 self.run_search()
-            self.finalize_result(query_arg)
-            self.log.info('Finish query args(%d/%d)', i + 1, len(query_args))
+                self.summarize_loop()
+        self.finalize_result(query_arg)
+
+    def run_thread_grid(self, query_arg: Dict):
+        """
+        Search with every (jobs, omp_threads) layout of the thread grid, the
+        jobs and layout are restored after the sweep.
+        """
+        jobs, thread_layout = self.jobs, self.thread_layout
+        try:
+            for grid_jobs, omp_threads in self.thread_grid:
+                self.jobs = grid_jobs
+                self.thread_layout = ThreadLayout(
+                    grid_jobs, omp_threads, self.thread_budget or 0, self.pin
+                )
+                self.log.info('thread layout %s', self.thread_layout)
+                self.run_loops(query_arg)
+                query_result = self.benchmark_result.query_results[-1]
+                self.benchmark_result.add_thread_scaling_result(
+                    self.thread_layout.as_dict(),
+                    query_result.recall,
+                    query_result.qps(self.jobs),
+                    query_result.latency_pn(99),
+                    query_arg,
+                )
+        finally:
+            self.jobs, self.thread_layout = jobs, thread_layout
+
+    def run_adaptive_loops(self):
+        """
+        Loop until QPS and p99 latency converge, or time budget runs out.
+        """
+        started = monotonic()
+        for loop_index in range(self.max_loop):
+            self.loop_index = loop_index
+            self.run_search()
+            self.summarize_loop()
+            if len(self.loop_summaries) >= self.min_loop:
+                qps_ci = median_ci([s.qps for s in self.loop_summaries])
+                p99_ci = median_ci([s.p99 for s in self.loop_summaries])
+                width = max(relative_width(qps_ci), relative_width(p99_ci))
+                self.log.info(
+                    'loop(%d) qps=%f[%f, %f], p99=%fms, ci width=%f',
+                    loop_index + 1,
+                    *qps_ci,
+                    p99_ci[0] / 1000000.0,
+                    width,
+                )
+                if width <= self.ci_width:
+                    self.log.info('converged after %d loops', loop_index + 1)
+                    return
+            if monotonic() - started > self.time_budget:
+                self.log.warning(
+                    'not converged in time budget %ds, stop after %d loops',
+                    self.time_budget,
+                    loop_index + 1,
+                )
+                return
+
+    def summarize_loop(self):
+        """
+        Summarize the current loop, incomplete loops are skipped.
+        """
+        records = self.records.get(self.loop_index, [])
+        if not records or not self.loop_complete(records):
+            return
+        wall_duration = self.wall_duration(records)
+        count = sum(r.count for r in records)
+        histogram = self.histograms[self.loop_index]
+        self.loop_summaries.append(
+            LoopSummary(
+                self.loop_index,
+                count,
+                wall_duration,
+                count / (wall_duration / 1000000000.0),
+                histogram.percentile(50),
+                histogram.percentile(99),
+            )
+        )
+
+    def run_open_loop(self, query_arg: Dict, rate: float):
+        """
+        Run test data once with open-loop arrival at the given rate(queries/s).
+        """
+        generator = OpenLoopGenerator(
+            self.index,
+            self.dataset.test,
+            self.topk,
+            self.step,
+            self.jobs,
+            rate,
+            self.arrival,
+            self.arrival_seed,
+        )
+        result = generator.run()
+        self.log.info(
+            'open loop %s arrival at %fqps: achieved %fqps, p99=%fms',
+            self.arrival,
+            rate,
+            result.achieved_rate,
+            result.latencies.percentile(99) / 1000000.0,
+        )
+        self.benchmark_result.add_load_result(
+            rate,
+            result.achieved_rate,
+            result.count,
+            result.latencies,
+            result.service_times,
+            query_arg,
+        )
 
     @classmethod
-    def run_multi_search(cls, index, queue, args):
+    def run_multi_search(cls, index, queue, args, layout=None):
+        if layout is not None and args:
+            # searches of a job share the index under test
+            layout.apply(args[0][0], index)
         for arg in args:
             cls.run_single_search(*arg)
         queue.put(index)
@@ -116,53 +825,116 @@ class Runner:
         test_indexes: List[int],
         topk: int,
         queue: Queue,
+        job: int = 0,
     ):
         assert len(xq) == len(test_indexes)
         start = monotonic_ns()
         distances, labels = index.search(xq, topk)
         end = monotonic_ns()
-        result = SingleResult(distances, labels, end - start, test_indexes, len(xq))
+        result = SingleResult(
+            distances, labels, end - start, test_indexes, len(xq), job, start
+        )
         queue.put(result)
 
     def finalize_result(self, query_arg: Dict):
-        best_loop = self.find_best_loop()
+        if self.loop_mode == LOOP_ADAPTIVE:
+            best_loop = self.find_median_loop()
+        else:
+            best_loop = self.find_best_loop()
         best_results = self.records[best_loop]
         best_results = sorted(best_results, key=lambda r: r.test_indexes[0])
         np.concatenate([r.distances for r in best_results])
         labels = np.concatenate([r.labels for r in best_results])
         durations = [(len(r.test_indexes), r.time) for r in best_results]
-        correct_count = 0
-        total_count = 0
+        wall_duration = self.wall_duration(best_results)
+        timeline = self.timeline(best_results)
         ground_truth_neighbors = self.dataset.ground_truth_neighbors[:, : self.topk]
-
-        # calc recall between ground_truth_neighbors and labels
-        for i, (gt, test_items) in enumerate(zip(ground_truth_neighbors, labels)):
-            total_count += len(gt)
-            correct_count += len(set(gt) & set(test_items))
-        recall = correct_count / total_count
-        self.log.info('recall %.6f(%d/%d)', recall, correct_count, total_count)
+        recalls = recall_at(
+            ground_truth_neighbors, labels, sorted({self.topk, *self.recall_at})
+        )
+        recall, per_query_recall = recalls[self.topk]
+        self.log.info(
+            'recall %.6f, %s',
+            recall,
+            ', '.join(f'recall@{k}={r:.6f}' for k, (r, _) in recalls.items()),
+        )
+        # latency distribution of the same loop as recall and QPS
+        histogram = self.histograms[best_loop]
         self.benchmark_result.add_query_result(
-            recall=recall, durations=durations, query_arg=query_arg
+            recall=recall,
+            durations=durations,
+            query_arg=query_arg,
+            histogram=histogram,
+            recalls={k: r for k, (r, _) in recalls.items()},
+            per_query_recall=per_query_recall.astype(np.float32),
+            wall_duration=wall_duration,
+            timeline=timeline,
+            loops=list(self.loop_summaries),
+        )
+
+    @staticmethod
+    def labels(records: List[SingleResult]) -> np.ndarray:
+        """
+        Labels of a complete loop, in test data order.
+        """
+        records = sorted(records, key=lambda r: r.test_indexes[0])
+        return np.concatenate([r.labels for r in records])
+
+    @staticmethod
+    def wall_duration(records: List[SingleResult]) -> int:
+        """
+        Wall clock duration(ns) of the concurrent phase, from the first batch
+        sent to the last batch returned by any job.
+        """
+        started = min(r.started for r in records)
+        ended = max(r.started + r.time for r in records)
+        return ended - started
+
+    @staticmethod
+    def timeline(records: List[SingleResult]) -> np.ndarray:
+        """
+        Activity timeline of jobs.
+        :return: int64 array of (job, start offset(ns), duration(ns), count) per batch.
+        """
+        started = min(r.started for r in records)
+        timeline = np.array(
+            [(r.job, r.started - started, r.time, r.count) for r in records],
+            dtype=np.int64,
         )
+        return timeline[np.lexsort((timeline[:, 1], timeline[:, 0]))]
+
+    @staticmethod
+    def loop_complete(records: List[SingleResult]) -> bool:
+        indexes = []
+        for record in records:
+            indexes.extend(record.test_indexes)
+        indexes = sorted(indexes)
+        return indexes == list(range(len(indexes)))
+
+    def find_median_loop(self):
+        # select the loop with the QPS closest to the median
+        if not self.loop_summaries:
+            raise RuntimeError('No complete loop found')
+        median = np.median([s.qps for s in self.loop_summaries])
+        summary = min(self.loop_summaries, key=lambda s: abs(s.qps - median))
+        self.log.info('%s median loop: %d, qps: %f', self.name, summary.loop + 1, summary.qps)
+        return summary.loop
 
     def find_best_loop(self):
-        # select which loop is the best
+        # select which loop is the best, with the shortest wall clock duration
         best_loop = -1
         best_time = sys.maxsize
         for loop_index, records in self.records.items():
-            time = 0
-            indexes = []
-            for record in records:
-                time += record.time
-                indexes.extend(record.test_indexes)
-            indexes = sorted(indexes)
-            if time < best_time and indexes == list(range(len(indexes))):
+            if not self.loop_complete(records):
+                continue
+            time = self.wall_duration(records)
+            if time < best_time:
                 best_loop = loop_index
                 best_time = time
         if best_loop < 0:
             raise RuntimeError('No best loop found')
         self.log.info(
-            '%s best loop: %d, with total duration: %fms',
+            '%s best loop: %d, with wall duration: %fms',
             self.name,
             best_loop + 1,
             best_time / 1000000,
@@ -179,27 +951,139 @@ class Runner:
             result.time / 1000000,
         )
         self.records.setdefault(self.loop_index, []).append(result)
+        # one value per batch, the queries of a batch are not timed apart
+        if self.loop_index not in self.histograms:
+            self.histograms[self.loop_index] = LatencyHistogram()
+        self.histograms[self.loop_index].record(result.time)
+
+    def split_batches(self, total_count: int) -> Dict[int, List[Tuple[int, int, int]]]:
+        """
+        Split test data into step-sized batches, dispatched to jobs round-robin.
+        :return: dict of job index -> list of (batch number, begin, end)
+        """
+        jobs_batches = {}
+        for batch, i in enumerate(range(0, total_count, self.step)):
+            index = batch % self.jobs
+            jobs_batches.setdefault(index, []).append(
+                (batch, i, min(i + self.step, total_count))
+            )
+        return jobs_batches
 
     def run_search(self):
+        if self.executor == EXECUTOR_PROCESS:
+            self.run_search_process()
+        elif self.executor == EXECUTOR_ASYNC and self.jobs > 1:
+            # one event loop per forked process
+            self.run_search_process(self.concurrency)
+        elif self.executor == EXECUTOR_ASYNC:
+            self.run_search_async()
+        else:
+            self.run_search_thread()
+        self.log.info(
+            'Finish %d queries in loop(%d/%d)',
+            len(self.dataset.test),
+            self.loop_index + 1,
+            self.loop,
+        )
+
+    def run_search_thread(self):
         xq = self.dataset.test
         total_count = len(xq)
-        jobs_args_list = {}
-        for i in range(0, total_count, self.step):
-            index = i // self.step % self.jobs
-            indexes = list(range(i, min(i + self.step, total_count)))
-            job_arg = (
-                self.index,
-                xq[i : i + self.step],
-                indexes,
-                self.topk,
-                self.queue,
-            )
-            jobs_args_list.setdefault(index, []).append(job_arg)
         jobs = []
-        for index, pargs in jobs_args_list.items():
-            p = Process(target=self.run_multi_search, args=(index, self.queue, pargs,))
+        for index, batches in self.split_batches(total_count).items():
+            pargs = [
+                (
+                    self.index,
+                    xq[begin:end],
+                    list(range(begin, end)),
+                    self.topk,
+                    self.queue,
+                    index,
+                )
+                for _, begin, end in batches
+            ]
+            p = Process(
+                target=self.run_multi_search,
+                args=(index, self.queue, pargs, self.thread_layout),
+            )
             jobs.append(p)
             p.start()
+        self.collect_results(jobs, self.queue, total_count)
+
+    def run_search_async(self):
+        xq = self.dataset.test
+        total_count = len(xq)
+        batches = self.split_batches(total_count)[0]
+
+        def emit(batch, begin, end, started, duration, distances, labels):
+            result = SingleResult(
+                distances, labels, duration, list(range(begin, end)), end - begin, 0, started
+            )
+            self.queue.put(result)
+
+        def worker():
+            if self.thread_layout is not None:
+                self.thread_layout.apply(self.index, 0)
+            run_search_batches(self.index, xq, batches, self.topk, self.concurrency, emit)
+            self.queue.put(0)
+
+        p = Process(target=worker)
+        p.start()
+        self.collect_results([p], self.queue, total_count)
+
+    def run_search_process(self, concurrency: int = 0):
+        ctx = get_context('fork')
+        queue = ctx.Queue()
+        xq = np.ascontiguousarray(self.dataset.test)
+        total_count = len(xq)
+        jobs_batches = self.split_batches(total_count)
+        batch_count = sum(len(batches) for batches in jobs_batches.values())
+        with SharedArray.from_array(xq) as shared_xq, SharedArray.create(
+            (total_count, self.topk), np.int64, fill=-1
+        ) as shared_labels, SharedArray.create(
+            (total_count, self.topk), np.float32
+        ) as shared_distances, SharedArray.create(
+            (batch_count, 2), np.int64
+        ) as shared_times:
+
+            def resolve(ret):
+                batch, begin, end = ret
+                return SingleResult(
+                    shared_distances.array[begin:end].copy(),
+                    shared_labels.array[begin:end].copy(),
+                    int(shared_times.array[batch, 1]),
+                    list(range(begin, end)),
+                    end - begin,
+                    batch % self.jobs,
+                    int(shared_times.array[batch, 0]),
+                )
+
+            jobs = []
+            for index, batches in jobs_batches.items():
+                p = ctx.Process(
+                    target=process_search_worker,
+                    args=(
+                        index,
+                        self.index,
+                        (
+                            shared_xq.descriptor,
+                            shared_labels.descriptor,
+                            shared_distances.descriptor,
+                            shared_times.descriptor,
+                        ),
+                        batches,
+                        self.topk,
+                        queue,
+                        concurrency,
+                        self.thread_layout,
+                    ),
+                )
+                jobs.append(p)
+                p.start()
+            self.collect_results(jobs, queue, total_count, resolve)
+        queue.close()
+
+    def collect_results(self, jobs, queue, total_count, resolve=None):
         # collect the result, wait all records collected, or some proc exit/terminated before finish
         finished_processes_events = set()
         finished_processes = {}
@@ -208,13 +1092,15 @@ class Runner:
         last_received = datetime.now()
         while proceed_count < total_count:
             try:
-                ret = self.queue.get(timeout=1)
+                ret = queue.get(timeout=1)
                 if isinstance(ret, str):
                     self.log.debug('debug from subprocess: %s', ret)
                 elif isinstance(ret, int):
                     # process[ret] finished
                     finished_processes_events.add(ret)
                 else:
+                    if resolve:
+                        ret = resolve(ret)
                     proceed_count += self.step
                     self.handle_result(ret, proceed_count, total_count)
                     last_received = datetime.now()
@@ -238,13 +1124,8 @@ class Runner:
                     break
         # cleanup
         for p in jobs:
-            if p.is_alive():
+            # threads could not be terminated, only wait for them
+            if p.is_alive() and hasattr(p, 'terminate'):
                 p.terminate()
         for p in jobs:
             p.join()
-        self.log.info(
-            'Finish %d queries in loop(%d/%d)',
-            total_count,
-            self.loop_index + 1,
-            self.loop,
-        )
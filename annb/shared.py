@@ -0,0 +1,78 @@
+from multiprocessing import shared_memory
+from typing import Tuple, Union
+
+import numpy as np
+
+
+class SharedArray:
+    """
+    Numpy array backed by a named shared memory block.
+
+    The owner creates the block, workers attach to it by name through the
+    picklable ``descriptor``, so only the name/shape/dtype cross the process
+    boundary instead of the array content.
+    """
+
+    def __init__(
+        self,
+        shm: shared_memory.SharedMemory,
+        shape: Tuple[int, ...],
+        dtype: Union[str, np.dtype],
+        owner: bool,
+    ):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = owner
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, shape: Tuple[int, ...], dtype: Union[str, np.dtype], fill=None):
+        """
+        Create a new shared array.
+        :param shape: Shape of the array.
+        :param dtype: Data type of the array.
+        :param fill: Optional value to fill the array with.
+        """
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shared = cls(shm, shape, dtype, owner=True)
+        if fill is not None:
+            shared.array.fill(fill)
+        return shared
+
+    @classmethod
+    def from_array(cls, data: np.ndarray):
+        """
+        Create a new shared array with a copy of data.
+        """
+        shared = cls.create(data.shape, data.dtype)
+        shared.array[...] = data
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor: Tuple[str, Tuple[int, ...], str]):
+        """
+        Attach to a shared array created by another process.
+        :param descriptor: Descriptor returned by SharedArray.descriptor.
+        """
+        name, shape, dtype = descriptor
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, shape, dtype, owner=False)
+
+    @property
+    def descriptor(self) -> Tuple[str, Tuple[int, ...], str]:
+        return self.shm.name, self.shape, self.dtype.str
+
+    def close(self):
+        # drop the numpy view before closing the underlying buffer
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,39 @@
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+def median_ci(
+    values: Sequence[float],
+    confidence: float = 0.95,
+    resamples: int = 1000,
+    seed: int = 0,
+) -> Tuple[float, float, float]:
+    """
+    Median and its bootstrap percentile confidence interval.
+    :param values: Samples, e.g. QPS of each loop.
+    :param confidence: Confidence level of the interval.
+    :param resamples: Number of bootstrap resamples.
+    :param seed: Random seed, fixed so the interval is reproducible.
+    :return: (median, low, high)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    median = float(np.median(values))
+    if len(values) < 2:
+        return median, median, median
+    rng = np.random.default_rng(seed)
+    samples = rng.choice(values, (resamples, len(values)), replace=True)
+    medians = np.median(samples, axis=1)
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(medians, [alpha, 1.0 - alpha])
+    return median, float(low), float(high)
+
+
+def relative_width(ci: Tuple[float, float, float]) -> float:
+    """
+    Width of the confidence interval relative to the median.
+    """
+    median, low, high = ci
+    if median == 0:
+        return float('inf') if high > low else 0.0
+    return (high - low) / abs(median)
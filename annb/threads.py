@@ -0,0 +1,100 @@
+import os
+from typing import List, Tuple, Union
+
+
+def available_cores() -> List[int]:
+    """
+    Cores the process may run on, respecting taskset/cgroup restrictions.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def load_thread_grid(grid) -> List[Tuple[int, int]]:
+    """
+    Normalize a (jobs, omp_threads) grid, given as pairs or 'JxO' texts.
+    >>> load_thread_grid(['1x8', [2, 4]])
+    [(1, 8), (2, 4)]
+    """
+    layouts = []
+    for item in grid:
+        if isinstance(item, str):
+            item = item.lower().split('x')
+        jobs, omp_threads = (int(v) for v in item)
+        if jobs <= 0 or omp_threads < 0:
+            raise ValueError(f'Invalid thread layout: {item}')
+        layouts.append((jobs, omp_threads))
+    return layouts
+
+
+class ThreadLayout:
+    """
+    Partition of a thread budget between search jobs and the intra-query
+    (OpenMP) threads of each job, so jobs x omp_threads does not exceed the
+    cores and threads do not oversubscribe them.
+
+    If pinned, each job runs on its own slice of omp_threads cores, slices
+    wrap around the cores when the layout is oversubscribed.
+    """
+
+    def __init__(
+        self,
+        jobs: int,
+        omp_threads: int = 0,
+        budget: int = 0,
+        pin: bool = False,
+        cores: Union[List[int], None] = None,
+    ):
+        """
+        :param jobs: Number of search jobs.
+        :param omp_threads: Threads per job, 0 for budget // jobs.
+        :param budget: Total threads, 0 for all available cores.
+        :param pin: Pin each job to its cores.
+        :param cores: Cores to partition, default all available cores.
+        """
+        cores = list(cores) if cores is not None else available_cores()
+        self.budget = int(budget) or len(cores)
+        self.jobs = int(jobs)
+        self.omp_threads = int(omp_threads) or max(1, self.budget // self.jobs)
+        self.pin = pin
+        self.job_cores = [
+            [
+                cores[(job * self.omp_threads + i) % len(cores)]
+                for i in range(self.omp_threads)
+            ]
+            for job in range(self.jobs)
+        ]
+
+    @property
+    def threads(self) -> int:
+        return self.jobs * self.omp_threads
+
+    @property
+    def oversubscribed(self) -> bool:
+        return self.threads > self.budget
+
+    def apply(self, index, job: int) -> None:
+        """
+        Set the threads of the index and pin the calling thread(and the
+        threads it starts) for the job, called in the job worker before
+        search.
+        """
+        index.set_threads(self.omp_threads)
+        if self.pin and hasattr(os, 'sched_setaffinity'):
+            # pid 0 is the calling thread on linux
+            os.sched_setaffinity(0, self.job_cores[job % self.jobs])
+
+    def as_dict(self) -> dict:
+        layout = {
+            'budget': self.budget,
+            'jobs': self.jobs,
+            'omp_threads': self.omp_threads,
+            'pin': self.pin,
+        }
+        if self.pin:
+            layout['cores'] = self.job_cores
+        return layout
+
+    def __str__(self) -> str:
+        return f'{self.jobs}x{self.omp_threads}'
@@ -0,0 +1,113 @@
+from logging import getLogger
+from time import monotonic_ns
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from .indexes import IndexUnderTest
+from .recall import recall_at
+
+
+class TuningPoint:
+    def __init__(self, value: int, recall: float, duration: int, count: int):
+        """
+        :param value: Parameter value.
+        :param recall: Recall on the query sample.
+        :param duration: Search duration(ns) of the query sample.
+        :param count: Number of queries in the sample.
+        """
+        self.value = value
+        self.recall = recall
+        self.duration = duration
+        self.count = count
+
+
+class ParameterTuner:
+    """
+    Find the smallest value of a monotone search parameter(e.g. nprobe, ef,
+    efSearch) which reaches the target recall.
+
+    Recall is assumed to be non-decreasing with the parameter, so the value
+    is searched by galloping(doubling) from the minimum until the target is
+    reached, then by binary search between the last failed and the first
+    passed values. Each probe searches a query sample only.
+    """
+
+    def __init__(
+        self,
+        index: IndexUnderTest,
+        xq: np.ndarray,
+        ground_truth: np.ndarray,
+        topk: int,
+        param: str,
+        target_recall: float,
+        minimum: int = 1,
+        maximum: int = 65536,
+        base_args: Union[Dict, None] = None,
+    ):
+        """
+        :param index: Built index to tune.
+        :param xq: Query sample.
+        :param ground_truth: Ground truth neighbors of the query sample.
+        :param topk: Number of nearest neighbors to search.
+        :param param: Name of the search parameter.
+        :param target_recall: Target recall@topk.
+        :param minimum: Min value of the parameter, at least 1.
+        :param maximum: Max value of the parameter.
+        :param base_args: Other search args set with the parameter.
+        """
+        if not 1 <= minimum <= maximum:
+            # galloping doubles the value, it never leaves 0
+            raise ValueError(f'Invalid tuning range of {param}: [{minimum}, {maximum}]')
+        self.index = index
+        self.xq = xq
+        self.ground_truth = ground_truth[:, :topk]
+        self.topk = topk
+        self.param = param
+        self.target_recall = target_recall
+        self.minimum = minimum
+        self.maximum = maximum
+        self.base_args = base_args or {}
+        self.trace: List[TuningPoint] = []
+        self.log = getLogger('annb')
+
+    def evaluate(self, value: int) -> float:
+        for point in self.trace:
+            if point.value == value:
+                return point.recall
+        self.index.update_search_args(**self.base_args, **{self.param: value})
+        started = monotonic_ns()
+        _, labels = self.index.search(self.xq, self.topk)
+        duration = monotonic_ns() - started
+        recall = recall_at(self.ground_truth, labels, [self.topk])[self.topk][0]
+        self.trace.append(TuningPoint(value, recall, duration, len(self.xq)))
+        self.log.info(
+            'tune %s=%d: recall %.6f, %fms', self.param, value, recall, duration / 1000000.0
+        )
+        return recall
+
+    def tune(self) -> Tuple[Union[int, None], List[TuningPoint]]:
+        """
+        :return: The smallest value reaching the target recall, or None if
+            even the max value does not, and the trace of all probes.
+        """
+        failed = None
+        value = self.minimum
+        # galloping
+        while True:
+            if self.evaluate(value) >= self.target_recall:
+                break
+            failed = value
+            if value >= self.maximum:
+                return None, self.trace
+            value = min(value * 2, self.maximum)
+        # binary search in (failed, value]
+        passed = value
+        if failed is not None:
+            while passed - failed > 1:
+                middle = (failed + passed) // 2
+                if self.evaluate(middle) >= self.target_recall:
+                    passed = middle
+                else:
+                    failed = middle
+        return passed, self.trace
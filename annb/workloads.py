@@ -0,0 +1,170 @@
+import threading
+from time import monotonic_ns, sleep
+from typing import List, Tuple
+
+import numpy as np
+
+from .indexes import IndexUnderTest
+
+WORKLOAD_SEARCH = 'search'
+WORKLOAD_MIXED = 'mixed'
+WORKLOAD_CHURN = 'churn'
+WORKLOADS = (WORKLOAD_SEARCH, WORKLOAD_MIXED, WORKLOAD_CHURN)
+
+
+class ReadWriteLock:
+    """
+    Lock allows concurrent readers or one writer, writers are preferred so
+    a stream of searches could not starve inserts.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writers_waiting = 0
+        self.writing = False
+
+    def acquire_read(self):
+        with self.condition:
+            while self.writing or self.writers_waiting:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if self.readers == 0:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.writers_waiting += 1
+            while self.writing or self.readers:
+                self.condition.wait()
+            self.writers_waiting -= 1
+            self.writing = True
+
+    def release_write(self):
+        with self.condition:
+            self.writing = False
+            self.condition.notify_all()
+
+
+class LockedIndex(IndexUnderTest):
+    """
+    Index wrapper serializing add against search, for backends which could
+    not add while searching(e.g. faiss).
+    """
+
+    def __init__(self, index: IndexUnderTest, lock: ReadWriteLock):
+        super().__init__(index.name, index.dimension, index.metric_type, **index.kwargs)
+        self.index = index
+        self.lock = lock
+
+    def cleanup(self) -> None:
+        self.index.cleanup()
+
+    def train(self, data: np.ndarray) -> None:
+        self.index.train(data)
+
+    def warmup(self) -> None:
+        self.index.warmup()
+
+    def add(self, data: np.ndarray) -> None:
+        self.lock.acquire_write()
+        try:
+            self.index.add(data)
+        finally:
+            self.lock.release_write()
+
+    def add_with_ids(self, data: np.ndarray, ids: np.ndarray) -> None:
+        self.lock.acquire_write()
+        try:
+            self.index.add_with_ids(data, ids)
+        finally:
+            self.lock.release_write()
+
+    def remove(self, ids: np.ndarray) -> None:
+        self.lock.acquire_write()
+        try:
+            self.index.remove(ids)
+        finally:
+            self.lock.release_write()
+
+    def upsert(self, data: np.ndarray, ids: np.ndarray) -> None:
+        self.lock.acquire_write()
+        try:
+            self.index.upsert(data, ids)
+        finally:
+            self.lock.release_write()
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
+        self.lock.acquire_read()
+        try:
+            return self.index.search(query, k)
+        finally:
+            self.lock.release_read()
+
+    def update_search_args(self, **kwargs) -> None:
+        self.index.update_search_args(**kwargs)
+
+
+class InsertStreamer:
+    """
+    Writer thread, adds data to the index in batches at a fixed rate.
+    """
+
+    def __init__(self, index: IndexUnderTest, data: np.ndarray, start: int, rate: float, batch: int):
+        """
+        :param index: Index to add to.
+        :param data: Whole dataset data.
+        :param start: Rows before start are already added.
+        :param rate: Insert rate(vectors/s), 0 for as fast as possible.
+        :param batch: Number of vectors per add.
+        """
+        self.index = index
+        self.data = data
+        self.start = start
+        self.rate = rate
+        self.batch = batch
+        # number of rows visible to search, updated after each add returns
+        self.visible = start
+        # monotonic time the writer started and its last add returned
+        self.started = 0
+        self.ended = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        try:
+            self.started = self.ended = monotonic_ns()
+            for i in range(self.start, len(self.data), self.batch):
+                if self.rate:
+                    scheduled = self.started + int((i - self.start) / self.rate * 1000000000)
+                    now = monotonic_ns()
+                    if now < scheduled:
+                        sleep((scheduled - now) / 1000000000.0)
+                self.index.add(self.data[i : i + self.batch])
+                self.visible = min(i + self.batch, len(self.data))
+                self.ended = monotonic_ns()
+        except Exception as e:
+            self.error = e
+
+    def begin(self):
+        self.thread.start()
+
+    @property
+    def finished(self) -> bool:
+        return not self.thread.is_alive()
+
+    def join(self):
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+    @property
+    def duration(self) -> int:
+        """
+        Duration(ns) from the start of the writer to its last add returned.
+        """
+        return self.ended - self.started
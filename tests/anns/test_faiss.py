@@ -1,9 +1,12 @@
 import os
 import subprocess
 
+import faiss
 import numpy as np
+import pytest
 from annb.anns.faiss.indexes import index_under_test_factory
 from annb.anns.faiss.deploy import index_under_test_deployment
+from annb.dataset import AnnbHdf5Dataset
 from annb.indexes import MetricType
 
 
@@ -27,6 +30,91 @@ def test_faiss_index_under_test_factory():
     assert index_under_test.index.ntotal == 100
 
 
+def test_faiss_index_binary():
+    factory = index_under_test_factory()
+    x = np.random.randint(0, 256, (1000, 8), dtype=np.uint8)
+    for index in ('flat', 'ivfflat', 'BHNSW16'):
+        index_under_test = factory.create('Binary', 64, MetricType.HAMMING, index=index, nlist=4)
+        index_under_test.train(x)
+        index_under_test.add(x)
+        index_under_test.warmup()
+        distances, ids = index_under_test.search(x[:3], 3)
+        assert list(ids[:, 0]) == [0, 1, 2]
+        assert list(distances[:, 0]) == [0, 0, 0]
+
+
+def test_faiss_index_binary_dataset(tmp_path):
+    # ann-benchmarks bool vectors, packed on load
+    data = np.random.default_rng(0).random((2000, 64)) > 0.5
+    file = str(tmp_path / 'binary.h5')
+    AnnbHdf5Dataset.create(file, MetricType.HAMMING, data, test=data[:100].copy())
+    dataset = AnnbHdf5Dataset(file)
+    dataset.fit()
+    factory = index_under_test_factory()
+    index_under_test = factory.create('Binary', dataset.dimension, MetricType.HAMMING, index='flat')
+    index_under_test.add(dataset.data)
+    distances, _ = index_under_test.search(dataset.test, 10)
+    # exact, but ids of tied hamming distances may differ
+    assert np.array_equal(distances, dataset.ground_truth_distances[:, :10])
+
+
+def test_faiss_index_sq_direct():
+    factory = index_under_test_factory()
+    index_under_test = factory.create('SQ', 8, MetricType.L2, index='sq', qtype='8bit_direct')
+    x = np.random.randint(0, 256, (100, 8)).astype(np.uint8)
+    index_under_test.train(x)
+    index_under_test.add(x)
+    distances, ids = index_under_test.search(x[:3], 1)
+    # uint8 values are stored exactly
+    assert list(ids[:, 0]) == [0, 1, 2]
+    assert list(distances[:, 0]) == [0, 0, 0]
+
+
+def test_faiss_index_remove_upsert():
+    factory = index_under_test_factory()
+    x = np.random.default_rng(0).random((1000, 8), dtype=np.float32)
+    for kwargs in ({'index': 'ivfflat', 'nlist': 4}, {'index': 'flat', 'id_map': 'yes'}):
+        index_under_test = factory.create('Churn', 8, MetricType.L2, **kwargs)
+        index_under_test.train(x)
+        index_under_test.add(x)
+        index_under_test.update_search_args(nprobe=4)
+        index_under_test.remove(np.arange(0, 1000, 2))
+        assert index_under_test.index.ntotal == 500
+        _, ids = index_under_test.search(x[:10], 1)
+        # removed items are not returned, the others keep their ids
+        assert list(ids[1::2, 0]) == [1, 3, 5, 7, 9]
+        assert (ids[::2, 0] % 2 == 1).all()
+        # item 1 is replaced by the vector of item 0
+        index_under_test.upsert(x[:1], np.array([1]))
+        assert index_under_test.index.ntotal == 500
+        _, ids = index_under_test.search(x[:2], 1)
+        assert ids[0, 0] == 1 and ids[1, 0] != 1
+    index_under_test = factory.create('Flat', 8, MetricType.L2, index='flat')
+    index_under_test.add(x)
+    # flat index shifts the ids on remove
+    with pytest.raises(NotImplementedError):
+        index_under_test.remove(np.arange(10))
+
+
+def test_faiss_index_load_mmap(tmp_path):
+    factory = index_under_test_factory()
+    x = np.random.rand(1000, 8).astype(np.float32)
+    built = factory.create('IVF', 8, MetricType.L2, index='ivfflat', nlist=4)
+    built.train(x)
+    built.add(x)
+    built.save(str(tmp_path / 'ivf.index'))
+    built.update_search_args(nprobe=2)
+    expected = built.search(x[:10], 5)
+    for mmap in ('no', 'yes'):
+        loaded = factory.create('IVF', 8, MetricType.L2, index='ivfflat', nlist=4, mmap=mmap)
+        assert loaded.using_mmap() == (mmap == 'yes')
+        loaded.load(str(tmp_path / 'ivf.index'))
+        assert loaded.count == 1000
+        loaded.update_search_args(nprobe=2)
+        distances, ids = loaded.search(x[:10], 5)
+        assert (ids == expected[1]).all() and np.allclose(distances, expected[0])
+
+
 def test_faiss_index_deploy():
     deployment = index_under_test_deployment()
     deploy_type, ref = deployment.deploy()
@@ -41,3 +129,60 @@ def test_faiss_index_deploy_with_pip(tmpdir):
         assert deploy_type == 'venv'
         ret = subprocess.check_call([os.path.join(venv_path, 'bin', 'python'), '-c', 'import faiss'])
         assert ret == 0
+
+
+def test_faiss_index_search_args():
+    factory = index_under_test_factory()
+    x = np.random.rand(2000, 16).astype(np.float32)
+    index_under_test = factory.create('HNSW', 16, MetricType.L2, index='HNSW16')
+    index_under_test.add(x)
+    index_under_test.update_search_args(efSearch=48)
+    assert index_under_test.index.hnsw.efSearch == 48
+    with pytest.raises(ValueError):
+        index_under_test.update_search_args(k_factor_rf=4)
+    index_under_test = factory.create('IVF', 16, MetricType.L2, index='IVF16,PQ4x4,RFlat')
+    index_under_test.train(x)
+    index_under_test.update_search_args(nprobe=4, k_factor_rf=8)
+    assert faiss.extract_index_ivf(index_under_test.index).nprobe == 4
+    assert faiss.downcast_index(index_under_test.index).k_factor == 8
+
+
+def test_faiss_index_auto_query_args():
+    factory = index_under_test_factory()
+    x = np.random.rand(5000, 16).astype(np.float32)
+    index_under_test = factory.create('IVF', 16, MetricType.L2, index='ivfflat', nlist=32)
+    index_under_test.train(x)
+    index_under_test.add(x)
+    xq = x[:100] + 0.01
+    ground_truth = faiss.knn(xq, x, 10)[1]
+    frontier = index_under_test.auto_query_args(xq, ground_truth, 10, experiments=20)
+    assert frontier
+    assert all(set(args) == {'nprobe'} for args, _, _ in frontier)
+    recalls = [recall for _, recall, _ in frontier]
+    assert recalls == sorted(recalls)
+    assert recalls[-1] > 0.9
+
+
+def test_faiss_index_shards():
+    factory = index_under_test_factory()
+    x = np.random.rand(2000, 8).astype(np.float32)
+    exact = faiss.IndexFlatL2(8)
+    exact.add(x)
+    _, expected = exact.search(x[:10], 5)
+    for index, kwargs in (('flat', {'shards': 3}), ('ivfflat', {'shards': 2, 'replicas': 2})):
+        index_under_test = factory.create('Shards', 8, MetricType.L2, index=index, nlist=4, **kwargs)
+        assert not index_under_test.cacheable
+        index_under_test.train(x)
+        index_under_test.add(x[:1000])
+        index_under_test.add(x[1000:])
+        assert index_under_test.index.ntotal == 2000
+        index_under_test.update_search_args(nprobe=4)
+        _, ids = index_under_test.search(x[:10], 5)
+        # merged top-k of all shards
+        assert (ids == expected).all()
+        index_under_test.remove(np.arange(10))
+        assert index_under_test.index.ntotal == 1990
+        _, ids = index_under_test.search(x[:10], 1)
+        assert (ids[:, 0] >= 10).all()
+        baseline = index_under_test.baseline_index()
+        assert not baseline.distributed and baseline.kwargs['index'] == index
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+from pymilvus import MilvusException, utility
+from pymilvus.grpc_gen import milvus_pb2, schema_pb2
+from annb.anns.milvus.indexes import MilvusIndexUnderTest, insert_request, upsert_request
+from annb.anns.milvus.standin import MilvusStandIn, benchmark_insert
+from annb.indexes import MetricType
+
+
+@pytest.fixture
+def standin():
+    with MilvusStandIn() as server:
+        yield server
+
+
+def test_milvus_insert_request():
+    ids = np.arange(300, dtype=np.int64)
+    x = np.random.rand(300, 8).astype(np.float32)
+    request = insert_request('annb_collection', ids, x)
+    # same as built field by field with the generated classes
+    expected = milvus_pb2.InsertRequest(collection_name='annb_collection', num_rows=300)
+    id_field = expected.fields_data.add(type=schema_pb2.DataType.Int64, field_name='id')
+    id_field.scalars.long_data.data.extend(ids.tolist())
+    vector_field = expected.fields_data.add(
+        type=schema_pb2.DataType.FloatVector, field_name='vector'
+    )
+    vector_field.vectors.dim = 8
+    vector_field.vectors.float_vector.data.extend(x.ravel().tolist())
+    assert milvus_pb2.InsertRequest.FromString(request.SerializeToString()) == expected
+    assert upsert_request('annb_collection', ids, x).fields_data == expected.fields_data
+    assert request.num_rows == 300
+    assert list(request.fields_data[0].scalars.long_data.data) == ids.tolist()
+    vectors = request.fields_data[1].vectors
+    assert vectors.dim == 8
+    assert np.array_equal(np.array(vectors.float_vector.data, dtype=np.float32), x.ravel())
+
+
+def test_milvus_insert_modes(standin):
+    x = np.random.rand(1000, 128).astype(np.float32)
+    for config in ({'insert': 'list'}, {'insert': 'numpy', 'insert_concurrency': 2}):
+        index = MilvusIndexUnderTest('standin', 128, MetricType.L2, uri=standin.uri, **config)
+        # 2 steps of 7812 rows
+        index.add(x)
+        index.add_with_ids(np.tile(x, (15, 1)), np.arange(1000, 16000))
+        index.upsert(x[:10], np.arange(10))
+        # add continues after the ids of add_with_ids
+        assert index.count == 16000
+        assert standin.rows == 16000
+        assert standin.upserts == 10
+        standin.rows = standin.upserts = 0
+    with pytest.raises(ValueError):
+        MilvusIndexUnderTest('standin', 128, MetricType.L2, uri=standin.uri, insert='rows')
+
+
+def test_milvus_bulk_insert(standin, tmp_path):
+    x = np.random.rand(100, 8).astype(np.float32)
+    index = MilvusIndexUnderTest(
+        'standin', 8, MetricType.L2, uri=standin.uri, insert='bulk', bulk_path=str(tmp_path)
+    )
+    index.add(x)
+    index.add(x)
+    assert index.count == 200
+    assert standin.rows == 200
+    # files are removed once imported
+    assert os.listdir(tmp_path) == []
+    vector_file = str(tmp_path / 'vector.npy')
+    np.save(vector_file, x)
+    with pytest.raises(MilvusException):
+        utility.do_bulk_insert('annb_collection', files=[vector_file])
+    assert standin.rows == 200
+
+
+def test_milvus_benchmark_insert():
+    rates = benchmark_insert(2000, 8, [{'insert': 'list'}, {'insert': 'numpy'}], chunk_size=500)
+    assert list(rates) == ['insert=list', 'insert=numpy']
+    assert all(rate > 0 for rate in rates.values())
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from annb import MetricType
+from annb.dataset import BigAnnDataset
+from annb.dataset.bigann_dataset import (
+    read_ground_truth,
+    read_vectors,
+    write_ground_truth,
+    write_vectors,
+)
+
+
+@pytest.mark.parametrize(
+    'ext,dtype',
+    [
+        ('.fvecs', np.float32),
+        ('.ivecs', np.int32),
+        ('.bvecs', np.uint8),
+        ('.fbin', np.float32),
+        ('.u8bin', np.uint8),
+        ('.i8bin', np.int8),
+        ('.ibin', np.int32),
+    ],
+)
+def test_read_vectors(tmpdir, ext, dtype):
+    vectors = (np.random.rand(100, 6) * 100).astype(dtype)
+    file = str(tmpdir.join('vectors' + ext))
+    write_vectors(file, vectors)
+    mapped = read_vectors(file)
+    assert isinstance(mapped.base, np.memmap) or isinstance(mapped, np.memmap)
+    assert mapped.dtype == dtype
+    assert np.array_equal(mapped, vectors)
+    assert np.array_equal(read_vectors(file, 10, 20), vectors[10:20])
+    assert np.array_equal(read_vectors(file, 90, 200), vectors[90:])
+    assert read_vectors(file, 100, 200).shape == (0, 6)
+    with pytest.raises(ValueError):
+        read_vectors(file, 200, 300)
+    with pytest.raises(ValueError):
+        read_vectors(file, 20, 10)
+    with pytest.raises(ValueError):
+        read_vectors(file, -1)
+
+
+def test_ground_truth(tmpdir):
+    neighbors = np.random.randint(0, 1000, (10, 5))
+    distances = np.random.rand(10, 5).astype(np.float32)
+    file = str(tmpdir.join('gt.bin'))
+    write_ground_truth(file, neighbors, distances)
+    read_neighbors, read_distances = read_ground_truth(file)
+    assert np.array_equal(read_neighbors, neighbors)
+    assert np.array_equal(read_distances, distances)
+
+
+def test_bigann_dataset(tmpdir):
+    with tmpdir.as_cwd():
+        data = np.random.randint(0, 256, (1000, 8)).astype(np.uint8)
+        query = np.random.randint(0, 256, (20, 8)).astype(np.uint8)
+        write_vectors('base.u8bin', data)
+        write_vectors('query.u8bin', query)
+        dataset = BigAnnDataset('base.u8bin', query='query.u8bin', end=500, chunk_size=200)
+        dataset.fit()
+        assert dataset.metric_type == MetricType.L2
+        assert dataset.dimension == 8
+        assert dataset.count == 500
+        # not widened, indexes convert the chunks they take
+        assert dataset.data.dtype == np.uint8
+        assert [len(chunk) for chunk in dataset.iter_data()] == [200, 200, 100]
+        assert np.array_equal(dataset.data[:], data[:500])
+        assert np.array_equal(dataset.test, query)
+        # ground truth of the subset is computed
+        neighbors = dataset.ground_truth_neighbors
+        assert neighbors.shape[0] == 20
+        assert neighbors.max() < 500
+        # base vectors are trained on a bounded sample
+        dataset.set_train_size(100)
+        assert len(np.concatenate(list(dataset.iter_train()))) == 100
+        assert BigAnnDataset('base.u8bin', query='query.u8bin').train_size == (
+            BigAnnDataset.lazy_train_size
+        )
+
+
+def test_bigann_dataset_hamming(tmpdir):
+    with tmpdir.as_cwd():
+        data = np.random.randint(0, 256, (1000, 8)).astype(np.uint8)
+        write_vectors('base.u8bin', data)
+        write_vectors('query.u8bin', data[:10])
+        dataset = BigAnnDataset('base.u8bin', query='query.u8bin', metric='hamming')
+        dataset.fit()
+        assert dataset.dimension == 64
+        assert dataset.data.dtype == np.uint8
+        assert np.array_equal(dataset.ground_truth_neighbors[:, 0], np.arange(10))
+        assert np.all(dataset.ground_truth_distances[:, 0] == 0)
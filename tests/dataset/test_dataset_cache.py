@@ -0,0 +1,17 @@
+from annb.dataset import DatasetCache
+
+
+def test_dataset_cache_release():
+    datasets = DatasetCache()
+    key = DatasetCache.key('a.hdf5', None, None, 1000)
+    assert key == DatasetCache.key('./a.hdf5', 128, 'l2', 1000)
+    datasets.expect(key)
+    datasets.expect(key)
+    loads = []
+    for _ in range(2):
+        datasets.get(key, lambda: loads.append(1) or object())
+        assert key in datasets.entries
+        datasets.release(key)
+    assert loads == [1]
+    # freed after the last expected run
+    assert key not in datasets.entries
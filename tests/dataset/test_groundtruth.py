@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from annb.dataset.groundtruth import block_rows, blocked_knn
+from annb.dataset.lazy import LazyArray
+from annb.indexes import MetricType
+
+
+@pytest.mark.parametrize('metric_type', [MetricType.L2, MetricType.INNER_PRODUCT])
+def test_blocked_knn(metric_type):
+    data = np.random.rand(1000, 16).astype('float32')
+    query = np.random.rand(50, 16).astype('float32')
+    distances, ids = blocked_knn(
+        query, LazyArray(data, np.float32), 10, metric_type, query_block=16, data_block=300
+    )
+    if metric_type == MetricType.L2:
+        expected = ((query[:, np.newaxis, :] - data[np.newaxis, :, :]) ** 2).sum(axis=2)
+        expected_ids = np.argsort(expected, axis=1)[:, :10]
+    else:
+        expected = query @ data.T
+        expected_ids = np.argsort(-expected, axis=1)[:, :10]
+    assert np.array_equal(ids, expected_ids)
+    assert np.allclose(distances, np.take_along_axis(expected, expected_ids, axis=1), atol=1e-4)
+
+
+def test_blocked_knn_padding():
+    data = np.random.rand(5, 4).astype('float32')
+    distances, ids = blocked_knn(data, data, 8, MetricType.L2)
+    assert np.array_equal(ids[:, 0], np.arange(5))
+    assert np.all(ids[:, 5:] == -1)
+
+
+def test_blocked_knn_memory():
+    # 2 threads of 16 x 300 tiles and the two 300 x 16 blocks
+    assert block_rows(16, 16, 300, 2, 0) == 300
+    assert block_rows(16, 16, 300, 2, 1 << 20) == 300
+    assert block_rows(16, 16, 300, 2, 100 * (2 * 16 * 4 + 2 * 16 * 12)) == 100
+    assert block_rows(16, 16, 300, 2, 1) == 1
+    data = np.random.rand(1000, 16).astype('float32')
+    query = np.random.rand(50, 16).astype('float32')
+    expected = blocked_knn(query, data, 10, MetricType.L2, memory=0)
+    distances, ids = blocked_knn(
+        query, data, 10, MetricType.L2, query_block=16, threads=2, memory=20000
+    )
+    assert np.array_equal(ids, expected[1])
+    assert np.allclose(distances, expected[0], atol=1e-4)
@@ -0,0 +1,63 @@
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from annb.dataset import groundtruth_store
+from annb.dataset.groundtruth_store import GroundTruthStore, merge_ground_truth
+from annb.dataset.utils import generate_groundtruth
+from annb.indexes import MetricType
+
+
+def test_groundtruth_store_memoized(tmp_path):
+    data = np.random.rand(1000, 16).astype('float32')
+    query = np.random.rand(20, 16).astype('float32')
+    sidecar = str(tmp_path / 'gt.npz')
+    distances, ids = GroundTruthStore(sidecar).get(query, data, MetricType.L2)
+    with mock.patch.object(groundtruth_store, 'generate_groundtruth') as generate:
+        store = GroundTruthStore(sidecar)
+        cached_distances, cached_ids = store.get(query, data, MetricType.L2)
+        assert np.array_equal(cached_ids, ids)
+        assert np.array_equal(cached_distances, distances)
+        store.get(query, data, MetricType.L2)
+        generate.assert_not_called()
+
+
+@pytest.mark.parametrize('metric_type', [MetricType.L2, MetricType.INNER_PRODUCT])
+def test_groundtruth_store_extend(metric_type, tmp_path):
+    # seeded, near ties of distances computed by other blocks may swap ids
+    rng = np.random.default_rng(0)
+    data = rng.random((2000, 16), dtype=np.float32)
+    query = rng.random((20, 16), dtype=np.float32)
+    store = GroundTruthStore(str(tmp_path / 'gt.npz'))
+    store.get(query, data[:1200], metric_type)
+    with mock.patch.object(
+        groundtruth_store, 'generate_groundtruth', wraps=generate_groundtruth
+    ) as generate:
+        distances, ids = GroundTruthStore(store.sidecar).get(query, data, metric_type)
+        # only the appended rows are searched
+        assert len(generate.call_args[0][1]) == 800
+    expected_distances, expected_ids = generate_groundtruth(query, data, metric_type)
+    assert np.array_equal(ids, expected_ids)
+    assert np.allclose(distances, expected_distances, atol=1e-4)
+
+
+def test_groundtruth_store_changed_data():
+    data = np.random.rand(500, 8).astype('float32')
+    query = np.random.rand(10, 8).astype('float32')
+    store = GroundTruthStore()
+    store.get(query, data, MetricType.L2)
+    data[0] += 1.0
+    _, ids = store.get(query, data, MetricType.L2)
+    assert np.array_equal(ids, generate_groundtruth(query, data, MetricType.L2)[1])
+
+
+def test_merge_ground_truth_missing():
+    first = (np.array([[1.0, 0.0]]), np.array([[3, -1]]))
+    second = (np.array([[0.5, 2.0]]), np.array([[7, 8]]))
+    distances, ids = merge_ground_truth(first, second, MetricType.L2)
+    assert ids.tolist() == [[7, 3]]
+    assert distances.tolist() == [[0.5, 1.0]]
+    distances, ids = merge_ground_truth(first, second, MetricType.INNER_PRODUCT)
+    assert ids.tolist() == [[8, 3]]
+    assert distances.tolist() == [[2.0, 1.0]]
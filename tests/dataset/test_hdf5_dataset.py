@@ -1,4 +1,5 @@
 from os import path
+import h5py
 import numpy as np
 from annb.dataset import AnnbHdf5Dataset
 from annb import MetricType
@@ -20,4 +21,88 @@ def test_hdf5_dataset_create(tmpdir):
         assert np.array_equal(dataset.data, data)
         assert np.array_equal(dataset.train, data)
         print(dataset.hd5_file.filename)
-        assert dataset.hd5_file.filename == path.join('cache', 'test.hd5')
\ No newline at end of file
+        assert dataset.hd5_file.filename == path.join('cache', 'test.hd5')
+
+
+def test_hdf5_dataset_lazy(tmpdir):
+    with tmpdir.as_cwd():
+        data = np.random.rand(1000, 8).astype('float32')
+        AnnbHdf5Dataset.create('test.hd5', MetricType.INNER_PRODUCT, data.copy())
+        eager = AnnbHdf5Dataset('test.hd5')
+        eager.fit()
+        dataset = AnnbHdf5Dataset('test.hd5', lazy=True, chunk_size=300)
+        dataset.fit()
+        # contiguous hdf5 dataset is mapped directly
+        assert isinstance(dataset.data.rows, np.memmap)
+        assert len(dataset.data) == 1000
+        assert dataset.count == 1000
+        chunks = list(dataset.iter_data())
+        assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+        assert np.allclose(np.concatenate(chunks), eager.data)
+        assert np.allclose(dataset.data[np.array([5, 1, 5])], eager.data[[5, 1, 5]])
+        assert np.allclose(dataset.test, eager.test)
+        assert dataset.fingerprint() == eager.fingerprint()
+
+
+def test_hdf5_dataset_lazy_train_bounded(tmpdir, monkeypatch):
+    monkeypatch.setattr(AnnbHdf5Dataset, 'lazy_train_size', 100)
+    with tmpdir.as_cwd():
+        data = np.random.rand(1000, 8).astype('float32')
+        AnnbHdf5Dataset.create('test.hd5', MetricType.L2, data)
+        dataset = AnnbHdf5Dataset('test.hd5', lazy=True, chunk_size=300)
+        dataset.fit()
+        # the train matrix is a sample, not all rows
+        train = np.concatenate(list(dataset.iter_train()))
+        assert train.shape == (100, 8)
+        assert len(np.concatenate(list(dataset.iter_data()))) == 1000
+        # set explicitly, 0 for all rows
+        dataset = AnnbHdf5Dataset('test.hd5', lazy=True, train_size=0)
+        dataset.fit()
+        assert len(np.concatenate(list(dataset.iter_train()))) == 1000
+        dataset = AnnbHdf5Dataset('test.hd5')
+        dataset.fit()
+        assert len(np.concatenate(list(dataset.iter_train()))) == 1000
+
+
+def test_hdf5_dataset_lazy_chunked(tmpdir):
+    with tmpdir.as_cwd():
+        data = np.random.rand(100, 8).astype('float32')
+        AnnbHdf5Dataset.create('test.hd5', MetricType.L2, data)
+        with h5py.File('test.hd5', 'a') as f:
+            del f['train']
+            f.create_dataset('train', data=data, chunks=(10, 8), compression='gzip')
+        dataset = AnnbHdf5Dataset('test.hd5', lazy=True)
+        dataset.fit()
+        assert isinstance(dataset.data.rows, h5py.Dataset)
+        assert np.array_equal(dataset.data[np.array([7, 3])], data[[7, 3]])
+        assert np.array_equal(np.concatenate(list(dataset.iter_data(10, 55))), data[10:55])
+
+
+def test_hdf5_dataset_dtype(tmpdir):
+    with tmpdir.as_cwd():
+        data = np.random.randint(0, 256, (500, 8)).astype(np.uint8)
+        AnnbHdf5Dataset.create('test.hd5', MetricType.L2, data, test=data[:10].copy())
+        for lazy in (False, True):
+            dataset = AnnbHdf5Dataset('test.hd5', lazy=lazy)
+            dataset.fit()
+            # not widened to float32
+            assert dataset.data.dtype == np.uint8
+            assert dataset.test.dtype == np.uint8
+            assert np.array_equal(dataset.data[:], data)
+            assert np.array_equal(dataset.ground_truth_neighbors[:, 0], np.arange(10))
+
+
+def test_hdf5_dataset_hamming(tmpdir):
+    with tmpdir.as_cwd():
+        # ann-benchmarks stores binary vectors as bool
+        data = np.random.rand(500, 20) > 0.5
+        AnnbHdf5Dataset.create('test.hd5', MetricType.HAMMING, data, test=data[:10].copy())
+        for lazy in (False, True):
+            dataset = AnnbHdf5Dataset('test.hd5', lazy=lazy)
+            assert dataset.metric_type == MetricType.HAMMING
+            assert dataset.dimension == 20
+            dataset.fit()
+            assert dataset.data.shape == (500, 3)
+            assert np.array_equal(dataset.data[:], np.packbits(data, axis=1))
+            assert np.array_equal(dataset.test, np.packbits(data[:10], axis=1))
+            assert np.all(dataset.ground_truth_distances[:, 0] == 0)
@@ -1,4 +1,6 @@
 from os import path
+import numpy as np
+import pytest
 from annb.dataset import RandomDataset
 from annb import MetricType
 
@@ -15,3 +17,37 @@ def test_random_dataset_generic(tmpdir):
         assert len(dataset.ground_truth_neighbors) == 2000
         assert len(dataset.ground_truth_distances) == 2000
         assert len(dataset.train) == 2000
+
+
+def test_random_dataset_train_sample(tmpdir):
+    with tmpdir.as_cwd():
+        tmpdir.mkdir('cache')
+        for sampling in ('uniform', 'stratified'):
+            dataset = RandomDataset(
+                'cache/random_dataset.h5', dimension=4, count=2000, lazy=True,
+                train_size=0.1, train_sampling=sampling, train_seed=1,
+            )
+            ids = dataset.train_sample_ids()
+            assert len(ids) == 200
+            assert len(np.unique(ids)) == 200
+            if sampling == 'stratified':
+                assert np.array_equal(ids // 10, np.arange(200))
+            assert np.array_equal(dataset.train_sample(), np.array(dataset.train)[ids])
+            assert np.array_equal(np.concatenate(list(dataset.iter_train())), dataset.train_sample())
+            dataset.hd5_file.close()
+
+
+def test_random_dataset_queries(tmpdir):
+    with tmpdir.as_cwd():
+        tmpdir.mkdir('cache')
+        dataset = RandomDataset('cache/random_dataset.h5', dimension=4, count=2000, test_count=100)
+        assert np.array_equal(np.array(dataset.test), np.array(dataset.data)[:100])
+        dataset.hd5_file.close()
+        dataset = RandomDataset(
+            'cache/random_dataset.h5', dimension=4, count=2000, test_count=100, queries='separate'
+        )
+        assert dataset.hd5_file.attrs['queries'] == 'separate'
+        assert not np.array_equal(np.array(dataset.test), np.array(dataset.data)[:100])
+        dataset.hd5_file.close()
+        with pytest.raises(ValueError):
+            RandomDataset('cache/random_dataset.h5', dimension=4, count=2000, queries='other')
@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+import pytest
+
+from annb import MetricType
+from annb.dataset import AnnbHdf5Dataset, BigAnnDataset, RandomDataset
+from annb.dataset.synthetic import SyntheticGenerator, generate_dataset
+from annb.dataset.utils import generate_groundtruth
+
+
+@pytest.mark.parametrize('distribution', ['uniform', 'gaussian', 'anisotropic'])
+def test_synthetic_generator(distribution):
+    generator = SyntheticGenerator(
+        32,
+        distribution=distribution,
+        clusters=10,
+        cluster_sizes='powerlaw',
+        intrinsic_dimension=8,
+    )
+    rows = generator.generate(0, 10000)
+    assert rows.shape == (10000, 32)
+    assert rows.dtype == np.float32
+    # any range is reproducible alone
+    assert np.array_equal(generator.generate(5000, 9000), rows[5000:9000])
+    assert np.linalg.matrix_rank(rows[:1000]) == 8
+    assert not np.array_equal(generator.generate(0, 100, 1), rows[:100])
+
+
+def test_synthetic_generator_invalid():
+    with pytest.raises(ValueError):
+        SyntheticGenerator(8, distribution='zipf')
+    with pytest.raises(ValueError):
+        SyntheticGenerator(8, intrinsic_dimension=16)
+
+
+@pytest.mark.parametrize('output', ['synthetic.hdf5', 'synthetic.fbin'])
+def test_generate_dataset(output, tmpdir):
+    generator = SyntheticGenerator(16, distribution='gaussian', clusters=20)
+    file = str(tmpdir.join(output))
+    generate_dataset(
+        file, generator, 5000, MetricType.L2, test_count=50, chunk_size=1200, queries='separate'
+    )
+    if output.endswith('.hdf5'):
+        dataset = AnnbHdf5Dataset(file)
+        assert json.loads(dataset.hd5_file.attrs['synthetic'])['distribution'] == 'gaussian'
+    else:
+        dataset = BigAnnDataset(
+            file,
+            query=str(tmpdir.join('synthetic.query.fbin')),
+            ground_truth=str(tmpdir.join('synthetic.gt.bin')),
+        )
+    assert np.array_equal(np.array(dataset.data), generator.generate(0, 5000))
+    _, neighbors = generate_groundtruth(dataset.test, generator.generate(0, 5000), MetricType.L2)
+    assert np.array_equal(dataset.ground_truth_neighbors, neighbors)
+
+
+def test_generate_dataset_queries(tmpdir):
+    generator = SyntheticGenerator(16)
+    file = str(tmpdir.join('synthetic.hdf5'))
+    generate_dataset(file, generator, 1000, MetricType.L2, test_count=50, chunk_size=300)
+    dataset = AnnbHdf5Dataset(file)
+    assert dataset.hd5_file.attrs['queries'] == 'data'
+    assert np.array_equal(np.array(dataset.test), generator.generate(0, 50))
+    # each query is its own nearest neighbor
+    assert np.array_equal(np.array(dataset.ground_truth_neighbors)[:, 0], np.arange(50))
+    with pytest.raises(ValueError):
+        generate_dataset(file, generator, 1000, MetricType.L2, queries='other')
+
+
+def test_random_dataset_regenerate(tmpdir):
+    file = str(tmpdir.join('random.h5'))
+    dataset = RandomDataset(file, dimension=8, count=1000, distribution='gaussian')
+    data = np.array(dataset.data)
+    dataset.hd5_file.close()
+    dataset = RandomDataset(file, dimension=8, count=1000, distribution='gaussian')
+    assert np.array_equal(np.array(dataset.data), data)
+    dataset.hd5_file.close()
+    dataset = RandomDataset(file, dimension=8, count=1000, distribution='anisotropic')
+    assert not np.array_equal(np.array(dataset.data), data)
@@ -21,3 +21,12 @@ def test_generate_groundtruth_without_faiss():
     # mock for faiss to remove knn_gpu function
     with mock.patch.dict('sys.modules', {'faiss': None}):
         test_generate_groundtruth()
+
+
+def test_generate_groundtruth_all_queries():
+    # no cap on the number of queries
+    data = np.random.rand(200, 4).astype('float32')
+    query = np.random.rand(20000, 4).astype('float32')
+    with mock.patch.dict('sys.modules', {'faiss': None}):
+        distances, ids = utils.generate_groundtruth(query, data, MetricType.L2)
+    assert ids.shape == (20000, 100)
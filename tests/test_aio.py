@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from time import sleep
+
+import numpy as np
+
+from annb.aio import run_search_batches
+from annb.anns.faiss.indexes import FaissIndexUnderTest
+from annb.indexes import MetricType
+
+
+class AsyncIndex(FaissIndexUnderTest):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.closed = False
+
+    async def search_async(self, query, k):
+        self.outstanding += 1
+        self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        await asyncio.sleep(0.01)
+        self.outstanding -= 1
+        return self.search(query, k)
+
+    async def close_async(self):
+        self.closed = True
+
+
+def batches(count, step):
+    return [(batch, i, min(i + step, count)) for batch, i in enumerate(range(0, count, step))]
+
+
+def test_run_search_batches():
+    x = np.random.rand(100, 4).astype(np.float32)
+    index = AsyncIndex('test', 4, MetricType.L2, index='flat')
+    index.add(x)
+    labels = np.full((100, 1), -1)
+    emitted = []
+
+    def emit(batch, begin, end, started, duration, distances, ids):
+        emitted.append(batch)
+        labels[begin:end] = ids
+        assert duration >= 10000000
+
+    run_search_batches(index, x, batches(100, 10), 1, 4, emit)
+    assert sorted(emitted) == list(range(10))
+    assert list(labels[:, 0]) == list(range(100))
+    assert index.max_outstanding == 4
+    assert index.closed
+
+
+def test_run_search_batches_sync_index():
+    class SlowIndex(FaissIndexUnderTest):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.lock = threading.Lock()
+            self.threads = set()
+
+        def search(self, query, k):
+            with self.lock:
+                self.threads.add(threading.get_ident())
+            sleep(0.01)
+            return super().search(query, k)
+
+    x = np.random.rand(100, 4).astype(np.float32)
+    index = SlowIndex('test', 4, MetricType.L2, index='flat')
+    index.add(x)
+    emitted = []
+    run_search_batches(index, x, batches(100, 5), 1, 8, lambda batch, *_: emitted.append(batch))
+    assert sorted(emitted) == list(range(20))
+    # offloaded to the default executor, sized to the concurrency
+    assert 1 < len(index.threads) <= 8
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from annb.anns.faiss.indexes import FaissIndexUnderTest
+from annb.cache import IndexCache
+from annb.dataset import RandomDataset
+from annb.indexes import MetricType
+
+
+def test_index_cache_key(tmpdir):
+    with tmpdir.as_cwd():
+        dataset = RandomDataset('random_dataset.h5', metric='l2', dimension=4, count=100)
+        index = FaissIndexUnderTest('test', 4, MetricType.L2, index='ivfflat', nlist=4)
+        other = FaissIndexUnderTest('test', 4, MetricType.L2, index='ivfflat', nlist=8)
+        assert IndexCache.key(dataset, index) == IndexCache.key(dataset, index)
+        assert IndexCache.key(dataset, index) != IndexCache.key(dataset, other)
+        # runtime args do not change the built index
+        mmap = FaissIndexUnderTest('test', 4, MetricType.L2, index='ivfflat', nlist=4, mmap='yes')
+        assert IndexCache.key(dataset, index) == IndexCache.key(dataset, mmap)
+
+
+def test_index_cache_key_dataset(tmpdir):
+    with tmpdir.as_cwd():
+        index = FaissIndexUnderTest('test', 4, MetricType.L2, index='ivfflat', nlist=4)
+
+        def key(file, **kwargs):
+            return IndexCache.key(RandomDataset(file, dimension=4, count=100, **kwargs), index)
+
+        # by the contents, not the file
+        assert key('a.h5') == key('b.h5')
+        assert key('a.h5') != key('c.h5', seed=1)
+        # the index is trained on the train sample
+        assert key('a.h5') != key('a.h5', train_size=50)
+
+
+def test_index_cache_lru(tmpdir):
+    data = np.random.random((100, 4)).astype(np.float32)
+    index = FaissIndexUnderTest('test', 4, MetricType.L2, index='flat')
+    index.add(data)
+    cache = IndexCache(str(tmpdir), 0)
+    assert cache.lookup('a') is None
+    path = cache.store('a', index)
+    size = os.path.getsize(path)
+    cache.max_size = size * 2
+    cache.store('b', index)
+    # b is the least recently used
+    os.utime(cache.path('b'), (0, 0))
+    assert cache.lookup('a') == path
+    cache.store('c', index)
+    assert cache.lookup('b') is None
+    assert cache.lookup('a') and cache.lookup('c')
+    loaded = FaissIndexUnderTest('test', 4, MetricType.L2, index='flat')
+    loaded.load(path)
+    assert loaded.index.ntotal == 100
@@ -0,0 +1,37 @@
+import pytest
+
+from annb.dataset import RandomDataset
+
+# cli imports the plot module
+pytest.importorskip('matplotlib')
+from annb import cli  # noqa: E402
+
+
+def test_run_file_shares_dataset(tmpdir, monkeypatch):
+    with tmpdir.as_cwd():
+        RandomDataset('dataset.h5', metric='l2', dimension=4, count=500)
+        loads = []
+        create_or_load_dataset = cli.create_or_load_dataset
+
+        def counted(*args):
+            loads.append(args)
+            return create_or_load_dataset(*args)
+
+        monkeypatch.setattr(cli, 'create_or_load_dataset', counted)
+        with open('runs.yaml', 'w') as f:
+            f.write(
+                """
+default:
+  dataset: dataset.h5
+  loop: 1
+  query_args: []
+  result: result
+runs:
+  - name: run1
+    index_args: {index: flat}
+  - name: run2
+    index_args: {index: ivfflat, nlist: 4}
+"""
+            )
+        cli.run_file('runs.yaml')
+        assert len(loads) == 1
@@ -0,0 +1,39 @@
+import pickle
+
+import numpy as np
+import pytest
+from annb.histogram import LatencyHistogram
+
+
+def test_histogram_percentiles():
+    values = np.random.default_rng(1).integers(1000, 10000000, 100000)
+    histogram = LatencyHistogram()
+    histogram.record_values(values)
+    assert histogram.total == 100000
+    assert histogram.min == values.min()
+    assert histogram.max == values.max()
+    for n in (50, 90, 99, 99.9):
+        expected = np.percentile(values, n)
+        assert abs(histogram.percentile(n) - expected) / expected < 0.01
+    assert abs(histogram.mean - values.mean()) < 1
+
+
+def test_histogram_merge_and_counts():
+    a = LatencyHistogram()
+    b = LatencyHistogram()
+    a.record(1000, 99)
+    b.record(1000000)
+    merged = LatencyHistogram.merged([a, b])
+    assert merged.total == 100
+    assert merged.percentile(99) == pytest.approx(1000, rel=0.01)
+    assert merged.percentile(100) == 1000000
+    with pytest.raises(ValueError):
+        a.merge(LatencyHistogram(precision=0.1))
+
+
+def test_histogram_pickle():
+    histogram = LatencyHistogram()
+    histogram.record_values([5, 500, 50000])
+    loaded = pickle.loads(pickle.dumps(histogram))
+    assert np.array_equal(loaded.counts, histogram.counts)
+    assert loaded.percentile(50) == histogram.percentile(50)
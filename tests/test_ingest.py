@@ -0,0 +1,53 @@
+import threading
+
+import numpy as np
+
+from annb.anns.faiss.indexes import FaissIndexUnderTest
+from annb.indexes import MetricType
+from annb.ingest import IngestPipeline, split_chunks
+
+
+def test_split_chunks():
+    chunks = [np.zeros((5, 2)), np.zeros((3, 2))]
+    assert [len(c) for c in split_chunks(chunks, 2)] == [2, 2, 1, 2, 1]
+    assert [len(c) for c in split_chunks(chunks, 0)] == [5, 3]
+
+
+def test_ingest_pipeline():
+    index = FaissIndexUnderTest('test', 4, MetricType.L2)
+    x = np.random.rand(1000, 4).astype(np.float32)
+    chunks = IngestPipeline(index, chunk_size=300).run([x[:500], x[500:]])
+    assert [(c.offset, c.count) for c in chunks] == [(0, 300), (300, 200), (500, 300), (800, 200)]
+    assert all(c.duration > 0 for c in chunks)
+    _, ids = index.search(x[:3], 1)
+    assert list(ids[:, 0]) == [0, 1, 2]
+
+
+def test_ingest_pipeline_parallel_writers():
+    class ParallelIndex(FaissIndexUnderTest):
+        parallel_add = True
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.lock = threading.Lock()
+            self.threads = set()
+
+        def add_with_ids(self, data, ids):
+            self.threads.add(threading.get_ident())
+            with self.lock:
+                super().add_with_ids(data, ids)
+
+    index = ParallelIndex('test', 4, MetricType.L2, id_map='yes')
+    x = np.random.rand(1000, 4).astype(np.float32)
+    chunks = IngestPipeline(index, chunk_size=100, writers=4).run([x], begin=0)
+    assert [c.offset for c in chunks] == list(range(0, 1000, 100))
+    assert index.index.ntotal == 1000
+    _, ids = index.search(x[990:], 1)
+    assert list(ids[:, 0]) == list(range(990, 1000))
+    # a later add does not reuse the ids of the writers
+    assert index.count == 1000
+    index.add(x[:10])
+    _, ids = index.search(x[:1], 2)
+    assert sorted(ids[0]) == [0, 1000]
+    # faiss index without parallel_add falls back to one writer
+    assert IngestPipeline(FaissIndexUnderTest('test', 4, MetricType.L2), writers=4).writers == 1
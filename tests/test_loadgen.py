@@ -0,0 +1,61 @@
+from time import sleep
+
+import numpy as np
+import pytest
+from annb.loadgen import arrival_schedule, OpenLoopGenerator
+
+
+def test_arrival_schedule_constant():
+    offsets = arrival_schedule(1000, 5)
+    assert list(offsets) == [0, 1000000, 2000000, 3000000, 4000000]
+
+
+def test_arrival_schedule_poisson():
+    offsets = arrival_schedule(1000, 10000, 'poisson', seed=1)
+    assert offsets[0] == 0
+    assert np.all(np.diff(offsets) >= 0)
+    # mean interval close to 1ms
+    assert abs(offsets[-1] / 9999 - 1000000) < 50000
+    with pytest.raises(ValueError):
+        arrival_schedule(0, 10)
+
+
+def test_open_loop_latency_includes_queueing():
+    class SlowIndex:
+        def search(self, query, k):
+            sleep(0.01)
+            return None, None
+
+    xq = np.zeros((20, 4), dtype=np.float32)
+    # offered 1000 requests/s, served 100 requests/s by one worker
+    result = OpenLoopGenerator(SlowIndex(), xq, 10, 1, 1, 1000).run()
+    assert result.count == 20
+    assert result.latencies.total == 20
+    assert result.service_times.min >= 10000000
+    # later requests wait for the earlier ones
+    assert result.latencies.max > 15 * 10000000
+    assert result.achieved_rate < 120
+
+
+
+def test_open_loop_latency_per_request():
+    class Index:
+        def search(self, query, k):
+            return None, None
+
+    xq = np.zeros((20, 4), dtype=np.float32)
+    # 4 requests of 5 queries, each timed once
+    result = OpenLoopGenerator(Index(), xq, 10, 5, 1, 10000).run()
+    assert result.count == 20
+    assert result.latencies.total == 4
+    assert result.service_times.total == 4
+
+
+def test_open_loop_search_error():
+    class FailingIndex:
+        def search(self, query, k):
+            raise RuntimeError('search failed')
+
+    xq = np.zeros((20, 4), dtype=np.float32)
+    with pytest.raises(RuntimeError):
+        OpenLoopGenerator(FailingIndex(), xq, 10, 1, 2, 1000).run()
@@ -0,0 +1,32 @@
+import numpy as np
+from annb.recall import recall_at, match_positions
+
+
+def recall_with_sets(ground_truth, labels, k):
+    correct = 0
+    total = 0
+    for gt, items in zip(ground_truth[:, :k], labels[:, :k]):
+        gt = set(gt[gt >= 0])
+        total += len(gt)
+        correct += len(gt & set(items))
+    return correct / total
+
+
+def test_recall_at_matches_set_intersection():
+    rng = np.random.default_rng(1)
+    ground_truth = np.array([rng.permutation(50)[:20] for _ in range(200)])
+    labels = rng.integers(-1, 50, (200, 20))
+    recalls = recall_at(ground_truth, labels, [1, 5, 20])
+    for k in (1, 5, 20):
+        assert recalls[k][0] == recall_with_sets(ground_truth, labels, k)
+        assert recalls[k][1].shape == (200,)
+
+
+def test_recall_with_padding():
+    ground_truth = np.array([[3, 1, -1], [2, -1, -1]])
+    labels = np.array([[1, -1, -1], [-1, -1, 2]])
+    positions = match_positions(ground_truth, labels)
+    assert positions.tolist() == [[3, 0, 3], [2, 3, 3]]
+    recalls = recall_at(ground_truth, labels, [3])
+    assert recalls[3][0] == 2 / 3
+    assert recalls[3][1].tolist() == [0.5, 1.0]
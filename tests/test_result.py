@@ -0,0 +1,96 @@
+import pytest
+
+from annb.histogram import LatencyHistogram
+from annb.result import BenchmarkResult, InsertChunk, LoopSummary
+
+
+def test_query_result_latency():
+    result = BenchmarkResult()
+    durations = [(10, 1000000)] * 99 + [(10, 100000000)]
+    histogram = LatencyHistogram()
+    for _, duration in durations:
+        histogram.record(duration)
+    result.add_query_result(1.0, durations, None, histogram)
+    result.add_query_result(1.0, durations, None)
+    with_histogram, without_histogram = result.query_results
+    assert with_histogram.latency_pn(99) == pytest.approx(1000000, rel=0.01)
+    assert with_histogram.latency_pn(100) == pytest.approx(100000000, rel=0.01)
+    # results saved without histogram use the batch durations
+    assert without_histogram.latency_pn(99) == 100000000
+    result.add_attribute('jobs', 1)
+    assert 'batch latency=' in str(result)
+    assert 'Batch Latency P99(ms)' in BenchmarkResult.csv_header
+    assert list(result.csv_output_lines())[0][-2] == str(with_histogram.latency_pn(99) / 1000000.0)
+
+
+def test_query_result_qps():
+    result = BenchmarkResult()
+    # 2 jobs of 1000 queries in 1s each, overlapping for 1.5s of wall clock
+    result.add_query_result(1.0, [(1000, 1000000000)] * 2, None, wall_duration=1500000000)
+    result.add_query_result(1.0, [(1000, 1000000000)] * 2, None)
+    wall, ideal = result.query_results
+    assert wall.qps(2) == pytest.approx(2000 / 1.5)
+    assert wall.concurrency_efficiency(2) == pytest.approx(2 / 3)
+    # without wall clock, jobs are assumed to scale perfectly
+    assert ideal.qps(2) == pytest.approx(2000)
+    assert ideal.concurrency_efficiency(2) == pytest.approx(1.0)
+
+
+def test_query_result_loops():
+    result = BenchmarkResult()
+    loops = [
+        LoopSummary(i, 1000, duration, 1000 / (duration / 1e9), 0, duration)
+        for i, duration in enumerate([1000000, 2000000, 3000000])
+    ]
+    result.add_query_result(1.0, [(1000, 1000000)], None, loops=loops)
+    qps, low, high = result.query_results[0].qps_ci()
+    assert qps == 500000 and low <= qps <= high
+    assert result.query_results[0].p99_ci()[0] == 2000000
+    result.add_attribute('jobs', 1)
+    assert 'loops median' not in str(result)
+    result.add_attribute('loop_mode', 'adaptive')
+    assert '3 loops median 500000.0qps' in str(result)
+
+
+def test_churn_drift():
+    result = BenchmarkResult()
+    histogram = LatencyHistogram()
+    histogram.record(1000000)
+    result.add_churn_result(0, 0, 900, 0, 0, 0.9, 1000.0, histogram, None)
+    result.add_churn_result(1, 100, 900, 5000000, 6000000, 0.8, 800.0, histogram, None)
+    result.add_attribute('jobs', 1)
+    lines = [line for line in str(result).splitlines() if 'cycle=' in line]
+    # against the baseline cycle
+    assert 'recall=0.9(+0.000000), 1000.0qps(+0.00%)' in lines[0]
+    assert '100 churned, 900 live, remove=5.0ms, insert=6.0ms' in lines[1]
+    assert 'recall=0.8(-0.100000), 800.0qps(-20.00%)' in lines[1]
+
+
+def test_train_size_summary():
+    result = BenchmarkResult()
+    result.add_train_size_result(0.5, 1000, 2000000, 0.9, 100.0, None)
+    result.add_train_size_result(500, 500, None, 0.8, 100.0, None)
+    result.add_attribute('jobs', 1)
+    text = str(result)
+    assert 'train_size=0.5 -> 1000 items, train=2.0ms' in text
+    # loaded from the cache, not trained
+    assert 'train_size=500 -> 500 items, train=cached' in text
+
+
+def test_insert_curve():
+    # 2 writers, chunks of 100 rows overlapping in pairs, 10ms each
+    chunks = [
+        InsertChunk(i * 100, 100, i // 2 * 10000000, 10000000, 1000000 if i == 0 else 0)
+        for i in range(8)
+    ]
+    curve = BenchmarkResult._insert_curve(chunks, points=4)
+    assert [(first, last) for first, last, _, _ in curve] == [(0, 200), (200, 400), (400, 600), (600, 800)]
+    # rows per wall clock second, not per add duration
+    assert [rate for _, _, rate, _ in curve] == [pytest.approx(20000)] * 4
+    assert [wait for _, _, _, wait in curve] == [1000000, 0, 0, 0]
+    # at most points groups
+    assert len(BenchmarkResult._insert_curve(chunks, points=3)) == 3
+    result = BenchmarkResult()
+    result.add_insert_chunks(chunks)
+    result.add_attribute('jobs', 1)
+    assert '0: 0-100 items -> 10000.0 items/s, wait=1.0ms' in str(result)
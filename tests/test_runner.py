@@ -1,12 +1,35 @@
+import os
 from logging import INFO
 from typing import List, Tuple
+import numpy as np
 from numpy import ndarray
-from annb.runner import Runner
+from queue import Queue
+import pytest
+from annb.runner import Runner, SingleResult, process_search_worker
+from annb.shared import SharedArray
 from annb.anns.faiss.indexes import FaissIndexUnderTest
 from annb.dataset import RandomDataset
 from annb import MetricType
 
 
+@pytest.fixture
+def workdir(tmpdir):
+    # runners write to the working directory, datasets are created in its cache
+    with tmpdir.as_cwd():
+        tmpdir.mkdir('cache')
+        yield tmpdir
+
+
+@pytest.fixture
+def dataset(workdir):
+    return RandomDataset('cache/random_dataset.h5', metric='l2', dimension=4, count=2000)
+
+
+def faiss_index(dimension: int = 4, **kwargs) -> FaissIndexUnderTest:
+    return FaissIndexUnderTest(
+        index_name='test', dimension=dimension, metric_type=MetricType.L2, **kwargs
+    )
+
 
 def test_abnormal_exit_on_sub_query(tmpdir):
     class DummyIndex(FaissIndexUnderTest):
@@ -28,3 +51,269 @@ def test_abnormal_exit_on_sub_query(tmpdir):
         runner.run_search()
         assert(len(runner.records) == 1)
         assert(len(runner.records[0]) == 7)
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process', 'async'])
+def test_run(dataset, executor):
+    index = faiss_index(index='flat')
+    runner = Runner('test', index, dataset, jobs=3, loop=2, executor=executor)
+    runner.run()
+    assert len(runner.records) == 2
+    assert sum(r.count for r in runner.records[0]) == 2000
+    assert runner.benchmark_result.query_results[0].recall == 1.0
+    # one latency per batch(step 10) of the best loop only
+    assert runner.benchmark_result.query_results[0].histogram.total == 200
+    assert 'batch latency=' in str(runner.benchmark_result)
+
+
+def test_process_search_worker():
+    xq = np.random.rand(25, 4).astype(np.float32)
+    index = faiss_index(index='flat')
+    index.add(xq)
+    queue = Queue()
+    shared_xq, labels, distances, times = shared = [
+        SharedArray.from_array(xq),
+        SharedArray.create((25, 3), np.int64, -1),
+        SharedArray.create((25, 3), np.float32, 0),
+        SharedArray.create((3, 2), np.int64, 0),
+    ]
+    try:
+        descriptors = [s.descriptor for s in shared]
+        process_search_worker(1, index, descriptors, [(0, 0, 10), (2, 20, 25)], 3, queue)
+        # batches, then the job when it is done
+        assert [queue.get() for _ in range(3)] == [(0, 0, 10), (2, 20, 25), 1]
+        assert list(labels.array[:10, 0]) == list(range(10))
+        assert list(labels.array[20:, 0]) == list(range(20, 25))
+        # batch 1 is of another job
+        assert (labels.array[10:20] == -1).all()
+        assert (times.array[[0, 2], 1] > 0).all() and (times.array[1] == 0).all()
+    finally:
+        for s in shared:
+            s.close()
+
+
+def test_handle_result_batch_latency(dataset):
+    runner = Runner('test', faiss_index(), dataset, step=10)
+    # 100 batches of 10 queries, the last one is slow
+    for batch in range(100):
+        time = 100000000 if batch == 99 else 1000000
+        indexes = list(range(batch * 10, batch * 10 + 10))
+        runner.handle_result(SingleResult(None, None, time, indexes, 10), batch + 1, 100)
+    histogram = runner.histograms[0]
+    # one batch latency per batch, not per query
+    assert histogram.total == 100
+    assert histogram.percentile(99) == pytest.approx(1000000, rel=0.01)
+    assert histogram.max == pytest.approx(100000000, rel=0.01)
+    assert len(runner.records[0]) == 100
+
+
+def test_wall_duration_and_timeline():
+    # job 1 starts later and returns last, job 0 waits between its batches
+    records = [
+        SingleResult(None, None, 100, [10], 1, 1, 1050),
+        SingleResult(None, None, 200, [0], 1, 0, 1000),
+        SingleResult(None, None, 100, [1], 1, 0, 1500),
+        SingleResult(None, None, 400, [11], 1, 1, 1200),
+    ]
+    assert Runner.wall_duration(records) == 1600 - 1000
+    assert Runner.timeline(records).tolist() == [
+        [0, 0, 200, 1],
+        [0, 500, 100, 1],
+        [1, 50, 100, 1],
+        [1, 200, 400, 1],
+    ]
+
+
+def adaptive_runner(dataset, durations, **kwargs):
+    runner = Runner('test', faiss_index(), dataset, loop_mode='adaptive', **kwargs)
+    durations = iter(durations)
+
+    def run_search():
+        # one batch of all test data, taking the next duration
+        indexes = list(range(len(dataset.test)))
+        result = SingleResult(None, None, next(durations), indexes, len(indexes), 0, 0)
+        runner.handle_result(result, 1, 1)
+
+    runner.run_search = run_search
+    runner.run_adaptive_loops()
+    return runner
+
+
+def test_adaptive_loops(dataset):
+    # converged as soon as min loops finished
+    runner = adaptive_runner(dataset, [1000000] * 10, min_loop=3, max_loop=10)
+    assert [s.loop for s in runner.loop_summaries] == [0, 1, 2]
+    # noisy loops run until max loops
+    durations = [1000000, 2000000, 3000000, 1500000, 2500000, 1200000]
+    runner = adaptive_runner(dataset, durations, min_loop=3, max_loop=5, ci_width=0.05)
+    assert len(runner.loop_summaries) == 5
+    # the loop of the median QPS, not the fastest one
+    assert runner.find_median_loop() == 1
+    assert runner.loop_summaries[1].qps == pytest.approx(len(dataset.test) / 0.002)
+    # or the time budget runs out
+    runner = adaptive_runner(dataset, durations, min_loop=3, max_loop=5, time_budget=-1)
+    assert len(runner.loop_summaries) == 1
+
+
+@pytest.mark.parametrize(
+    'kwargs',
+    [
+        {'tune': {'param': 'nprobe', 'min': 0}},
+        {'tune': {'param': 'nprobe', 'min': 8, 'max': 4}},
+        {'workload': 'mixed', 'query_args': [{'nprobe': 1}, {'nprobe': 2}]},
+        {'workload': 'mixed', 'executor': 'process'},
+        {'workload': 'mixed', 'executor': 'async', 'jobs': 2},
+        {'workload': 'churn', 'query_args': [{'nprobe': 1}, {'nprobe': 2}]},
+        {'workload': 'churn', 'train_sizes': [0.5]},
+        {'workload': 'churn', 'thread_grid': ['1x1']},
+        {'thread_grid': ['0x1']},
+    ],
+)
+def test_invalid_options(dataset, kwargs):
+    with pytest.raises(ValueError):
+        Runner('test', faiss_index(), dataset, **kwargs)
+
+
+def test_build_with_cache(dataset):
+    # mmap is a runtime arg, the index built without it is reused
+    for expected, mmap in (('miss', 'no'), ('hit', 'yes')):
+        index = faiss_index(index='ivfflat', nlist=8, mmap=mmap)
+        runner = Runner('test', index, dataset, index_cache=True)
+        runner.build_with_cache()
+        result = runner.benchmark_result
+        assert result.attributes['index_cache'] == expected
+        assert index.index.ntotal == 2000
+    # the loaded index is not trained or inserted again
+    assert result.training_durations == [] and result.insert_durations == []
+    assert len(os.listdir('run/index-cache')) == 1
+    # a hit searches right after loading, then again
+    assert result.attributes['cold_query_latency'] > 0
+    assert result.attributes['warm_query_latency'] > 0
+
+
+def test_add_data_lazy(workdir):
+    dataset = RandomDataset(
+        'cache/random_dataset.h5', metric='l2', dimension=4, count=1000, lazy=True, chunk_size=128
+    )
+    index = faiss_index(index='flat')
+    runner = Runner('test', index, dataset)
+    runner.add_data(0, 500)
+    runner.add_data(500)
+    # added chunk by chunk of the dataset
+    offsets = [[c.offset for c in chunks] for chunks in runner.benchmark_result.insert_chunks]
+    assert offsets == [[0, 128, 256, 384], [500, 628, 756, 884]]
+    assert [d.count for d in runner.benchmark_result.insert_durations] == [500, 500]
+    _, ids = index.search(np.array(dataset.data[495:505]), 1)
+    assert list(ids[:, 0]) == list(range(495, 505))
+
+
+def test_train_sizes(dataset):
+    runner = Runner('test', faiss_index(), dataset, train_sizes=[500, 0.5])
+    sampled = []
+
+    def run_build_and_search():
+        sampled.append(len(dataset.train_sample()))
+        runner.train_duration = 1000
+        runner.benchmark_result.add_query_result(0.9, [(2000, 1000000)], None)
+
+    runner.run_build_and_search = run_build_and_search
+    runner.run()
+    assert sampled == [500, 1000]
+    results = runner.benchmark_result.train_size_results
+    assert [(r.train_size, r.train_count) for r in results] == [(500, 500), (0.5, 1000)]
+    assert all(r.train_duration == 1000 and r.qps == 2000000 for r in results)
+    # restored for other runs sharing the dataset, also on failure
+    assert dataset.train_sample_ids() is None
+
+    def failing():
+        raise RuntimeError('test')
+
+    runner.run_build_and_search = failing
+    with pytest.raises(RuntimeError):
+        runner.run()
+    assert dataset.train_size == 0
+
+
+def test_query_sample(dataset):
+    runner = Runner('test', faiss_index(), dataset)
+    xq, ground_truth = runner.query_sample(100, 0)
+    rows = [np.flatnonzero((dataset.test == q).all(axis=1))[0] for q in xq]
+    # sorted rows, with their own ground truth
+    assert len(rows) == 100 and rows == sorted(rows)
+    assert np.array_equal(ground_truth, dataset.ground_truth_neighbors[rows])
+    assert np.array_equal(runner.query_sample(100, 0)[0], xq)
+    assert len(runner.query_sample(5000, 0)[0]) == 2000
+
+
+def test_auto_query_args(dataset):
+    class ExploredIndex(FaissIndexUnderTest):
+        def auto_query_args(self, xq, ground_truth, k, experiments=100):
+            self.explored = (len(xq), k, experiments)
+            return self.frontier
+
+    index = ExploredIndex('test', 4, MetricType.L2, index='flat')
+    index.frontier = [({'nprobe': 1}, 0.5, 0.001), ({'nprobe': 4}, 0.9, 0.002)]
+    runner = Runner('test', index, dataset, query_args='auto', auto_sample=200, auto_experiments=20)
+    runner.run_auto_query_args()
+    assert index.explored == (200, 10, 20)
+    assert runner.query_args == [{'nprobe': 1}, {'nprobe': 4}]
+    assert runner.benchmark_result.attributes['query_args'] == runner.query_args
+    # searched once without args if nothing is explored
+    index.frontier = []
+    runner.run_auto_query_args()
+    assert runner.query_args == [None]
+
+
+def test_thread_grid(dataset):
+    runner = Runner(
+        'test', faiss_index(), dataset, jobs=2, thread_budget=2, thread_grid=['1x2', '2x1']
+    )
+    layouts = []
+
+    def run_loops(query_arg):
+        layouts.append((runner.jobs, runner.thread_layout.omp_threads, query_arg))
+        runner.benchmark_result.add_query_result(1.0, [(2000, 1000000)], query_arg)
+
+    runner.run_loops = run_loops
+    runner.run_thread_grid({'nprobe': 1})
+    assert layouts == [(1, 2, {'nprobe': 1}), (2, 1, {'nprobe': 1})]
+    results = runner.benchmark_result.thread_scaling_results
+    assert [(r.layout['jobs'], r.layout['omp_threads']) for r in results] == [(1, 2), (2, 1)]
+    assert [r.qps for r in results] == [2000000, 4000000]
+    # speedup against the first layout
+    assert '(x2.00)' in str(runner.benchmark_result)
+    # restored after the sweep
+    assert runner.jobs == 2 and runner.thread_layout.omp_threads == 1
+
+
+def test_fanout_baseline(dataset):
+    index = faiss_index(index='ivfflat', nlist=8, shards=2)
+    query_args = [{'nprobe': 1}, {'nprobe': 8}]
+    runner = Runner('test', index, dataset, query_args=query_args, fanout_baseline=True)
+    searched = []
+
+    def run_loops(query_arg):
+        distributed = runner.index.distributed
+        searched.append((distributed, runner.index.index.ntotal, query_arg))
+        # the sharded index is half as fast
+        duration = 2000000 if distributed else 1000000
+        runner.benchmark_result.add_query_result(0.5 if distributed else 1.0, [(2000, duration)], query_arg)
+
+    runner.run_loops = run_loops
+    runner.run_build_and_search()
+    # the same query args on the index, then on its single index counterpart
+    assert searched == [(True, 2000, a) for a in query_args] + [(False, 2000, a) for a in query_args]
+    assert [r.args for r in runner.benchmark_result.query_results] == query_args
+    results = runner.benchmark_result.fanout_results
+    assert [(r.args, r.recall, r.baseline_recall) for r in results] == [(a, 0.5, 1.0) for a in query_args]
+    assert all(r.qps * 2 == r.baseline_qps for r in results)
+    assert runner.index is index
+
+
+def test_fanout_baseline_options(dataset):
+    with pytest.raises(ValueError):
+        Runner('test', faiss_index(index='ivfflat', nlist=8), dataset, fanout_baseline=True)
+    sharded = faiss_index(index='ivfflat', nlist=8, shards=2)
+    for kwargs in ({'index_cache': True}, {'thread_grid': ['1x1']}, {'workload': 'churn'}):
+        with pytest.raises(ValueError):
+            Runner('test', sharded, dataset, fanout_baseline=True, **kwargs)
@@ -0,0 +1,30 @@
+from multiprocessing import get_context
+
+import numpy as np
+import pytest
+
+from annb.shared import SharedArray
+
+
+def fill(descriptor, value):
+    with SharedArray.attach(descriptor) as shared:
+        shared.array[1] = value
+
+
+def test_shared_array():
+    data = np.arange(12, dtype=np.float32).reshape(4, 3)
+    with SharedArray.from_array(data) as shared:
+        assert np.array_equal(shared.array, data)
+        # a forked worker writes through the descriptor only
+        process = get_context('fork').Process(target=fill, args=(shared.descriptor, -1))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        assert list(shared.array[1]) == [-1, -1, -1]
+        assert np.array_equal(np.delete(shared.array, 1, axis=0), np.delete(data, 1, axis=0))
+        descriptor = shared.descriptor
+    # the owner unlinks the block
+    with pytest.raises(FileNotFoundError):
+        SharedArray.attach(descriptor)
+    with SharedArray.create((0, 3), np.int64, fill=0) as empty:
+        assert empty.array.shape == (0, 3)
@@ -0,0 +1,15 @@
+from annb.stats import median_ci, relative_width
+
+
+def test_median_ci():
+    median, low, high = median_ci([10.0, 11.0, 9.0, 10.5, 9.5])
+    assert median == 10.0
+    assert 9.0 <= low <= median <= high <= 11.0
+    assert median_ci([3.0]) == (3.0, 3.0, 3.0)
+    # reproducible with the fixed seed
+    assert median_ci([1.0, 5.0, 2.0]) == median_ci([1.0, 5.0, 2.0])
+
+
+def test_relative_width():
+    assert relative_width((10.0, 9.0, 11.0)) == 0.2
+    assert relative_width((0.0, 0.0, 0.0)) == 0.0
@@ -0,0 +1,55 @@
+import os
+import threading
+
+import pytest
+
+from annb.threads import ThreadLayout, available_cores, load_thread_grid
+
+
+def test_thread_layout():
+    layout = ThreadLayout(2, budget=8, pin=True, cores=range(8))
+    assert layout.omp_threads == 4
+    assert layout.job_cores == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert not layout.oversubscribed
+    assert layout.as_dict() == {
+        'budget': 8,
+        'jobs': 2,
+        'omp_threads': 4,
+        'pin': True,
+        'cores': [[0, 1, 2, 3], [4, 5, 6, 7]],
+    }
+    # slices wrap around the cores
+    layout = ThreadLayout(3, 2, cores=range(4))
+    assert layout.budget == 4
+    assert layout.oversubscribed
+    assert layout.job_cores == [[0, 1], [2, 3], [0, 1]]
+    assert ThreadLayout(16, budget=4).omp_threads == 1
+
+
+def test_load_thread_grid():
+    assert load_thread_grid(['1x8', '2X4', [8, 1]]) == [(1, 8), (2, 4), (8, 1)]
+    with pytest.raises(ValueError):
+        load_thread_grid(['0x8'])
+
+
+@pytest.mark.skipif(not hasattr(os, 'sched_setaffinity'), reason='no cpu affinity')
+def test_thread_layout_apply():
+    class Index:
+        def set_threads(self, threads):
+            self.threads = threads
+
+    core = available_cores()[-1]
+    layout = ThreadLayout(2, 1, pin=True, cores=[core])
+    index = Index()
+    affinity = []
+
+    def job():
+        layout.apply(index, 1)
+        affinity.append(os.sched_getaffinity(0))
+
+    # pinned in the job thread only
+    thread = threading.Thread(target=job)
+    thread.start()
+    thread.join()
+    assert index.threads == 1
+    assert affinity == [{core}]
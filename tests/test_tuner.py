@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from annb.tuner import ParameterTuner
+
+
+class StepIndex:
+    """recall is value / 10 of the ground truth"""
+
+    def __init__(self, ground_truth):
+        self.ground_truth = ground_truth
+        self.value = 0
+
+    def update_search_args(self, **kwargs):
+        self.value = kwargs['nprobe']
+
+    def search(self, query, k):
+        labels = np.full((len(query), k), -1)
+        hits = min(self.value, 10)
+        labels[:, :hits] = self.ground_truth[: len(query), :hits]
+        return None, labels
+
+
+def test_tuner_finds_smallest_value():
+    ground_truth = np.arange(50 * 10).reshape(50, 10)
+    xq = np.zeros((50, 4), dtype=np.float32)
+    tuner = ParameterTuner(StepIndex(ground_truth), xq, ground_truth, 10, 'nprobe', 0.7)
+    value, trace = tuner.tune()
+    assert value == 7
+    # 1, 2, 4, 8 by galloping, then 6, 7 by binary search
+    assert [p.value for p in trace] == [1, 2, 4, 8, 6, 7]
+
+
+def test_tuner_target_not_reached():
+    ground_truth = np.arange(50 * 10).reshape(50, 10)
+    xq = np.zeros((50, 4), dtype=np.float32)
+    tuner = ParameterTuner(
+        StepIndex(ground_truth), xq, ground_truth, 10, 'nprobe', 0.9, maximum=5
+    )
+    value, trace = tuner.tune()
+    assert value is None
+    assert trace[-1].value == 5
+
+
+def test_tuner_invalid_range():
+    ground_truth = np.arange(50 * 10).reshape(50, 10)
+    xq = np.zeros((50, 4), dtype=np.float32)
+    for minimum, maximum in ((0, 8), (-1, 8), (9, 8)):
+        with pytest.raises(ValueError):
+            ParameterTuner(
+                StepIndex(ground_truth), xq, ground_truth, 10, 'nprobe', 0.7, minimum, maximum
+            )
+
+
+def test_tuner_single_probe():
+    ground_truth = np.arange(50 * 10).reshape(50, 10)
+    xq = np.zeros((50, 4), dtype=np.float32)
+    index = StepIndex(ground_truth)
+    # reached by the minimum
+    value, trace = ParameterTuner(index, xq, ground_truth, 10, 'nprobe', 0.1).tune()
+    assert value == 1 and [p.value for p in trace] == [1]
+    # nothing to search between equal bounds
+    value, trace = ParameterTuner(index, xq, ground_truth, 10, 'nprobe', 0.9, 3, 3).tune()
+    assert value is None and [p.value for p in trace] == [3]
@@ -0,0 +1,87 @@
+import threading
+from time import sleep
+
+import numpy as np
+import pytest
+
+from annb.anns.faiss.indexes import FaissIndexUnderTest
+from annb.indexes import MetricType
+from annb.workloads import InsertStreamer, LockedIndex, ReadWriteLock
+
+
+def test_read_write_lock():
+    lock = ReadWriteLock()
+    events = []
+    lock.acquire_read()
+    lock.acquire_read()
+
+    def writer():
+        lock.acquire_write()
+        events.append('write')
+        lock.release_write()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    sleep(0.05)
+    # writer waits for both readers
+    assert events == []
+    lock.release_read()
+    lock.release_read()
+    thread.join(1)
+    assert events == ['write']
+
+
+def test_locked_index():
+    x = np.random.rand(100, 4).astype(np.float32)
+    index = FaissIndexUnderTest('test', 4, MetricType.L2, index='flat')
+    lock = ReadWriteLock()
+    locked = LockedIndex(index, lock)
+    locked.add(x[:50])
+    # add waits for a search in progress
+    lock.acquire_read()
+    thread = threading.Thread(target=locked.add, args=(x[50:],))
+    thread.start()
+    sleep(0.05)
+    assert index.index.ntotal == 50
+    lock.release_read()
+    thread.join(1)
+    assert index.index.ntotal == 100
+    _, ids = locked.search(x[60:61], 1)
+    assert ids[0, 0] == 60
+
+
+def test_insert_streamer():
+    class RecordingIndex(FaissIndexUnderTest):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.batches = []
+
+        def add(self, data):
+            self.batches.append(len(data))
+            super().add(data)
+
+    x = np.random.rand(1050, 4).astype(np.float32)
+    index = RecordingIndex('test', 4, MetricType.L2, index='flat')
+    streamer = InsertStreamer(index, x, 500, 20000, 100)
+    assert streamer.visible == 500
+    streamer.begin()
+    streamer.join()
+    assert streamer.finished
+    # rows before start are not added by the streamer
+    assert index.batches == [100, 100, 100, 100, 100, 50]
+    assert streamer.visible == 1050
+    # paced, the last batch is scheduled after 500 rows
+    assert streamer.duration >= 500 / 20000 * 1e9
+
+
+def test_insert_streamer_error():
+    class FailingIndex(FaissIndexUnderTest):
+        def add(self, data):
+            raise RuntimeError('add failed')
+
+    x = np.random.rand(100, 4).astype(np.float32)
+    streamer = InsertStreamer(FailingIndex('test', 4, MetricType.L2), x, 0, 0, 10)
+    streamer.begin()
+    with pytest.raises(RuntimeError):
+        streamer.join()
+    assert streamer.visible == 0